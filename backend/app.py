@@ -32,6 +32,10 @@ def create_app():
          allow_headers=['Content-Type', 'Authorization'],
          supports_credentials=True)
     
+    # Load AI models in the background; requests use rule-based recipes until ready
+    from services.ai_service import ai_service
+    ai_service.start_loading()
+    
     # Initialize database connection
     try:
         db_connection.connect()
@@ -54,11 +58,13 @@ def create_app():
             'status': 'running',
             'endpoints': {
                 'health': '/health',
+                'ready': '/ready',
                 'recipes': f'/api/{Config.API_VERSION}/recipes',
                 'users': f'/api/{Config.API_VERSION}/users'
             },
             'documentation': {
                 'search_recipes': f'/api/{Config.API_VERSION}/recipes/search',
+                'search_recipes_batch': f'/api/{Config.API_VERSION}/recipes/search/batch',
                 'popular_recipes': f'/api/{Config.API_VERSION}/recipes/popular',
                 'random_recipe': f'/api/{Config.API_VERSION}/recipes/random'
             }
@@ -75,9 +81,36 @@ def create_app():
             # Check AI service health
             from services.ai_service import ai_service
             ai_health = {
-                "status": "healthy" if ai_service.embedding_model else "degraded",
+                "status": "healthy" if ai_service.is_ready() else "degraded",
+                "model_state": ai_service.model_state,
                 "embedding_model": "loaded" if ai_service.embedding_model else "not_loaded",
-                "prediction_model": "loaded" if ai_service.model else "not_loaded"
+                "prediction_model": "loaded" if ai_service.model else "not_loaded",
+                "embedding_cache": ai_service.embedding_cache.stats(),
+                "embedding_store": ai_service.embedding_store.stats() if ai_service.embedding_store is not None else None,
+                "embedding_batcher": ai_service.embedding_batcher.stats() if ai_service.embedding_batcher is not None else None,
+                "ingredient_table": ai_service.ingredient_table.stats() if ai_service.ingredient_table is not None else None,
+                "embedding_pool": ai_service.embedding_pool.stats() if ai_service.embedding_pool is not None else None
+            }
+            
+            # Check search caching
+            from routes.recipe_routes import search_executor, search_response_cache, semantic_response_cache
+            from routes.user_routes import profile_restrictions_cache
+            from services.pantry_index import pantry_search_service
+            from services.vector_search import vector_search_service
+            search_health = {
+                "deterministic": Config.DETERMINISTIC_RECIPES,
+                "index_version": vector_search_service.index_version,
+                "vector_backend": Config.VECTOR_SEARCH_BACKEND,
+                "local_index": vector_search_service.local_index.stats() if vector_search_service.local_index is not None else None,
+                "index_sync": db_connection.index_sync.stats() if db_connection.index_sync is not None else None,
+                "candidate_tuning": vector_search_service.candidate_tuner.stats(),
+                "pantry_index": pantry_search_service.stats(),
+                "text_index": vector_search_service.text_index.stats(),
+                "response_cache": search_response_cache.stats(),
+                "semantic_cache": semantic_response_cache.stats(),
+                "profile_cache": profile_restrictions_cache.stats(),
+                "vector_cache": vector_search_service.cache_stats(),
+                "stage_executor": search_executor.stats()
             }
             
             # Overall health status
@@ -93,7 +126,8 @@ def create_app():
                 'version': Config.API_VERSION,
                 'services': {
                     'database': db_health,
-                    'ai_service': ai_health
+                    'ai_service': ai_health,
+                    'search': search_health
                 },
                 'environment': Config.FLASK_ENV
             })
@@ -106,6 +140,19 @@ def create_app():
                 'timestamp': datetime.utcnow().isoformat()
             }), 500
     
+    # Readiness endpoint
+    @app.route('/ready')
+    def readiness_check():
+        """Report whether embeddings are available (503 while models are still loading)"""
+        from services.ai_service import ai_service
+        readiness = ai_service.readiness()
+        
+        return jsonify({
+            'status': 'ready' if readiness['ready'] else readiness['state'],
+            'timestamp': datetime.utcnow().isoformat(),
+            'ai_service': readiness
+        }), 200 if readiness['ready'] else 503
+    
     # Global error handlers
     @app.errorhandler(400)
     def bad_request(error):
@@ -143,12 +190,12 @@ def create_app():
     # Request logging middleware
     @app.before_request
     def log_request_info():
-        if request.endpoint != 'health_check':  # Don't log health checks
+        if request.endpoint not in ('health_check', 'readiness_check'):  # Don't log health checks
             logger.info(f"Request: {request.method} {request.url} from {request.remote_addr}")
     
     @app.after_request
     def log_response_info(response):
-        if request.endpoint != 'health_check':  # Don't log health check responses
+        if request.endpoint not in ('health_check', 'readiness_check'):  # Don't log health check responses
             logger.info(f"Response: {response.status_code} for {request.method} {request.url}")
         return response
     
@@ -0,0 +1,102 @@
+"""Quality and speed of compositional (pooled) query embeddings vs. the full model.
+
+Each sampled recipe contributes one query made of a random subset of its own
+ingredient names; recall@k is the fraction of queries whose source recipe is
+among the top-k cosine matches in the recipe index (Config.VECTOR_FIELD).
+
+Run from the backend directory after building the table:
+    python -m services.ingredient_vectors
+    python -m benchmarks.bench_compositional_embeddings [--queries 1000] [--k 1 5 10]
+"""
+import argparse
+import json
+import random
+import time
+
+import numpy as np
+from pymongo import MongoClient
+
+from config import Config
+from services.embedding_backends import create_embedding_backend, embedding_model_tag
+from services.ingredient_vectors import IngredientVectorTable
+from utils.validators import canonicalize_ingredients
+
+
+def load_recipe_index(collection):
+    """Recipe vectors (L2-normalized) and their canonical ingredient names"""
+    vectors = []
+    ingredient_sets = []
+
+    cursor = collection.find(
+        {Config.VECTOR_FIELD: {"$exists": True}},
+        {Config.VECTOR_FIELD: 1, "ingredients.name": 1}
+    )
+    for doc in cursor:
+        names = canonicalize_ingredients([item.get('name', '') for item in doc.get('ingredients', [])])
+        if names:
+            vectors.append(doc[Config.VECTOR_FIELD])
+            ingredient_sets.append(names)
+
+    matrix = np.asarray(vectors, dtype=np.float32)
+    matrix /= np.clip(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12, None)
+    return matrix, ingredient_sets
+
+
+def recall_at_k(matrix: np.ndarray, queries: np.ndarray, targets: np.ndarray, ks):
+    scores = queries @ matrix.T
+    target_scores = scores[np.arange(len(targets)), targets]
+    ranks = (scores > target_scores[:, None]).sum(axis=1)
+    return {f"recall@{k}": round(float((ranks < k).mean()), 4) for k in ks}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--queries', type=int, default=1000)
+    parser.add_argument('--k', type=int, nargs='+', default=[1, 5, 10])
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    client = MongoClient(Config.MONGODB_URI)
+    collection = client[Config.DATABASE_NAME][Config.RECIPES_COLLECTION]
+
+    backend = create_embedding_backend()
+    table = IngredientVectorTable.load(Config.INGREDIENT_TABLE_PATH, embedding_model_tag())
+    if table is None:
+        raise SystemExit(f"No ingredient table at {Config.INGREDIENT_TABLE_PATH}; run python -m services.ingredient_vectors")
+
+    matrix, ingredient_sets = load_recipe_index(collection)
+    rng = random.Random(args.seed)
+    targets = np.array([rng.randrange(len(ingredient_sets)) for _ in range(args.queries)])
+    queries = [
+        tuple(sorted(rng.sample(ingredient_sets[t], rng.randint(1, min(4, len(ingredient_sets[t]))))))
+        for t in targets
+    ]
+
+    started = time.perf_counter()
+    full = np.vstack([backend.encode([", ".join(query)])[0] for query in queries])
+    full_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    pooled = np.vstack([table.compose(query, backend.encode) for query in queries])
+    pooled_seconds = time.perf_counter() - started
+
+    full /= np.linalg.norm(full, axis=1, keepdims=True)
+    agreement = (full * pooled).sum(axis=1)
+
+    report = {
+        "recipes": len(ingredient_sets),
+        "queries": len(queries),
+        "tableIngredients": len(table),
+        "fullyComposedQueries": table.composed,
+        "full": dict(recall_at_k(matrix, full, targets, args.k), msPerQuery=round(full_seconds * 1000 / len(queries), 3)),
+        "pooled": dict(recall_at_k(matrix, pooled, targets, args.k), msPerQuery=round(pooled_seconds * 1000 / len(queries), 3)),
+        "cosinePooledVsFull": {
+            "mean": round(float(agreement.mean()), 4),
+            "p05": round(float(np.percentile(agreement, 5)), 4)
+        }
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
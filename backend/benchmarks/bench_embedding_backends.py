@@ -0,0 +1,55 @@
+"""Parity and latency comparison of the torch and ONNX Runtime embedding backends.
+
+Run from the backend directory:
+    python -m benchmarks.bench_embedding_backends [--samples 500] [--threads 4] [--no-quantize]
+"""
+import argparse
+import json
+import random
+
+from config import Config
+from database import SAMPLE_RECIPES
+from services.embedding_backends import OnnxEmbeddingBackend, TorchEmbeddingBackend, compare_backends
+
+INGREDIENT_VOCABULARY = sorted({
+    ingredient['name'].lower()
+    for recipe in SAMPLE_RECIPES
+    for ingredient in recipe['ingredients']
+} | {
+    'chicken', 'rice', 'beef', 'salmon', 'tofu', 'spinach', 'kale', 'onion', 'carrot', 'potato',
+    'quinoa', 'noodles', 'mushrooms', 'lentils', 'chickpeas', 'yogurt', 'milk', 'ginger', 'chili', 'lime'
+})
+
+
+def build_corpus(samples: int, seed: int = 7):
+    """Short comma-separated ingredient lists, like real /search queries"""
+    rng = random.Random(seed)
+    return [
+        ", ".join(rng.sample(INGREDIENT_VOCABULARY, rng.randint(1, 6)))
+        for _ in range(samples)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--samples', type=int, default=500)
+    parser.add_argument('--threads', type=int, default=Config.ONNX_INTRA_OP_THREADS)
+    parser.add_argument('--no-quantize', action='store_true')
+    args = parser.parse_args()
+
+    texts = build_corpus(args.samples)
+    reference = TorchEmbeddingBackend(Config.EMBEDDING_MODEL)
+    candidate = OnnxEmbeddingBackend(
+        Config.EMBEDDING_MODEL,
+        Config.ONNX_MODEL_DIR,
+        quantize=not args.no_quantize,
+        intra_op_threads=args.threads
+    )
+
+    report = compare_backends(reference, candidate, texts)
+    report['onnx_config'] = candidate.describe()
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
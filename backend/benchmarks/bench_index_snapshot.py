@@ -0,0 +1,98 @@
+"""Cold-open time and per-worker memory of mmap'd index snapshots vs. private in-memory copies.
+
+Starts several worker processes that each open the same snapshot and serve queries, then
+reads proportional set size (PSS) from /proc/<pid>/smaps_rollup (Linux only): shared
+pages are split between the processes mapping them, so PSS shows the real per-worker cost.
+
+Run from the backend directory:
+    python -m benchmarks.bench_index_snapshot [--recipes 200000] [--workers 4]
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from config import Config
+from services.index_snapshot import open_snapshot, write_snapshot
+from services.local_vector_index import ExactVectorIndex
+
+
+def pss_mb(pid):
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            if line.startswith('Pss:'):
+                return int(line.split()[1]) / 1024
+    return None
+
+
+def worker(root, private, queries, ready, done):
+    started = time.perf_counter()
+    index = open_snapshot(root, dimension=queries.shape[1])
+    if private:
+        # What every worker paid before snapshots: its own copy of the matrix
+        index._base = np.array(index._base)
+    open_ms = (time.perf_counter() - started) * 1000
+
+    for query in queries:
+        index.search(query, 5, mood='comfort')
+
+    ready.put(open_ms)
+    done.wait()
+
+
+def run(root, workers, private, queries):
+    context = multiprocessing.get_context('spawn')
+    ready = context.Queue()
+    done = context.Event()
+    processes = [context.Process(target=worker, args=(root, private, queries, ready, done)) for _ in range(workers)]
+    for process in processes:
+        process.start()
+
+    open_ms = [ready.get() for _ in processes]
+    pss = [pss_mb(process.pid) for process in processes]
+    done.set()
+    for process in processes:
+        process.join()
+
+    return {
+        "meanOpenMs": round(float(np.mean(open_ms)), 2),
+        "pssPerWorkerMB": round(float(np.mean(pss)), 1),
+        "pssTotalMB": round(float(np.sum(pss)), 1)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--recipes', type=int, default=200000)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--queries', type=int, default=50)
+    parser.add_argument('--dimension', type=int, default=Config.VECTOR_DIMENSION)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(7)
+    index = ExactVectorIndex(args.dimension, capacity=args.recipes)
+    for start in range(0, args.recipes, 50000):
+        count = min(50000, args.recipes - start)
+        documents = [{"name": f"recipe-{start + offset}", "mood": "comfort"} for offset in range(count)]
+        index.add(documents, rng.standard_normal((count, args.dimension), dtype=np.float32))
+    queries = rng.standard_normal((args.queries, args.dimension), dtype=np.float32)
+
+    with tempfile.TemporaryDirectory() as root:
+        write_snapshot(index, root)
+        del index
+
+        print(json.dumps({
+            "recipes": args.recipes,
+            "workers": args.workers,
+            "matrixMB": round(args.recipes * args.dimension * 4 / 2 ** 20, 1),
+            "mmapShared": run(root, args.workers, False, queries),
+            "privateCopies": run(root, args.workers, True, queries)
+        }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+"""Per-request CPU cost of the recipe heuristics: legacy substring scans vs. the compiled classifier.
+
+Run from the backend directory:
+    python -m benchmarks.bench_ingredient_classifier [--requests 20000]
+"""
+import argparse
+import json
+import random
+import time
+
+from services.ingredient_classifier import INGREDIENT_CATEGORIES, classify_ingredient, classify_ingredients
+from services.ai_service import AIService
+
+VOCABULARY = sorted(INGREDIENT_CATEGORIES) + [
+    'bell peppers', 'cherry tomatoes', 'garlic', 'basil', 'butter', 'eggs', 'lemon', 'ginger',
+    'mushrooms', 'tofu', 'lentils', 'chickpeas', 'brown rice', 'chicken thighs', 'heavy cream'
+]
+
+
+def legacy_estimate_amount(ingredient):
+    ingredient_lower = ingredient.lower()
+    if any(protein in ingredient_lower for protein in ['chicken', 'beef', 'pork', 'fish', 'salmon', 'turkey']):
+        return "300-400g"
+    if any(veg in ingredient_lower for veg in ['tomato', 'onion', 'pepper', 'carrot', 'potato']):
+        return "2-3 pieces"
+    if any(green in ingredient_lower for green in ['lettuce', 'spinach', 'kale', 'arugula']):
+        return "2 cups"
+    if any(grain in ingredient_lower for grain in ['pasta', 'rice', 'quinoa', 'noodles']):
+        return "200g"
+    if any(dairy in ingredient_lower for dairy in ['cheese', 'milk', 'cream', 'yogurt']):
+        return "100ml"
+    return "1 cup"
+
+
+def legacy_estimate_cook_time(ingredients):
+    has_meat = any(meat in ' '.join(ingredients).lower() for meat in ['chicken', 'beef', 'pork', 'fish'])
+    has_grains = any(grain in ' '.join(ingredients).lower() for grain in ['rice', 'pasta', 'quinoa'])
+    if has_meat and has_grains:
+        return "35-45 min"
+    elif has_meat:
+        return "25-35 min"
+    elif has_grains:
+        return "20-30 min"
+    return "15-25 min"
+
+
+def legacy_request(ingredients):
+    """What _generate_smart_recipes computed per request before the classifier"""
+    mood_templates = {
+        "comfort": {"styles": ["Hearty", "Cozy", "Warm", "Creamy"], "emojis": ["🍲", "🥘", "🍝", "🧀"]},
+        "fresh": {"styles": ["Light", "Crisp", "Vibrant", "Garden-Fresh"], "emojis": ["🥗", "🌿", "🥒", "🍅"]},
+        "indulgent": {"styles": ["Rich", "Decadent", "Luxurious", "Gourmet"], "emojis": ["🥩", "🍫", "🧈", "✨"]}
+    }
+    template = mood_templates["comfort"]
+    for _ in range(3):
+        legacy_estimate_cook_time(ingredients)
+        [legacy_estimate_amount(ingredient) for ingredient in ingredients[:8]]
+    return template
+
+
+def classifier_request(service, ingredients):
+    """What _generate_smart_recipes computes per request now"""
+    profile = classify_ingredients(ingredients)
+    service._estimate_cook_time(profile)
+    service._format_ingredients(profile)
+    return profile
+
+
+def time_per_request(fn, requests):
+    started = time.perf_counter()
+    for ingredients in requests:
+        fn(ingredients)
+    return (time.perf_counter() - started) * 1e6 / len(requests)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=20000)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    requests = [rng.sample(VOCABULARY, rng.randint(1, 8)) for _ in range(args.requests)]
+
+    # Models are not needed for the heuristics
+    service = AIService()
+
+    legacy_us = time_per_request(legacy_request, requests)
+    classify_ingredient.cache_clear()
+    cold_us = time_per_request(lambda ingredients: classifier_request(service, ingredients), requests)
+    warm_us = time_per_request(lambda ingredients: classifier_request(service, ingredients), requests)
+
+    print(json.dumps({
+        "requests": args.requests,
+        "legacy_us_per_request": round(legacy_us, 2),
+        "classifier_us_per_request_cold": round(cold_us, 2),
+        "classifier_us_per_request_warm": round(warm_us, 2),
+        "speedup_warm": round(legacy_us / warm_us, 2)
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""Recall@k and latency of the IVF index against exact search across nprobe settings.
+
+Vectors are drawn around random cluster centres, a rough stand-in for recipe embeddings
+(which cluster by cuisine and ingredient) that gives partitioning something to find.
+
+Run from the backend directory:
+    python -m benchmarks.bench_ivf_recall [--recipes 200000] [--nprobe 1 2 4 8 16 32]
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from config import Config
+from services.local_vector_index import ExactVectorIndex, IVFVectorIndex
+
+
+def clustered_vectors(count, centres, rng, spread=1.2):
+    dimension = centres.shape[1]
+    labels = rng.integers(0, len(centres), count)
+    return centres[labels] + spread * rng.standard_normal((count, dimension), dtype=np.float32)
+
+
+def fill(index, vectors, chunk=50000):
+    for start in range(0, len(vectors), chunk):
+        documents = [{"name": f"recipe-{row}"} for row in range(start, min(start + chunk, len(vectors)))]
+        index.add(documents, vectors[start:start + chunk])
+
+
+def run_queries(index, queries, limit):
+    results = []
+    latencies = []
+    for query in queries:
+        started = time.perf_counter()
+        hits = index.search(query, limit, threshold=0.0)
+        latencies.append((time.perf_counter() - started) * 1000)
+        results.append({document["name"] for document, _ in hits})
+    latencies = np.array(latencies)
+    return results, {
+        "meanMs": round(float(latencies.mean()), 3),
+        "p95Ms": round(float(np.percentile(latencies, 95)), 3)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--recipes', type=int, default=200000)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--limit', type=int, default=10)
+    parser.add_argument('--nlist', type=int, default=0)
+    parser.add_argument('--nprobe', type=int, nargs='+', default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument('--dimension', type=int, default=Config.VECTOR_DIMENSION)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(7)
+    centres = rng.standard_normal((2000, args.dimension), dtype=np.float32)
+    vectors = clustered_vectors(args.recipes, centres, rng)
+    queries = clustered_vectors(args.queries, centres, rng)
+
+    exact = ExactVectorIndex(args.dimension, capacity=args.recipes)
+    fill(exact, vectors)
+    truth, exact_latency = run_queries(exact, queries, args.limit)
+    del exact
+
+    started = time.perf_counter()
+    ivf = IVFVectorIndex(args.dimension, nlist=args.nlist)
+    fill(ivf, vectors)
+    ivf.train()
+    build_seconds = time.perf_counter() - started
+
+    sweep = []
+    for nprobe in args.nprobe:
+        ivf.nprobe = nprobe
+        found, latency = run_queries(ivf, queries, args.limit)
+        recall = np.mean([len(expected & got) / len(expected) for expected, got in zip(truth, found)])
+        sweep.append({"nprobe": nprobe, f"recall@{args.limit}": round(float(recall), 4), **latency})
+
+    stats = ivf.stats()
+    print(json.dumps({
+        "recipes": args.recipes,
+        "nlist": stats["nlist"],
+        "buildSeconds": round(build_seconds, 2),
+        "largestPartition": stats["largestPartition"],
+        "exact": exact_latency,
+        "ivf": sweep
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""Latency and memory of the in-process exact vector index at several catalog sizes.
+
+Vectors are random unit vectors, so results measure the engine, not retrieval quality.
+
+Run from the backend directory:
+    python -m benchmarks.bench_local_vector_search [--sizes 10000 100000 1000000] [--queries 200]
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from config import Config
+from services.local_vector_index import ExactVectorIndex
+
+MOODS = ['comfort', 'fresh', 'indulgent']
+
+
+def build_index(size, dimension, rng, chunk=50000):
+    """Fill an index chunk by chunk so the float32 matrix is the only large allocation"""
+    index = ExactVectorIndex(dimension, capacity=size)
+    for start in range(0, size, chunk):
+        count = min(chunk, size - start)
+        documents = [
+            {"name": f"recipe-{start + offset}", "mood": MOODS[(start + offset) % len(MOODS)], "tags": []}
+            for offset in range(count)
+        ]
+        index.add(documents, rng.standard_normal((count, dimension), dtype=np.float32))
+    return index
+
+
+def measure(index, queries, limit, mood):
+    latencies = []
+    for query in queries:
+        started = time.perf_counter()
+        index.search(query, limit, mood=mood)
+        latencies.append((time.perf_counter() - started) * 1000)
+    latencies = np.array(latencies)
+    return {
+        "meanMs": round(float(latencies.mean()), 3),
+        "p50Ms": round(float(np.percentile(latencies, 50)), 3),
+        "p95Ms": round(float(np.percentile(latencies, 95)), 3)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000])
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--limit', type=int, default=5)
+    parser.add_argument('--dimension', type=int, default=Config.VECTOR_DIMENSION)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(7)
+    queries = rng.standard_normal((args.queries, args.dimension), dtype=np.float32)
+
+    report = []
+    for size in args.sizes:
+        started = time.perf_counter()
+        index = build_index(size, args.dimension, rng)
+        build_seconds = time.perf_counter() - started
+
+        # First filtered search builds the mood mask; keep it out of the latency numbers
+        index.search(queries[0], args.limit, mood='comfort')
+
+        stats = index.stats()
+        report.append({
+            "recipes": size,
+            "buildSeconds": round(build_seconds, 2),
+            "vectorMB": round(stats["vectorBytes"] / 2 ** 20, 1),
+            "maskMB": round(stats["maskBytes"] / 2 ** 20, 2),
+            "unfiltered": measure(index, queries, args.limit, None),
+            "moodFiltered": measure(index, queries, args.limit, 'comfort')
+        })
+        del index
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""Latency of pantry coverage ranking over a synthetic catalog.
+
+Recipes draw their ingredients from a Zipf-like vocabulary, so a few ingredients
+(onion, garlic...) appear in a large share of recipes, as in real catalogs. Pantries
+mix common and rare items.
+
+Run from the backend directory:
+    python -m benchmarks.bench_pantry_search [--recipes 1000000] [--pantry-size 6]
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from services.pantry_index import PantryIndex
+
+
+def ingredient_name(item):
+    # Letters only, as canonical ingredient names drop digits
+    letters = ''
+    while True:
+        item, remainder = divmod(item, 26)
+        letters += chr(ord('a') + remainder)
+        if not item:
+            return f"ingredient{letters}"
+
+
+def synthetic_catalog(recipes, vocabulary_size, mean_ingredients, rng):
+    weights = 1.0 / np.arange(1, vocabulary_size + 1)
+    weights /= weights.sum()
+    sizes = np.clip(rng.poisson(mean_ingredients, recipes), 2, 25)
+    draws = rng.choice(vocabulary_size, int(sizes.sum()), p=weights)
+
+    documents = []
+    start = 0
+    for row, size in enumerate(sizes):
+        ingredients = [{"name": ingredient_name(item)} for item in draws[start:start + size]]
+        documents.append({"name": f"recipe-{row}", "ingredients": ingredients})
+        start += size
+    return documents, weights
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--recipes', type=int, default=1000000)
+    parser.add_argument('--vocabulary', type=int, default=5000)
+    parser.add_argument('--mean-ingredients', type=float, default=9)
+    parser.add_argument('--pantry-size', type=int, default=6)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--limit', type=int, default=10)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(7)
+    started = time.perf_counter()
+    documents, weights = synthetic_catalog(args.recipes, args.vocabulary, args.mean_ingredients, rng)
+    index = PantryIndex.from_documents(documents)
+    build_seconds = time.perf_counter() - started
+
+    latencies = []
+    for _ in range(args.queries):
+        pantry = [ingredient_name(item) for item in rng.choice(args.vocabulary, args.pantry_size, replace=False, p=weights)]
+        started = time.perf_counter()
+        index.search(pantry, args.limit)
+        latencies.append((time.perf_counter() - started) * 1000)
+    latencies = np.array(latencies)
+
+    print(json.dumps({
+        "recipes": args.recipes,
+        "buildSeconds": round(build_seconds, 2),
+        "index": index.stats(),
+        "pantrySize": args.pantry_size,
+        "p50Ms": round(float(np.percentile(latencies, 50)), 3),
+        "p95Ms": round(float(np.percentile(latencies, 95)), 3),
+        "maxMs": round(float(latencies.max()), 3)
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""Throughput of parallel recipe ingestion as the number of embedding workers grows.
+
+Synthetic recipes are embedded by ParallelIndexer and written to a collection that
+discards them, so the figures measure embedding and the single writer's bookkeeping,
+not MongoDB. Scaling efficiency is the throughput with n workers over n times the
+throughput with one; per-worker rows/s show whether any worker lags.
+
+Run from the backend directory:
+    python -m benchmarks.bench_parallel_ingestion [--recipes 20000] [--workers-list 1,2,4]
+"""
+import argparse
+import json
+
+import numpy as np
+
+from benchmarks.bench_pantry_search import synthetic_catalog
+from import_recipes import DiscardCollection
+from services.parallel_indexer import ParallelIndexer
+from services.vector_search import vector_search_service
+
+
+def ingest(documents, workers, shard_size):
+    shards = (documents[start:start + shard_size] for start in range(0, len(documents), shard_size))
+    with ParallelIndexer(vector_search_service, workers=workers, shard_size=shard_size) as indexer:
+        for _ in indexer.index_shards(shards, DiscardCollection()):
+            pass
+        return indexer.report()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--recipes', type=int, default=20000)
+    parser.add_argument('--vocabulary', type=int, default=5000)
+    parser.add_argument('--mean-ingredients', type=float, default=9)
+    parser.add_argument('--shard-size', type=int, default=256)
+    parser.add_argument('--workers-list', default='1,2,4')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(7)
+    documents, _ = synthetic_catalog(args.recipes, args.vocabulary, args.mean_ingredients, rng)
+
+    runs = []
+    baseline = None
+    for workers in [int(value) for value in args.workers_list.split(',')]:
+        report = ingest(documents, workers, args.shard_size)
+        rate = report['recipesPerSecond']
+        if baseline is None:
+            baseline = rate / workers
+        runs.append({
+            "workers": workers,
+            "recipesPerSecond": rate,
+            "scalingEfficiency": round(rate / (workers * baseline), 2) if baseline else None,
+            "writerWaitSeconds": report['writerWaitSeconds'],
+            "writerWriteSeconds": report['writerWriteSeconds'],
+            "workerRowsPerSecond": [worker['rowsPerSecond'] for worker in report['perWorker']]
+        })
+
+    print(json.dumps({
+        "recipes": args.recipes,
+        "shardSize": args.shard_size,
+        "runs": runs
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
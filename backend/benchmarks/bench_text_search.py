@@ -0,0 +1,73 @@
+"""Latency of the in-process BM25 keyword fallback over a synthetic catalog.
+
+Names, descriptions and ingredient lists draw words from a Zipf-like vocabulary, so
+common words have long posting lists. Queries are short ingredient lists, as sent to
+/recipes/search.
+
+Run from the backend directory:
+    python -m benchmarks.bench_text_search [--recipes 200000] [--query-terms 3]
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from benchmarks.bench_pantry_search import ingredient_name
+from services.text_index import BM25Index
+
+
+def synthetic_catalog(recipes, vocabulary_size, rng):
+    weights = 1.0 / np.arange(1, vocabulary_size + 1)
+    weights /= weights.sum()
+    draws = rng.choice(vocabulary_size, recipes * 20, p=weights).reshape(recipes, 20)
+
+    documents = []
+    for row, words in enumerate(draws):
+        words = [ingredient_name(item) for item in words]
+        documents.append({
+            "name": f"{words[0]} {words[1]}",
+            "description": ' '.join(words[2:10]),
+            "tags": words[10:12],
+            "difficulty": ('Easy', 'Medium', 'Hard')[row % 3],
+            "ingredients": [{"name": word} for word in words[12:]]
+        })
+    return documents, weights
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--recipes', type=int, default=200000)
+    parser.add_argument('--vocabulary', type=int, default=5000)
+    parser.add_argument('--query-terms', type=int, default=3)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--limit', type=int, default=5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(7)
+    documents, weights = synthetic_catalog(args.recipes, args.vocabulary, rng)
+    started = time.perf_counter()
+    index = BM25Index.from_documents(documents)
+    build_seconds = time.perf_counter() - started
+
+    latencies = []
+    for _ in range(args.queries):
+        terms = [ingredient_name(item) for item in rng.choice(args.vocabulary, args.query_terms, replace=False, p=weights)]
+        started = time.perf_counter()
+        index.search(terms, args.limit)
+        latencies.append((time.perf_counter() - started) * 1000)
+    latencies = np.array(latencies)
+
+    print(json.dumps({
+        "recipes": args.recipes,
+        "buildSeconds": round(build_seconds, 2),
+        "index": index.stats(),
+        "queryTerms": args.query_terms,
+        "p50Ms": round(float(np.percentile(latencies, 50)), 3),
+        "p95Ms": round(float(np.percentile(latencies, 95)), 3),
+        "maxMs": round(float(latencies.max()), 3)
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -22,12 +22,96 @@ class Config:
     # Vector Search Configuration
     VECTOR_INDEX_NAME = 'recipe_vector_search'
     VECTOR_DIMENSION = 384  # sentence-transformers/all-MiniLM-L6-v2
+    VECTOR_FIELD = 'ingredientVector'  # Recipe field holding the embedding; also the Atlas index path
     SIMILARITY_THRESHOLD = 0.7
+    VECTOR_CANDIDATE_RATIO = float(os.getenv('VECTOR_CANDIDATE_RATIO', 10))  # Atlas numCandidates per fetched result
+    VECTOR_MAX_CANDIDATES = int(os.getenv('VECTOR_MAX_CANDIDATES', 2000))  # Cap on numCandidates (Atlas allows 10000)
+    VECTOR_SEARCH_RETRIES = int(os.getenv('VECTOR_SEARCH_RETRIES', 1))  # Widened retries when results come back short
+    VECTOR_STATS_ALPHA = float(os.getenv('VECTOR_STATS_ALPHA', 0.1))  # EWMA weight of per-filter selectivity stats
+    VECTOR_SEARCH_BACKEND = os.getenv('VECTOR_SEARCH_BACKEND', 'atlas')  # atlas | exact | ivf (in-process)
+    IVF_NLIST = int(os.getenv('IVF_NLIST', 0))  # Partitions, 0 means sqrt(recipes)
+    IVF_NPROBE = int(os.getenv('IVF_NPROBE', 8))  # Partitions scored per query
+    IVF_MIN_TRAIN = int(os.getenv('IVF_MIN_TRAIN', 4096))  # Below this the ivf index searches exactly
+    IVF_TRAIN_SAMPLE = int(os.getenv('IVF_TRAIN_SAMPLE', 65536))  # Vectors used to fit the k-means centroids
+    
+    # Local Index Sync (keeps exact/ivf backends current without full reloads)
+    INDEX_SYNC_ENABLED = os.getenv('INDEX_SYNC_ENABLED', 'true').lower() == 'true'
+    INDEX_SYNC_MODE = os.getenv('INDEX_SYNC_MODE', 'auto')  # auto | change_stream | poll
+    INDEX_SYNC_POLL_INTERVAL = float(os.getenv('INDEX_SYNC_POLL_INTERVAL', 2))  # Seconds between polls / stream waits
+    INDEX_SYNC_RECONCILE_INTERVAL = float(os.getenv('INDEX_SYNC_RECONCILE_INTERVAL', 300))  # Seconds between full _id scans for hard deletes when polling; soft deletes apply on the next poll
+    INDEX_SYNC_BATCH_SIZE = int(os.getenv('INDEX_SYNC_BATCH_SIZE', 500))
+    INDEX_SYNC_LOOKBACK = float(os.getenv('INDEX_SYNC_LOOKBACK', 60))  # Seconds of updatedAt re-scanned per poll: longest stamp-to-commit delay of a write
+    
+    # Index Snapshots (exact backend: workers mmap one shared copy; publish with python -m services.index_snapshot)
+    INDEX_SNAPSHOT_DIR = os.getenv('INDEX_SNAPSHOT_DIR', 'ai_models/index_snapshots')  # Empty disables snapshots
+    INDEX_SNAPSHOT_KEEP = int(os.getenv('INDEX_SNAPSHOT_KEEP', 2))  # Published versions kept on disk
     MAX_RESULTS = 10
+    MAX_BATCH_QUERIES = int(os.getenv('MAX_BATCH_QUERIES', 100))  # Queries per /recipes/search/batch call
+    
+    # Search Response Caching
+    DETERMINISTIC_RECIPES = os.getenv('DETERMINISTIC_RECIPES', 'true').lower() == 'true'  # Same request, same recipes
+    SEARCH_CACHE_SIZE = int(os.getenv('SEARCH_CACHE_SIZE', 2048))  # 0 disables the response cache
+    SEARCH_CACHE_TTL = float(os.getenv('SEARCH_CACHE_TTL', 3600))  # Seconds, 0 means no expiry
+    
+    # Semantic Response Caching (near-duplicate similar-mode queries: same mood and filters, embeddings within the threshold)
+    SEMANTIC_CACHE_SIZE = int(os.getenv('SEMANTIC_CACHE_SIZE', 512))  # 0 disables the cache
+    SEMANTIC_CACHE_THRESHOLD = float(os.getenv('SEMANTIC_CACHE_THRESHOLD', 0.97))  # Minimum cosine similarity of query embeddings
+    
+    # Vector Search Result Caching (keyed on the quantized query embedding, filters and index version)
+    VECTOR_CACHE_SIZE = int(os.getenv('VECTOR_CACHE_SIZE', 4096))  # 0 disables the cache
+    VECTOR_CACHE_TTL = float(os.getenv('VECTOR_CACHE_TTL', 0))  # Seconds, 0 means no expiry
+    VECTOR_CACHE_BYPASS = os.getenv('VECTOR_CACHE_BYPASS', 'false').lower() == 'true'  # Debugging: always search, never read the cache
+    
+    # Profile Dietary Restrictions Caching (searches naming a user without dietaryRestrictions)
+    PROFILE_CACHE_SIZE = int(os.getenv('PROFILE_CACHE_SIZE', 1024))  # 0 disables the cache
+    PROFILE_CACHE_TTL = float(os.getenv('PROFILE_CACHE_TTL', 60))  # Seconds before another worker's profile edit is seen
+    
+    # Pantry Search (mode=pantry: rank recipes by ingredients missing from the user's pantry)
+    PANTRY_STAPLES = os.getenv('PANTRY_STAPLES', 'salt,water,black pepper,oil,olive oil,vegetable oil').split(',')  # Assumed on hand
+    PANTRY_INDEX_MAX_AGE = float(os.getenv('PANTRY_INDEX_MAX_AGE', 300))  # Seconds before a background rebuild, 0 means never
+    
+    # Keyword Fallback Search (in-process BM25 over name, description, tags and ingredients)
+    TEXT_INDEX_REBUILD_INTERVAL = float(os.getenv('TEXT_INDEX_REBUILD_INTERVAL', 30))  # Min seconds between rebuilds after recipe changes
+    
+    # Search Stage Concurrency (embedding, then prediction and vector search side by side)
+    SEARCH_WORKERS = int(os.getenv('SEARCH_WORKERS', 8))  # Threads shared by all /search requests
+    SEARCH_MAX_PENDING = int(os.getenv('SEARCH_MAX_PENDING', 32))  # Queued stages beyond that run inline
+    SEARCH_DEADLINE = float(os.getenv('SEARCH_DEADLINE', 3))  # Seconds for all stages of one request
+    SEARCH_EMBEDDING_TIMEOUT = float(os.getenv('SEARCH_EMBEDDING_TIMEOUT', 1))
+    SEARCH_PREDICT_TIMEOUT = float(os.getenv('SEARCH_PREDICT_TIMEOUT', 2))
+    SEARCH_VECTOR_TIMEOUT = float(os.getenv('SEARCH_VECTOR_TIMEOUT', 2))
+    
+    # Vector Indexing Configuration
+    INDEX_BATCH_SIZE = int(os.getenv('INDEX_BATCH_SIZE', 256))  # Recipes embedded and written per chunk
+    INGEST_WORKERS = int(os.getenv('INGEST_WORKERS', 0))  # Processes embedding chunks in parallel for multi-chunk ingestion, 0 embeds in-process
     
     # AI Model Configuration
     AI_MODEL_PATH = 'ai_models/recipe_model.pkl'
     EMBEDDING_MODEL = 'sentence-transformers/all-MiniLM-L6-v2'
+    EMBEDDING_CACHE_SIZE = int(os.getenv('EMBEDDING_CACHE_SIZE', 4096))  # 0 disables the cache
+    EMBEDDING_CACHE_TTL = float(os.getenv('EMBEDDING_CACHE_TTL', 0))  # Seconds, 0 means no expiry
+    EMBEDDING_STORE_PATH = os.getenv('EMBEDDING_STORE_PATH', 'ai_models/embedding_store')  # Empty disables the store
+    EMBEDDING_STORE_DTYPE = os.getenv('EMBEDDING_STORE_DTYPE', 'float32')  # float32 or float16
+    
+    # Embedding Backend Configuration
+    EMBEDDING_BACKEND = os.getenv('EMBEDDING_BACKEND', 'torch')  # torch (reference) or onnx
+    ONNX_MODEL_DIR = os.getenv('ONNX_MODEL_DIR', 'ai_models/onnx')
+    ONNX_QUANTIZE = os.getenv('ONNX_QUANTIZE', 'true').lower() == 'true'  # Dynamic int8 quantization
+    ONNX_INTRA_OP_THREADS = int(os.getenv('ONNX_INTRA_OP_THREADS', 0))  # 0 lets ONNX Runtime decide
+    
+    # Embedding Request Batching (0 ms window disables coalescing)
+    EMBEDDING_BATCH_WINDOW_MS = float(os.getenv('EMBEDDING_BATCH_WINDOW_MS', 2))
+    EMBEDDING_MAX_BATCH_SIZE = int(os.getenv('EMBEDDING_MAX_BATCH_SIZE', 32))
+    EMBEDDING_REQUEST_TIMEOUT = float(os.getenv('EMBEDDING_REQUEST_TIMEOUT', 10))  # Seconds
+    
+    # Out-of-process Embedding Workers (0 keeps models in the web process)
+    EMBEDDING_WORKERS = int(os.getenv('EMBEDDING_WORKERS', 0))
+    EMBEDDING_WORKER_MAX_ROWS = int(os.getenv('EMBEDDING_WORKER_MAX_ROWS', 256))  # Shared-memory rows per worker
+    EMBEDDING_WORKER_TIMEOUT = float(os.getenv('EMBEDDING_WORKER_TIMEOUT', 30))  # Seconds per request
+    
+    # Compositional Query Embeddings (pooled from per-ingredient vectors)
+    COMPOSITIONAL_EMBEDDINGS = os.getenv('COMPOSITIONAL_EMBEDDINGS', 'false').lower() == 'true'
+    INGREDIENT_TABLE_PATH = os.getenv('INGREDIENT_TABLE_PATH', 'ai_models/ingredient_vectors.npz')
     
     # CORS Configuration
     CORS_ORIGINS = [
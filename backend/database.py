@@ -106,7 +106,7 @@ class DatabaseManager:
                     "fields": [
                         {
                             "type": "vector",
-                            "path": "embedding",
+                            "path": Config.VECTOR_FIELD,
                             "numDimensions": Config.VECTOR_DIMENSION,
                             "similarity": "cosine"
                         },
@@ -114,9 +114,21 @@ class DatabaseManager:
                             "type": "filter",
                             "path": "mood"
                         },
+                        {
+                            "type": "filter",
+                            "path": "tags"
+                        },
                         {
                             "type": "filter",
                             "path": "difficulty"
+                        },
+                        {
+                            "type": "filter",
+                            "path": "dietFlags"
+                        },
+                        {
+                            "type": "filter",
+                            "path": "dietFlagsVersion"
                         }
                     ]
                 }
@@ -171,7 +183,7 @@ SAMPLE_RECIPES = [
         ],
         "tip": "Save some pasta water before draining - it's the secret to a silky smooth sauce that hugs every strand! ✨",
         "tags": ["pasta", "cream", "tomatoes", "comfort", "easy"],
-        "embedding": None  # Will be populated with vector embeddings
+        Config.VECTOR_FIELD: None  # Will be populated with vector embeddings
     },
     {
         "name": "Garden Fresh Salad Bowl",
@@ -199,7 +211,7 @@ SAMPLE_RECIPES = [
         ],
         "tip": "Add the avocado at the very end to keep it perfectly green and creamy! 🥑",
         "tags": ["salad", "vegetables", "fresh", "healthy", "quick"],
-        "embedding": None
+        Config.VECTOR_FIELD: None
     },
     {
         "name": "Decadent Chocolate Delight",
@@ -227,7 +239,7 @@ SAMPLE_RECIPES = [
         ],
         "tip": "Don't overbake - the center should still be slightly jiggly for the perfect texture! 🍰",
         "tags": ["chocolate", "dessert", "indulgent", "rich", "special"],
-        "embedding": None
+        Config.VECTOR_FIELD: None
     }
 ]
 
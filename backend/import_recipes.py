@@ -0,0 +1,362 @@
+"""Bulk import recipes from JSONL or CSV into the recipes collection.
+
+Records stream through a generator pipeline (read -> normalize -> validate -> batch) and
+each batch is embedded in one encoder pass and written with one unordered bulk upsert,
+so memory stays flat however large the file is. After every written batch the byte
+offset of the next unread record is checkpointed; an interrupted import started again
+with the same arguments resumes there. Upserts are keyed on recipe name, so a batch
+replayed after a crash is harmless. With --workers, batches are embedded by that many
+worker processes (each loading the model once) while this process stays the only writer.
+
+CSV files need a header row. List columns (ingredients, instructions, tags) hold either
+a JSON array or items separated by "|".
+
+Run from the backend directory:
+    python import_recipes.py recipes.jsonl
+    python import_recipes.py recipes.csv --batch-size 512 --uri mongodb://localhost:27017
+    python import_recipes.py recipes.jsonl --dry-run    # validate and embed, write nothing
+    python import_recipes.py recipes.jsonl --workers 4  # embed in 4 processes, write from this one
+"""
+import argparse
+import csv
+import json
+import logging
+import os
+import sys
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from config import Config
+from utils.validators import validate_recipe_data
+
+LIST_FIELDS = ('ingredients', 'instructions', 'tags')
+
+
+class OffsetCounter:
+    """Byte offset just past the last line handed out by read_lines"""
+
+    def __init__(self, offset: int = 0):
+        self.offset = offset
+
+
+def read_lines(f, counter: OffsetCounter) -> Iterator[str]:
+    """Decoded lines of a binary file, advancing counter by each line's size in bytes"""
+    for line in f:
+        counter.offset += len(line)
+        yield line.decode('utf-8')
+
+
+def read_jsonl(f, start: int) -> Iterator[Tuple[Optional[Dict[str, Any]], int, Optional[str]]]:
+    """(record, offset after it, parse error) per non-blank line from byte offset start"""
+    f.seek(start)
+    counter = OffsetCounter(start)
+    for line in read_lines(f, counter):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield None, counter.offset, f"Invalid JSON: {e}"
+            continue
+        if not isinstance(record, dict):
+            yield None, counter.offset, "Record is not a JSON object"
+            continue
+        yield record, counter.offset, None
+
+
+def read_csv(f, start: int) -> Iterator[Tuple[Optional[Dict[str, Any]], int, Optional[str]]]:
+    """(record, offset after it, parse error) per CSV row, resuming at byte offset start
+
+    The header is re-read on resume. Quoted cells may span lines: csv.reader pulls lines
+    one at a time, so the counter is exact at every row boundary.
+    """
+    counter = OffsetCounter(0)
+    header = next(csv.reader(read_lines(f, counter)), None)
+    if header is None:
+        return
+    fields = [field.strip() for field in header]
+
+    if start > counter.offset:
+        f.seek(start)
+        counter.offset = start
+    for row in csv.reader(read_lines(f, counter)):
+        if not any(cell.strip() for cell in row):
+            continue
+        if len(row) > len(fields):
+            yield None, counter.offset, f"Row has {len(row)} cells, header has {len(fields)}"
+            continue
+        yield {field: cell for field, cell in zip(fields, row) if cell != ''}, counter.offset, None
+
+
+def split_list(value: Any) -> Any:
+    """CSV list cell as a list: a JSON array, or items separated by "|" """
+    if not isinstance(value, str):
+        return value
+    value = value.strip()
+    if value.startswith('['):
+        try:
+            return json.loads(value)
+        except ValueError:
+            pass
+    return [item.strip() for item in value.split('|') if item.strip()]
+
+
+def normalize_record(record: Dict[str, Any]) -> Dict[str, Any]:
+    """Coerce a raw record into the recipes collection schema"""
+    recipe = {key: value for key, value in record.items() if key not in ('_id', Config.VECTOR_FIELD, 'updatedAt')}
+    for field in LIST_FIELDS:
+        if field in recipe:
+            recipe[field] = split_list(recipe[field])
+
+    # Plain ingredient strings become {"name": ...} objects, like the sample recipes' ingredients
+    if isinstance(recipe.get('ingredients'), list):
+        recipe['ingredients'] = [
+            {"name": item.strip()} if isinstance(item, str) else item
+            for item in recipe['ingredients']
+            if not isinstance(item, str) or item.strip()
+        ]
+    if isinstance(recipe.get('rating'), str):
+        try:
+            recipe['rating'] = float(recipe['rating'])
+        except ValueError:
+            pass
+    if isinstance(recipe.get('name'), str):
+        recipe['name'] = recipe['name'].strip()
+    return recipe
+
+
+def validated_records(records: Iterator[Tuple[Optional[Dict[str, Any]], int, Optional[str]]], report: Dict[str, Any]) -> Iterator[Tuple[Optional[Dict[str, Any]], int]]:
+    """(recipe or None if rejected, offset after it); rejections are counted in report"""
+    for record, offset, error in records:
+        recipe = None
+        if error is None:
+            recipe = normalize_record(record)
+            validation = validate_recipe_data(recipe)
+            if not validation['valid']:
+                error = validation['message']
+                recipe = None
+
+        if recipe is None:
+            report['rejected'] += 1
+            if len(report['rejections']) < 20:
+                report['rejections'].append({"offset": offset, "name": (record or {}).get('name'), "error": error})
+        yield recipe, offset
+
+
+class ReadPosition:
+    """How far batches read: the offset after the last record, and whether the input ran out"""
+
+    def __init__(self, offset: int = 0):
+        self.offset = offset
+        self.exhausted = False
+
+
+def batches(records: Iterator[Tuple[Optional[Dict[str, Any]], int]], batch_size: int, limit: Optional[int] = None,
+            position: Optional[ReadPosition] = None) -> Iterator[Tuple[List[Dict[str, Any]], int]]:
+    """(recipes, offset after the last record read) per batch of 1 to batch_size valid recipes
+
+    Stops after exactly `limit` valid recipes. Records read after the last batch (trailing
+    rejections) only move position, so they never cost an empty index call.
+    """
+    position = position if position is not None else ReadPosition()
+    if limit is not None and limit <= 0:
+        return
+    batch = []
+    accepted = 0
+    for recipe, offset in records:
+        position.offset = offset
+        if recipe is not None:
+            batch.append(recipe)
+            accepted += 1
+        if batch and (len(batch) >= batch_size or accepted == limit):
+            yield batch, offset
+            batch = []
+            if accepted == limit:
+                return
+    position.exhausted = True
+    if batch:
+        yield batch, position.offset
+
+
+def index_in_parallel(indexer, batch_stream: Iterator[Tuple[List[Dict[str, Any]], int]], collection) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """(offset, chunk stats) per batch, embedded by the indexer's worker processes and written here in input order"""
+    offsets = deque()
+
+    def shards():
+        for batch, offset in batch_stream:
+            offsets.append(offset)
+            yield batch
+
+    for _, stats in indexer.index_shards(shards(), collection):
+        yield offsets.popleft(), stats
+
+
+def load_checkpoint(path: str, input_path: str) -> Optional[Dict[str, Any]]:
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        checkpoint = json.load(f)
+    if checkpoint.get('input') != os.path.abspath(input_path):
+        raise SystemExit(f"Checkpoint {path} belongs to {checkpoint.get('input')}; pass --restart or another --checkpoint")
+    if checkpoint.get('offset', 0) > os.path.getsize(input_path):
+        raise SystemExit(f"Checkpoint {path} points past the end of {input_path}; pass --restart if the file was replaced")
+    return checkpoint
+
+
+def save_checkpoint(path: Optional[str], checkpoint: Dict[str, Any]):
+    if path is None:
+        return
+    # Written aside and renamed, so a crash never leaves a torn checkpoint
+    checkpoint['updatedAt'] = datetime.utcnow().isoformat()
+    temporary = f"{path}.tmp"
+    with open(temporary, 'w') as f:
+        json.dump(checkpoint, f)
+    os.replace(temporary, path)
+
+
+class DiscardCollection:
+    """Stand-in for the recipes collection that accepts bulk writes and keeps nothing (--dry-run)"""
+
+    name = 'dry-run'
+
+    def __init__(self):
+        self.operations = 0
+
+    def bulk_write(self, operations, ordered=True):
+        self.operations += len(operations)
+
+
+def open_collection(args):
+    if args.dry_run:
+        return DiscardCollection()
+
+    from pymongo import MongoClient
+
+    uri = args.uri or Config.MONGODB_URI
+    if not uri:
+        raise SystemExit("No MongoDB URI: set MONGODB_URI, pass --uri, or use --dry-run")
+    client = MongoClient(uri, serverSelectionTimeoutMS=5000)
+    client.admin.command('ping')
+    return client[args.database][args.collection]
+
+
+def import_recipes(args) -> Dict[str, Any]:
+    from services.ai_service import ai_service
+    from services.parallel_indexer import ParallelIndexer
+    from services.vector_search import vector_search_service
+
+    input_format = args.format or ('csv' if args.input.lower().endswith('.csv') else 'jsonl')
+    # Dry runs write nothing, so they neither resume nor checkpoint
+    checkpoint_path = None if args.dry_run else args.checkpoint or f"{args.input}.checkpoint"
+    checkpoint = None if args.restart or checkpoint_path is None else load_checkpoint(checkpoint_path, args.input)
+    if checkpoint is not None and checkpoint.get('completed'):
+        print(f"{args.input} was already imported ({checkpoint['imported']} recipes); pass --restart to import it again")
+        return checkpoint
+    if checkpoint is None:
+        checkpoint = {"input": os.path.abspath(args.input), "format": input_format, "offset": 0, "imported": 0, "rejected": 0, "failed": 0}
+    elif checkpoint['offset']:
+        print(f"Resuming {args.input} at byte {checkpoint['offset']} ({checkpoint['imported']} recipes already imported)")
+
+    collection = open_collection(args)
+    indexer = None
+    if args.workers > 0:
+        # Each worker loads its own copy of the model; this process only writes
+        indexer = ParallelIndexer(vector_search_service, args.workers, args.batch_size).start()
+    elif not ai_service.wait_until_ready(timeout=args.model_timeout) or ai_service.embedding_model is None:
+        raise SystemExit("Embedding model did not load; cannot embed recipes")
+
+    # Counts for this run; the checkpoint adds them to those of earlier runs
+    report = {"imported": 0, "rejected": 0, "failed": 0, "rejections": [], "failures": []}
+    previous = {key: checkpoint[key] for key in ('imported', 'rejected', 'failed')}
+    total_bytes = os.path.getsize(args.input)
+    started = time.perf_counter()
+    last_progress = started
+
+    try:
+        with open(args.input, 'rb') as f:
+            reader = read_csv if input_format == 'csv' else read_jsonl
+            records = validated_records(reader(f, checkpoint['offset']), report)
+            position = ReadPosition(checkpoint['offset'])
+            batch_stream = batches(records, args.batch_size, args.limit, position)
+            if indexer is None:
+                written = ((offset, vector_search_service.index_recipe_batch(batch, collection)) for batch, offset in batch_stream)
+            else:
+                written = index_in_parallel(indexer, batch_stream, collection)
+
+            for offset, stats in written:
+                report['imported'] += stats['indexed']
+                report['failed'] += len(stats['failures'])
+                report['failures'].extend(stats['failures'][:max(0, 20 - len(report['failures']))])
+
+                # Only once the batch is written, so a crash replays it rather than skipping it
+                checkpoint['offset'] = offset
+                for key, count in previous.items():
+                    checkpoint[key] = count + report[key]
+                save_checkpoint(checkpoint_path, checkpoint)
+
+                now = time.perf_counter()
+                if now - last_progress >= args.progress_interval:
+                    last_progress = now
+                    print(
+                        f"{report['imported']} imported, {report['rejected']} rejected, {report['failed']} failed; "
+                        f"{offset * 100.0 / max(total_bytes, 1):.1f}% of file; "
+                        f"{report['imported'] / (now - started):.1f} docs/s",
+                        flush=True
+                    )
+
+        if indexer is not None:
+            report['parallel'] = indexer.report()
+    finally:
+        if indexer is not None:
+            indexer.stop()
+
+    elapsed = time.perf_counter() - started
+    # Rejected records after the last batch still move the checkpoint past them
+    checkpoint['offset'] = position.offset
+    for key, count in previous.items():
+        checkpoint[key] = count + report[key]
+    # A --limit that stops on the file's last record has read it all as well
+    checkpoint['completed'] = position.exhausted or position.offset >= total_bytes
+    save_checkpoint(checkpoint_path, checkpoint)
+
+    report.update(
+        input=args.input,
+        format=input_format,
+        target='dry-run' if args.dry_run else f"{args.database}.{args.collection}",
+        seconds=round(elapsed, 2),
+        docsPerSecond=round(report['imported'] / elapsed, 1) if elapsed > 0 else 0.0,
+        checkpoint={key: checkpoint[key] for key in ('offset', 'imported', 'rejected', 'failed', 'completed')} if checkpoint_path else None
+    )
+    return report
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('input', help='JSONL or CSV file of recipes')
+    parser.add_argument('--format', choices=('jsonl', 'csv'), help='Input format (default: from the file extension)')
+    parser.add_argument('--batch-size', type=int, default=Config.INDEX_BATCH_SIZE, help='Recipes embedded and written per batch')
+    parser.add_argument('--uri', help='MongoDB URI (default: MONGODB_URI), e.g. mongodb://localhost:27017')
+    parser.add_argument('--database', default=Config.DATABASE_NAME)
+    parser.add_argument('--collection', default=Config.RECIPES_COLLECTION)
+    parser.add_argument('--checkpoint', help='Checkpoint file (default: <input>.checkpoint)')
+    parser.add_argument('--restart', action='store_true', help='Ignore an existing checkpoint and start from the top')
+    parser.add_argument('--limit', type=int, help='Stop after this many valid recipes')
+    parser.add_argument('--workers', type=int, default=Config.INGEST_WORKERS, help='Embedding worker processes (default: INGEST_WORKERS; 0 embeds in this process)')
+    parser.add_argument('--dry-run', action='store_true', help='Validate and embed without writing to MongoDB')
+    parser.add_argument('--model-timeout', type=float, default=300, help='Seconds to wait for the embedding model')
+    parser.add_argument('--progress-interval', type=float, default=10, help='Seconds between progress lines')
+    parser.add_argument('--verbose', action='store_true', help='Log every batch')
+    args = parser.parse_args(argv)
+    args.batch_size = max(1, args.batch_size)
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING, format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+
+    report = import_recipes(args)
+    print(json.dumps(report, indent=2, default=str))
+    return 0 if report.get('failed', 0) == 0 else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,14 +1,39 @@
 from flask import Blueprint, request, jsonify
 from services.ai_service import ai_service
+from services.pantry_index import pantry_search_service
 from services.vector_search import vector_search_service
-from utils.validators import validate_search_request
+from config import Config
+from utils.cache import LRUCache, SemanticCache, content_id
+from utils.executor import BoundedExecutor, STAGE_TIMED_OUT
+from utils.database import db_connection
+from routes.user_routes import profile_restrictions_cache
+from utils.validators import validate_search_request, validate_batch_search_request, parse_dietary_restrictions
 from datetime import datetime
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 
 recipe_bp = Blueprint('recipes', __name__)
 
+# Full /search responses keyed on the search query; only valid while recipe generation is deterministic
+search_response_cache = LRUCache(Config.SEARCH_CACHE_SIZE, Config.SEARCH_CACHE_TTL)
+vector_search_service.add_index_listener(search_response_cache.clear)
+
+# Responses for near-duplicate queries ("pasta, garlic, tomato" vs "garlic pasta tomatoes"), matched on the query embedding
+semantic_response_cache = SemanticCache(
+    Config.VECTOR_DIMENSION, Config.SEMANTIC_CACHE_SIZE, Config.SEMANTIC_CACHE_THRESHOLD, Config.SEARCH_CACHE_TTL
+)
+vector_search_service.add_index_listener(semantic_response_cache.clear)
+vector_search_service.add_index_listener(pantry_search_service.mark_stale)
+
+# Responses built while the model was loading have no query embedding; drop any that slipped in
+ai_service.add_ready_callback(search_response_cache.clear)
+ai_service.add_ready_callback(semantic_response_cache.clear)
+
+# Shared by all /search requests to run the embedding, prediction and database search stages
+search_executor = BoundedExecutor(Config.SEARCH_WORKERS, Config.SEARCH_MAX_PENDING, name='search-stage')
+
 @recipe_bp.route('/search', methods=['POST'])
 def search_recipes():
     """Search for recipes based on ingredients and mood using AI and vector search"""
@@ -35,26 +60,92 @@ def search_recipes():
         ingredients = [ing.strip().lower() for ing in ingredients_str.split(',') if ing.strip()]
         mood = data.get('mood', 'comfort').lower()
         user_name = data.get('userName', 'Chef')
+        # Canonical classes in sorted order, so one diet in any order or spelling shares cache entries
+        diet = tuple(sorted(set(_resolve_dietary_restrictions(data))))
+        mode = data.get('mode', 'similar').lower().strip()
+        max_missing = data.get('maxMissing')
+        bypass_cache = data.get('bypassCache', False)
+        search_query = {
+            'ingredients': ingredients,
+            'mood': mood,
+            'userName': user_name,
+            'dietaryRestrictions': list(diet),
+            'mode': mode
+        }
+        
+        logger.info(f"Recipe search request - User: {user_name}, Ingredients: {ingredients}, Mood: {mood}, Diet: {list(diet)}, Mode: {mode}")
         
-        logger.info(f"Recipe search request - User: {user_name}, Ingredients: {ingredients}, Mood: {mood}")
+        # Serve repeated queries without touching the AI service or the database
+        cache_key = (tuple(ingredients), mood, diet, mode, max_missing)
+        if Config.DETERMINISTIC_RECIPES and not bypass_cache:
+            cached = search_response_cache.get(cache_key)
+            if cached is not None:
+                logger.info(f"Recipe search served from cache - User: {user_name}")
+                return jsonify(_build_search_response(cached, search_query, cached=True))
         
-        # Use AI service to generate personalized recipes (primary results)
-        ai_recipes = ai_service.predict_recipes(ingredients, mood)
+        deadline = time.monotonic() + Config.SEARCH_DEADLINE
+        # Read before the stages run, so a model that finishes loading mid-request still counts as not ready
+        model_ready = ai_service.is_ready()
+        timed_out = []
+        failed = []
         
-        # Search for similar recipes in database (supplementary results)
-        similar_recipes = vector_search_service.search_similar_recipes(
-            ingredients, 
-            mood=mood, 
-            limit=2
+        # Embed the query once; both branches reuse it ([] sends them to their non-vector paths)
+        query_embedding = _stage_result(
+            'embedding',
+            search_executor.submit(ai_service.generate_ingredient_embedding, ingredients),
+            Config.SEARCH_EMBEDDING_TIMEOUT, deadline, timed_out, failed
         )
         
-        # Combine results - prioritize AI-generated recipes
-        all_recipes = ai_recipes[:3]  # Take top 3 AI recipes
+        # Near-duplicate queries share a response; pantry results list exact missing ingredients, so only similar mode
+        semantic_key = (mood, diet)
+        use_semantic_cache = Config.DETERMINISTIC_RECIPES and not bypass_cache and mode == 'similar' and len(query_embedding) > 0
+        if use_semantic_cache:
+            cached = semantic_response_cache.get(semantic_key, query_embedding)
+            if cached is not None:
+                logger.info(f"Recipe search served from semantic cache - User: {user_name}")
+                search_response_cache.put(cache_key, cached)
+                return jsonify(_build_search_response(cached, search_query, cached=True))
         
-        # If we have fewer than 3 AI recipes, supplement with database recipes
-        if len(all_recipes) < 3 and similar_recipes:
-            needed = 3 - len(all_recipes)
-            all_recipes.extend(similar_recipes[:needed])
+        # AI recipes and database recipes run concurrently
+        ai_future = search_executor.submit(
+            ai_service.predict_recipes, ingredients, mood, ingredient_embedding=query_embedding
+        )
+        if mode == 'pantry':
+            # Database recipes ranked by how few ingredients are missing from the pantry
+            database_stage = 'pantry_search'
+            database_future = search_executor.submit(
+                pantry_search_service.search,
+                vector_search_service.recipes_collection,
+                ingredients,
+                limit=3,
+                max_missing=max_missing,
+                diet=diet
+            )
+        else:
+            database_stage = 'vector_search'
+            database_future = search_executor.submit(
+                vector_search_service.search_similar_recipes,
+                ingredients,
+                mood=mood,
+                limit=2,
+                query_embedding=query_embedding,
+                diet=diet,
+                bypass_cache=bypass_cache
+            )
+        ai_recipes = _stage_result('prediction', ai_future, Config.SEARCH_PREDICT_TIMEOUT, deadline, timed_out, failed)
+        database_recipes = _stage_result(database_stage, database_future, Config.SEARCH_VECTOR_TIMEOUT, deadline, timed_out, failed)
+        
+        if mode == 'pantry':
+            # Cookable database recipes come first, AI recipes fill the remaining slots
+            all_recipes = (database_recipes + ai_recipes)[:3]
+        else:
+            # Combine results - prioritize AI-generated recipes
+            all_recipes = ai_recipes[:3]  # Take top 3 AI recipes
+            
+            # If we have fewer than 3 AI recipes, supplement with database recipes
+            if len(all_recipes) < 3 and database_recipes:
+                needed = 3 - len(all_recipes)
+                all_recipes.extend(database_recipes[:needed])
         
         # Ensure we have exactly 3 recipes (pad with fallback if needed)
         while len(all_recipes) < 3:
@@ -80,8 +171,6 @@ def search_recipes():
         # Add unique IDs and ensure consistent format
         final_recipes = []
         for i, recipe in enumerate(all_recipes[:3]):
-            recipe['id'] = f"recipe_{i+1}_{datetime.now().timestamp()}"
-            
             # Ensure all required fields exist
             recipe.setdefault('rating', 4.5)
             recipe.setdefault('image', '🍽️')
@@ -89,27 +178,27 @@ def search_recipes():
             recipe.setdefault('tags', ingredients[:3] + [mood])
             recipe.setdefault('mood', mood)
             
+            # Content-derived IDs keep identical recipes identical across requests
+            recipe['id'] = content_id(recipe, prefix=f"recipe_{i+1}")
+            
             final_recipes.append(recipe)
         
-        # Build response
-        response = {
-            'success': True,
+        result = {
             'recipes': final_recipes,
-            'searchQuery': {
-                'ingredients': ingredients,
-                'mood': mood,
-                'userName': user_name
-            },
-            'metadata': {
-                'totalResults': len(final_recipes),
-                'aiGenerated': len(ai_recipes),
-                'databaseMatches': len(similar_recipes),
-                'timestamp': datetime.utcnow().isoformat()
-            }
+            'aiGenerated': len(ai_recipes),
+            'databaseMatches': len(database_recipes),
+            'timedOutStages': timed_out,
+            'failedStages': failed
         }
+        # Responses missing a stage, or built by the rule-based fallback while the model loads,
+        # are partial; let the next request try again
+        if Config.DETERMINISTIC_RECIPES and model_ready and not timed_out and not failed:
+            search_response_cache.put(cache_key, result)
+            if use_semantic_cache:
+                semantic_response_cache.put(semantic_key, query_embedding, result)
         
         logger.info(f"Recipe search completed - User: {user_name}, Results: {len(final_recipes)}")
-        return jsonify(response)
+        return jsonify(_build_search_response(result, search_query))
         
     except Exception as e:
         logger.error(f"Recipe search error: {str(e)}", exc_info=True)
@@ -118,6 +207,132 @@ def search_recipes():
             'code': 'SEARCH_ERROR'
         }), 500
 
+def _resolve_dietary_restrictions(data):
+    """Restrictions from the request, else from the user's stored profile preferences
+    
+    Profile restrictions are cached per user for PROFILE_CACHE_TTL, so a repeated search
+    is answered from the response cache without a MongoDB read.
+    """
+    if data.get('dietaryRestrictions') is not None:
+        restrictions, _ = parse_dietary_restrictions(data['dietaryRestrictions'])
+        return restrictions
+    
+    user_name = data.get('userName', '').strip()
+    if not user_name:
+        return ()
+    
+    cached = profile_restrictions_cache.get(user_name)
+    if cached is not None:
+        return cached
+    
+    try:
+        user = db_connection.get_collection(Config.USERS_COLLECTION).find_one(
+            {'name': user_name},
+            {'preferences.dietaryRestrictions': 1}
+        )
+    except Exception as e:
+        logger.warning(f"Could not load dietary restrictions for {user_name}: {e}")
+        return ()
+    
+    restrictions = ()
+    if user is not None:
+        # Profiles are free-form; ignore entries that are not known restriction classes
+        restrictions, _ = parse_dietary_restrictions(user.get('preferences', {}).get('dietaryRestrictions') or [])
+    # Unknown users are cached too; a failed lookup above is not
+    profile_restrictions_cache.put(user_name, restrictions)
+    return restrictions
+
+def _stage_result(stage, future, timeout, deadline, timed_out, failed):
+    """Result of one search stage, or an empty list if it failed or missed its timeout
+    
+    The stage is appended to failed or timed_out accordingly.
+    """
+    try:
+        result = search_executor.result(stage, future, timeout, deadline)
+    except Exception as e:
+        logger.error(f"Search stage '{stage}' failed: {e}")
+        failed.append(stage)
+        return []
+    
+    if result is STAGE_TIMED_OUT:
+        timed_out.append(stage)
+        return []
+    return result
+
+def _build_search_response(result, search_query, cached=False):
+    """Wrap search results with the per-request fields that are never cached"""
+    return {
+        'success': True,
+        'recipes': result['recipes'],
+        'searchQuery': search_query,
+        'metadata': {
+            'totalResults': len(result['recipes']),
+            'aiGenerated': result['aiGenerated'],
+            'databaseMatches': result['databaseMatches'],
+            'cached': cached,
+            'timedOutStages': result['timedOutStages'],
+            'failedStages': result['failedStages'],
+            'timestamp': datetime.utcnow().isoformat()
+        }
+    }
+
+@recipe_bp.route('/search/batch', methods=['POST'])
+def search_recipes_batch():
+    """Generate recipes for many ingredient/mood queries in one call"""
+    try:
+        data = request.get_json()
+        
+        # Validate request
+        validation_result = validate_batch_search_request(data, Config.MAX_BATCH_QUERIES)
+        if not validation_result['valid']:
+            return jsonify({
+                'error': validation_result['message'],
+                'code': 'VALIDATION_ERROR'
+            }), 400
+        
+        # Parse every query the same way as single searches
+        queries = []
+        for query in data['queries']:
+            queries.append({
+                'ingredients': [ing.strip().lower() for ing in query['ingredients'].split(',') if ing.strip()],
+                'mood': query.get('mood', 'comfort').lower()
+            })
+        
+        logger.info(f"Batch recipe search request - Queries: {len(queries)}")
+        
+        # One embedding pass and one model call for the whole batch
+        batch_recipes = ai_service.predict_recipes_batch(queries)
+        
+        results = []
+        for query, recipes in zip(queries, batch_recipes):
+            final_recipes = []
+            for i, recipe in enumerate(recipes[:3]):
+                recipe.setdefault('tags', query['ingredients'][:3] + [query['mood']])
+                recipe.setdefault('mood', query['mood'])
+                recipe['id'] = content_id(recipe, prefix=f"recipe_{i+1}")
+                final_recipes.append(recipe)
+            
+            results.append({
+                'recipes': final_recipes,
+                'searchQuery': query
+            })
+        
+        return jsonify({
+            'success': True,
+            'results': results,
+            'metadata': {
+                'totalQueries': len(results),
+                'timestamp': datetime.utcnow().isoformat()
+            }
+        })
+        
+    except Exception as e:
+        logger.error(f"Batch recipe search error: {str(e)}", exc_info=True)
+        return jsonify({
+            'error': 'An error occurred while searching for recipes. Please try again.',
+            'code': 'SEARCH_ERROR'
+        }), 500
+
 @recipe_bp.route('/recipe/<recipe_id>', methods=['GET'])
 def get_recipe_details(recipe_id):
     """Get detailed recipe information by ID"""
@@ -198,7 +413,7 @@ def recipe_health_check():
     """Health check for recipe service"""
     try:
         # Test AI service
-        ai_status = "healthy" if ai_service.embedding_model else "degraded"
+        ai_status = "healthy" if ai_service.is_ready() else "degraded"
         
         # Test vector search
         vector_status = "healthy" if vector_search_service.recipes_collection else "unavailable"
@@ -1,4 +1,5 @@
 from flask import Blueprint, request, jsonify
+from utils.cache import LRUCache
 from utils.database import db_connection
 from utils.validators import sanitize_input
 from config import Config
@@ -9,6 +10,9 @@ logger = logging.getLogger(__name__)
 
 user_bp = Blueprint('users', __name__)
 
+# Canonical dietary restrictions per user name, read by /recipes/search so cached repeats skip MongoDB
+profile_restrictions_cache = LRUCache(Config.PROFILE_CACHE_SIZE, Config.PROFILE_CACHE_TTL)
+
 @user_bp.route('/profile', methods=['POST'])
 def create_or_update_profile():
     """Create or update user profile"""
@@ -52,6 +56,7 @@ def create_or_update_profile():
             },
             upsert=True
         )
+        profile_restrictions_cache.discard(name)
         
         return jsonify({
             'success': True,
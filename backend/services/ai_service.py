@@ -1,61 +1,389 @@
 import pickle
+import random
 import numpy as np
-from sentence_transformers import SentenceTransformer
 import logging
-from typing import List, Dict, Any
+import threading
+import time
+from typing import List, Dict, Any, Callable, FrozenSet, Optional
 from config import Config
+from services.embedding_backends import create_embedding_backend, embedding_model_tag
+from services.embedding_batcher import EmbeddingBatcher
+from services.embedding_pool import EmbeddingWorkerPool
+from services.embedding_store import EmbeddingStore
+from services.ingredient_classifier import IngredientProfile, classify_ingredients
+from services.ingredient_vectors import IngredientVectorTable
+from utils.cache import LRUCache, stable_hash
+from utils.validators import canonicalize_ingredients
 import os
 
 logger = logging.getLogger(__name__)
 
+# Recipe templates based on mood
+MOOD_TEMPLATES = {
+    "comfort": {
+        "styles": ["Hearty", "Cozy", "Warm", "Creamy"],
+        "cooking_methods": ["simmered", "baked", "slow-cooked", "braised"],
+        "emojis": ["🍲", "🥘", "🍝", "🧀"]
+    },
+    "fresh": {
+        "styles": ["Light", "Crisp", "Vibrant", "Garden-Fresh"],
+        "cooking_methods": ["tossed", "grilled", "steamed", "raw"],
+        "emojis": ["🥗", "🌿", "🥒", "🍅"]
+    },
+    "indulgent": {
+        "styles": ["Rich", "Decadent", "Luxurious", "Gourmet"],
+        "cooking_methods": ["seared", "roasted", "caramelized", "flambéed"],
+        "emojis": ["🥩", "🍫", "🧈", "✨"]
+    }
+}
+
+# Ingredient amounts by category, first match wins
+CATEGORY_AMOUNTS = [
+    ("protein", "300-400g"),
+    ("veg", "2-3 pieces"),
+    ("greens", "2 cups"),
+    ("grain", "200g"),
+    ("dairy", "100ml")
+]
+
+# Ingredient-based emojis by category, first match wins
+CATEGORY_EMOJIS = [
+    ("meat", "🍖"),
+    ("fish", "🐟"),
+    ("pasta", "🍝"),
+    ("greens", "🥗"),
+    ("grain", "🍚")
+]
+
+# Mood-based emoji fallback
+MOOD_EMOJIS = {
+    "comfort": "🍲",
+    "fresh": "🌿",
+    "indulgent": "✨"
+}
+
+# Model loading states
+MODEL_STATE_NOT_LOADED = 'not_loaded'
+MODEL_STATE_LOADING = 'loading'
+MODEL_STATE_READY = 'ready'
+MODEL_STATE_FAILED = 'failed'
+
+def embedding_text(ingredients: List[str]) -> str:
+    """Text the encoder sees for an ingredient list, for queries and indexed recipes alike
+
+    Built from the canonical list (lowercased, de-duplicated, sorted), so the same
+    ingredient set always embeds to the same vector on both sides of a search.
+    """
+    return ", ".join(canonicalize_ingredients(ingredients))
+
 class AIService:
     def __init__(self):
         self.model = None
         self.embedding_model = None
-        self._load_models()
+        self.embedding_batcher = None
+        self.embedding_pool = None
+        self.ingredient_table = None
+        self.embedding_cache = LRUCache(Config.EMBEDDING_CACHE_SIZE, Config.EMBEDDING_CACHE_TTL)
+        self.embedding_store = self._open_embedding_store()
+        
+        # Models load on a background thread so importing the service never blocks
+        self.model_state = MODEL_STATE_NOT_LOADED
+        self.model_error = None
+        self.load_seconds = None
+        self._state_lock = threading.Lock()
+        self._ready_event = threading.Event()
+        self._ready_callbacks = []
+    
+    def start_loading(self):
+        """Start loading models in the background if that has not happened yet"""
+        with self._state_lock:
+            if self.model_state != MODEL_STATE_NOT_LOADED:
+                return
+            self.model_state = MODEL_STATE_LOADING
+        
+        loader = threading.Thread(target=self._load_models, name='ai-model-loader', daemon=True)
+        loader.start()
+    
+    def is_ready(self) -> bool:
+        """Whether the embedding model is loaded and serving"""
+        return self.model_state == MODEL_STATE_READY
+    
+    def wait_until_ready(self, timeout: Optional[float] = None) -> bool:
+        """Block until model loading finishes (successfully or not)"""
+        self.start_loading()
+        self._ready_event.wait(timeout)
+        return self.is_ready()
+    
+    def add_ready_callback(self, callback: Callable[[], None]):
+        """Run callback once the embedding model is ready (immediately if it already is)"""
+        with self._state_lock:
+            if self.model_state != MODEL_STATE_READY:
+                self._ready_callbacks.append(callback)
+                return
+        callback()
+    
+    def readiness(self) -> Dict[str, Any]:
+        """Model loading status for readiness probes"""
+        return {
+            "state": self.model_state,
+            "ready": self.is_ready(),
+            "embedding_model": "loaded" if self.embedding_model else "not_loaded",
+            "embedding_backend": self.embedding_model.describe() if self.embedding_model else None,
+            "prediction_model": "loaded" if self.model else "not_loaded",
+            "load_seconds": self.load_seconds,
+            "error": self.model_error
+        }
+    
+    def _open_embedding_store(self, backend_name: Optional[str] = None):
+        """Open the on-disk embedding store shared by all workers on this host"""
+        if not Config.EMBEDDING_STORE_PATH:
+            return None
+        
+        try:
+            return EmbeddingStore(
+                Config.EMBEDDING_STORE_PATH,
+                embedding_model_tag(backend_name),
+                Config.VECTOR_DIMENSION,
+                Config.EMBEDDING_STORE_DTYPE
+            ).open()
+        except Exception as e:
+            logger.error(f"Failed to open embedding store, continuing without it: {e}")
+            return None
     
     def _load_models(self):
         """Load AI models for recipe prediction and embeddings"""
+        started = time.perf_counter()
         try:
-            # Load your trained recipe prediction model
-            model_path = Config.AI_MODEL_PATH
-            if os.path.exists(model_path):
-                with open(model_path, 'rb') as f:
-                    self.model = pickle.load(f)
-                logger.info("Recipe prediction model loaded successfully")
+            # Per-ingredient vectors can serve known queries before the transformer is up
+            if Config.COMPOSITIONAL_EMBEDDINGS:
+                self.ingredient_table = self._load_ingredient_table()
+            
+            # Host both models in worker processes when configured
+            if Config.EMBEDDING_WORKERS > 0:
+                self.embedding_pool = self._start_embedding_pool()
+            
+            if self.embedding_pool is not None:
+                # The pool stands in for the embedding backend and the prediction model
+                self.embedding_model = self.embedding_pool
+                self.model = self.embedding_pool.predictor
             else:
-                logger.warning(f"Model file not found at {model_path}, using fallback")
+                # Load your trained recipe prediction model
+                model_path = Config.AI_MODEL_PATH
+                if os.path.exists(model_path):
+                    with open(model_path, 'rb') as f:
+                        self.model = pickle.load(f)
+                    logger.info("Recipe prediction model loaded successfully")
+                else:
+                    logger.warning(f"Model file not found at {model_path}, using fallback")
+                
+                # Load the configured embedding backend
+                self.embedding_model = self._load_embedding_backend()
             
-            # Load sentence transformer for embeddings
-            self.embedding_model = SentenceTransformer(Config.EMBEDDING_MODEL)
-            logger.info("Embedding model loaded successfully")
+            logger.info(f"Embedding model loaded successfully ({self.embedding_model.name} backend)")
+            
+            # Concurrent request threads share batched encoder runs
+            if Config.EMBEDDING_BATCH_WINDOW_MS > 0:
+                self.embedding_batcher = EmbeddingBatcher(
+                    self.embedding_model.encode,
+                    window_ms=Config.EMBEDDING_BATCH_WINDOW_MS,
+                    max_batch_size=Config.EMBEDDING_MAX_BATCH_SIZE
+                )
+            
+            with self._state_lock:
+                self.model_state = MODEL_STATE_READY
+                callbacks, self._ready_callbacks = self._ready_callbacks, []
             
         except Exception as e:
             logger.error(f"Failed to load AI models: {e}")
             # Continue without models - will use fallback methods
+            self.model_error = str(e)
+            with self._state_lock:
+                self.model_state = MODEL_STATE_FAILED
+                callbacks, self._ready_callbacks = [], []
+        
+        finally:
+            self.load_seconds = round(time.perf_counter() - started, 2)
+            self._ready_event.set()
+        
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                logger.error(f"Model ready callback failed: {e}")
+    
+    def _load_ingredient_table(self):
+        """Load the precomputed ingredient vector table for compositional embeddings"""
+        try:
+            table = IngredientVectorTable.load(Config.INGREDIENT_TABLE_PATH, embedding_model_tag())
+            if table is None:
+                logger.warning(f"No ingredient vector table at {Config.INGREDIENT_TABLE_PATH}, using the full model")
+            else:
+                logger.info(f"Ingredient vector table loaded with {len(table)} ingredients")
+            return table
+        except Exception as e:
+            logger.error(f"Failed to load ingredient vector table: {e}")
+            return None
+    
+    def _start_embedding_pool(self):
+        """Start the embedding worker processes, or None to load models in-process"""
+        try:
+            return EmbeddingWorkerPool(
+                Config.EMBEDDING_WORKERS,
+                Config.VECTOR_DIMENSION,
+                Config.EMBEDDING_BACKEND,
+                Config.AI_MODEL_PATH,
+                max_rows=Config.EMBEDDING_WORKER_MAX_ROWS,
+                request_timeout=Config.EMBEDDING_WORKER_TIMEOUT
+            ).start()
+        except Exception as e:
+            logger.error(f"Failed to start embedding worker pool, loading models in-process: {e}")
+            return None
+    
+    def _load_embedding_backend(self):
+        """Create the configured embedding backend, falling back to the torch reference"""
+        try:
+            return create_embedding_backend(Config.EMBEDDING_BACKEND)
+        except Exception as e:
+            if Config.EMBEDDING_BACKEND == 'torch':
+                raise
+            logger.error(f"Failed to load {Config.EMBEDDING_BACKEND} embedding backend, using torch: {e}")
+            backend = create_embedding_backend('torch')
+            # Stored vectors must come from the backend actually serving
+            self.embedding_store = self._open_embedding_store('torch')
+            return backend
     
     def generate_ingredient_embedding(self, ingredients: List[str]) -> List[float]:
         """Generate vector embedding for ingredients list"""
         try:
-            if not self.embedding_model:
+            # Identical ingredient sets share one cache entry regardless of order or case
+            cache_key = canonicalize_ingredients(ingredients)
+            if not cache_key:
                 return []
             
-            # Combine ingredients into searchable text
-            ingredient_text = ", ".join([ing.lower().strip() for ing in ingredients])
+            known = self._lookup_embedding(cache_key)
+            if known is not None:
+                return known
+            
+            # Until the model is ready callers take the rule-based path
+            if not self.embedding_model:
+                self.start_loading()
+                return []
             
             # Generate embedding
-            embedding = self.embedding_model.encode(ingredient_text)
-            return embedding.tolist()
+            vector = self._encode_text(embedding_text(cache_key))
+            return self._remember_embedding(cache_key, vector)
             
         except Exception as e:
             logger.error(f"Error generating embedding: {e}")
             return []
     
-    def predict_recipes(self, ingredients: List[str], mood: str = "comfort") -> List[Dict[str, Any]]:
-        """Use AI model to predict best recipe matches"""
+    def generate_query_embeddings(self, ingredient_lists: List[List[str]]) -> List[List[float]]:
+        """Generate query embeddings for many ingredient lists, encoding all misses in one pass"""
+        embeddings = [[] for _ in ingredient_lists]
+        missing = {}
+        
+        try:
+            for i, ingredients in enumerate(ingredient_lists):
+                cache_key = canonicalize_ingredients(ingredients)
+                if not cache_key:
+                    continue
+                
+                known = self._lookup_embedding(cache_key)
+                if known is not None:
+                    embeddings[i] = known
+                else:
+                    missing.setdefault(cache_key, []).append(i)
+            
+            if not missing:
+                return embeddings
+            
+            if not self.embedding_model:
+                self.start_loading()
+                return embeddings
+            
+            # One forward pass for every query not already known
+            cache_keys = list(missing)
+            vectors = self.embedding_model.encode([embedding_text(key) for key in cache_keys], batch_size=64)
+            
+            for cache_key, vector in zip(cache_keys, vectors):
+                embedding = self._remember_embedding(cache_key, vector)
+                for i in missing[cache_key]:
+                    embeddings[i] = embedding
+            
+        except Exception as e:
+            logger.error(f"Error generating batch embeddings: {e}")
+        
+        return embeddings
+    
+    def _lookup_embedding(self, cache_key) -> Optional[List[float]]:
+        """Find a query embedding without running the encoder"""
+        cached = self.embedding_cache.get(cache_key)
+        if cached is not None:
+            return list(cached)
+        
+        # Combine ingredients into searchable text
+        ingredient_text = embedding_text(cache_key)
+        
+        # Reuse a vector any worker on this host has already computed
+        if self.embedding_store is not None:
+            stored = self.embedding_store.get(ingredient_text)
+            if stored is not None:
+                embedding = stored.tolist()
+                self.embedding_cache.put(cache_key, tuple(embedding))
+                return embedding
+        
+        # Known ingredients are pooled from the table; only unknown ones hit the model
+        if self.ingredient_table is not None:
+            encode_unknown = self.embedding_model.encode if self.embedding_model else None
+            composed = self.ingredient_table.compose(cache_key, encode_unknown)
+            if composed is not None:
+                embedding = composed.tolist()
+                self.embedding_cache.put(cache_key, tuple(embedding))
+                return embedding
+        
+        return None
+    
+    def _remember_embedding(self, cache_key, vector: np.ndarray) -> List[float]:
+        """Cache a freshly encoded embedding in memory and in the shared store"""
+        embedding = vector.tolist()
+        self.embedding_cache.put(cache_key, tuple(embedding))
+        
+        if self.embedding_store is not None:
+            try:
+                self.embedding_store.put(embedding_text(cache_key), vector)
+            except Exception as e:
+                logger.warning(f"Failed to persist embedding: {e}")
+        
+        return embedding
+
+    def _encode_text(self, text: str) -> np.ndarray:
+        """Encode one text, through the request batcher when enabled"""
+        if self.embedding_batcher is not None:
+            return self.embedding_batcher.encode(text, timeout=Config.EMBEDDING_REQUEST_TIMEOUT)
+        return self.embedding_model.encode([text])[0]
+    
+    def generate_ingredient_embeddings(self, ingredient_lists: List[List[str]]) -> np.ndarray:
+        """Generate vector embeddings for many ingredient lists in a single encoder pass"""
+        if not self.embedding_model:
+            self.start_loading()
+            raise RuntimeError("Embedding model not loaded")
+
+        # Combine each ingredient list into searchable text, formatted exactly like queries
+        ingredient_texts = [embedding_text(ingredients) for ingredients in ingredient_lists]
+
+        # One forward pass over the whole batch
+        return self.embedding_model.encode(ingredient_texts, batch_size=64)
+
+    def predict_recipes(self, ingredients: List[str], mood: str = "comfort",
+                        ingredient_embedding: Optional[List[float]] = None) -> List[Dict[str, Any]]:
+        """Use AI model to predict best recipe matches
+        
+        Pass ingredient_embedding when the caller already has it ([] means none is available).
+        """
         try:
             # Generate embedding for input
-            ingredient_embedding = self.generate_ingredient_embedding(ingredients)
+            if ingredient_embedding is None:
+                ingredient_embedding = self.generate_ingredient_embedding(ingredients)
             
             if self.model and ingredient_embedding:
                 # Use your trained model for predictions
@@ -70,6 +398,39 @@ class AIService:
             logger.error(f"Error in recipe prediction: {e}")
             return self._generate_fallback_recipes(ingredients, mood)
     
+    def predict_recipes_batch(self, queries: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+        """Predict recipes for many (ingredients, mood) queries with one embedding pass and one model call"""
+        ingredient_lists = [query['ingredients'] for query in queries]
+        moods = [query.get('mood', 'comfort') for query in queries]
+        results = [None] * len(queries)
+        
+        try:
+            embeddings = self.generate_query_embeddings(ingredient_lists)
+            
+            if self.model:
+                scored = [i for i, embedding in enumerate(embeddings) if embedding]
+                if scored:
+                    # Stack every query into one matrix so the estimator predicts in a single call
+                    input_data = np.array([embeddings[i] for i in scored])
+                    predictions = self.model.predict(input_data)
+                    
+                    for row, i in enumerate(scored):
+                        results[i] = self._format_model_predictions(predictions[row:row + 1], ingredient_lists[i], moods[i])
+            
+        except Exception as e:
+            logger.error(f"Error in batch recipe prediction: {e}")
+        
+        # Queries the model could not score use rule-based generation
+        for i, result in enumerate(results):
+            if result is None:
+                try:
+                    results[i] = self._generate_smart_recipes(ingredient_lists[i], moods[i])
+                except Exception as e:
+                    logger.error(f"Error in recipe prediction: {e}")
+                    results[i] = self._generate_fallback_recipes(ingredient_lists[i], moods[i])
+        
+        return results
+    
     def _use_trained_model(self, embedding: List[float], ingredients: List[str], mood: str) -> List[Dict[str, Any]]:
         """Use your trained model for predictions"""
         try:
@@ -94,17 +455,26 @@ class AIService:
         # This is a template - adjust based on your model's output
         recipes = []
         
+        rng = self._request_rng(ingredients, mood)
+        
+        # Classify ingredients once for every heuristic below
+        profile = classify_ingredients(ingredients)
+        cook_time = self._estimate_cook_time(profile)
+        difficulty = self._estimate_difficulty(ingredients)
+        image = self._select_emoji(profile, mood)
+        formatted_ingredients = self._format_ingredients(profile)
+        
         for i, prediction in enumerate(predictions[:3]):  # Top 3 predictions
             recipe = {
                 "name": f"AI-Crafted {mood.title()} Dish #{i+1}",
                 "description": f"A personalized {mood} recipe created just for you",
-                "cookTime": self._estimate_cook_time(ingredients),
-                "difficulty": self._estimate_difficulty(ingredients),
+                "cookTime": cook_time,
+                "difficulty": difficulty,
                 "rating": round(4.5 + (prediction * 0.4), 1),  # Scale to 4.5-4.9
-                "image": self._select_emoji(ingredients, mood),
-                "ingredients": self._format_ingredients(ingredients),
+                "image": image,
+                "ingredients": [dict(item) for item in formatted_ingredients],
                 "instructions": self._generate_instructions(ingredients, mood),
-                "tip": self._generate_tip(ingredients, mood),
+                "tip": self._generate_tip(ingredients, mood, rng),
                 "tags": ingredients[:3] + [mood],
                 "mood": mood
             }
@@ -116,26 +486,14 @@ class AIService:
         """Generate intelligent recipe suggestions based on ingredients and mood"""
         recipes = []
         
-        # Recipe templates based on mood
-        mood_templates = {
-            "comfort": {
-                "styles": ["Hearty", "Cozy", "Warm", "Creamy"],
-                "cooking_methods": ["simmered", "baked", "slow-cooked", "braised"],
-                "emojis": ["🍲", "🥘", "🍝", "🧀"]
-            },
-            "fresh": {
-                "styles": ["Light", "Crisp", "Vibrant", "Garden-Fresh"],
-                "cooking_methods": ["tossed", "grilled", "steamed", "raw"],
-                "emojis": ["🥗", "🌿", "🥒", "🍅"]
-            },
-            "indulgent": {
-                "styles": ["Rich", "Decadent", "Luxurious", "Gourmet"],
-                "cooking_methods": ["seared", "roasted", "caramelized", "flambéed"],
-                "emojis": ["🥩", "🍫", "🧈", "✨"]
-            }
-        }
+        template = MOOD_TEMPLATES.get(mood, MOOD_TEMPLATES["comfort"])
+        rng = self._request_rng(ingredients, mood)
         
-        template = mood_templates.get(mood, mood_templates["comfort"])
+        # Classify ingredients once for every heuristic below
+        profile = classify_ingredients(ingredients)
+        cook_time = self._estimate_cook_time(profile)
+        difficulty = self._estimate_difficulty(ingredients)
+        formatted_ingredients = self._format_ingredients(profile)
         
         for i in range(3):
             style = template["styles"][i % len(template["styles"])]
@@ -143,15 +501,15 @@ class AIService:
             emoji = template["emojis"][i % len(template["emojis"])]
             
             recipe = {
-                "name": f"{style} {self._create_dish_name(ingredients)}",
+                "name": f"{style} {self._create_dish_name(ingredients, rng)}",
                 "description": f"A {mood} dish featuring your ingredients, {method} to perfection",
-                "cookTime": self._estimate_cook_time(ingredients),
-                "difficulty": self._estimate_difficulty(ingredients),
+                "cookTime": cook_time,
+                "difficulty": difficulty,
                 "rating": round(4.3 + (i * 0.2), 1),
                 "image": emoji,
-                "ingredients": self._format_ingredients(ingredients),
+                "ingredients": [dict(item) for item in formatted_ingredients],
                 "instructions": self._generate_instructions(ingredients, mood),
-                "tip": self._generate_tip(ingredients, mood),
+                "tip": self._generate_tip(ingredients, mood, rng),
                 "tags": ingredients[:3] + [mood],
                 "mood": mood
             }
@@ -159,7 +517,13 @@ class AIService:
         
         return recipes
     
-    def _create_dish_name(self, ingredients: List[str]) -> str:
+    def _request_rng(self, ingredients: List[str], mood: str) -> random.Random:
+        """Random source for name/tip choices, seeded from the canonical request in deterministic mode"""
+        if not Config.DETERMINISTIC_RECIPES:
+            return random.Random()
+        return random.Random(stable_hash([canonicalize_ingredients(ingredients), mood]))
+    
+    def _create_dish_name(self, ingredients: List[str], rng: random.Random) -> str:
         """Create appealing dish names from ingredients"""
         main_ingredient = ingredients[0].title() if ingredients else "Special"
         
@@ -171,17 +535,17 @@ class AIService:
             f"{main_ingredient} Symphony"
         ]
         
-        import random
-        return random.choice(name_patterns)
+        return rng.choice(name_patterns)
     
-    def _format_ingredients(self, user_ingredients: List[str]) -> List[Dict[str, str]]:
+    def _format_ingredients(self, profile: IngredientProfile) -> List[Dict[str, str]]:
         """Format ingredients with estimated amounts"""
         formatted = []
         
-        for ingredient in user_ingredients[:8]:  # Limit to 8 ingredients
+        # Limit to 8 ingredients
+        for ingredient, categories in zip(profile.ingredients[:8], profile.per_ingredient):
             formatted.append({
                 "name": ingredient.title(),
-                "amount": self._estimate_amount(ingredient)
+                "amount": self._estimate_amount(categories)
             })
         
         # Add common complementary ingredients
@@ -194,39 +558,19 @@ class AIService:
         formatted.extend(complementary)
         return formatted
     
-    def _estimate_amount(self, ingredient: str) -> str:
+    def _estimate_amount(self, categories: FrozenSet[str]) -> str:
         """Estimate ingredient amounts based on type"""
-        ingredient_lower = ingredient.lower()
-        
-        # Proteins
-        if any(protein in ingredient_lower for protein in ['chicken', 'beef', 'pork', 'fish', 'salmon', 'turkey']):
-            return "300-400g"
-        
-        # Vegetables
-        if any(veg in ingredient_lower for veg in ['tomato', 'onion', 'pepper', 'carrot', 'potato']):
-            return "2-3 pieces"
-        
-        # Leafy greens
-        if any(green in ingredient_lower for green in ['lettuce', 'spinach', 'kale', 'arugula']):
-            return "2 cups"
-        
-        # Grains/Pasta
-        if any(grain in ingredient_lower for grain in ['pasta', 'rice', 'quinoa', 'noodles']):
-            return "200g"
-        
-        # Dairy
-        if any(dairy in ingredient_lower for dairy in ['cheese', 'milk', 'cream', 'yogurt']):
-            return "100ml"
+        for category, amount in CATEGORY_AMOUNTS:
+            if category in categories:
+                return amount
         
         # Default
         return "1 cup"
     
-    def _estimate_cook_time(self, ingredients: List[str]) -> str:
+    def _estimate_cook_time(self, profile: IngredientProfile) -> str:
         """Estimate cooking time based on ingredients"""
-        has_meat = any(meat in ' '.join(ingredients).lower() 
-                      for meat in ['chicken', 'beef', 'pork', 'fish'])
-        has_grains = any(grain in ' '.join(ingredients).lower() 
-                        for grain in ['rice', 'pasta', 'quinoa'])
+        has_meat = profile.has('protein')
+        has_grains = profile.has('grain')
         
         if has_meat and has_grains:
             return "35-45 min"
@@ -250,30 +594,15 @@ class AIService:
         else:
             return "Advanced"
     
-    def _select_emoji(self, ingredients: List[str], mood: str) -> str:
+    def _select_emoji(self, profile: IngredientProfile, mood: str) -> str:
         """Select appropriate emoji based on ingredients and mood"""
-        ingredient_text = ' '.join(ingredients).lower()
-        
         # Ingredient-based emojis
-        if any(meat in ingredient_text for meat in ['chicken', 'beef', 'pork']):
-            return "🍖"
-        elif any(fish in ingredient_text for fish in ['fish', 'salmon', 'tuna']):
-            return "🐟"
-        elif any(pasta in ingredient_text for pasta in ['pasta', 'noodles', 'spaghetti']):
-            return "🍝"
-        elif any(veg in ingredient_text for veg in ['salad', 'lettuce', 'greens']):
-            return "🥗"
-        elif any(grain in ingredient_text for grain in ['rice', 'quinoa']):
-            return "🍚"
+        for category, emoji in CATEGORY_EMOJIS:
+            if profile.has(category):
+                return emoji
         
         # Mood-based fallback
-        mood_emojis = {
-            "comfort": "🍲",
-            "fresh": "🌿",
-            "indulgent": "✨"
-        }
-        
-        return mood_emojis.get(mood, "🍽️")
+        return MOOD_EMOJIS.get(mood, "🍽️")
     
     def _generate_instructions(self, ingredients: List[str], mood: str) -> List[str]:
         """Generate cooking instructions"""
@@ -289,7 +618,7 @@ class AIService:
         
         return base_instructions
     
-    def _generate_tip(self, ingredients: List[str], mood: str) -> str:
+    def _generate_tip(self, ingredients: List[str], mood: str, rng: random.Random) -> str:
         """Generate helpful cooking tips"""
         tips = [
             "Let the ingredients rest together for a few minutes before serving to enhance flavors! ✨",
@@ -299,8 +628,7 @@ class AIService:
             "Trust your instincts - you know your taste better than anyone! 💚"
         ]
         
-        import random
-        return random.choice(tips)
+        return rng.choice(tips)
     
     def _generate_fallback_recipes(self, ingredients: List[str], mood: str) -> List[Dict[str, Any]]:
         """Fallback recipes when all else fails"""
@@ -0,0 +1,193 @@
+import logging
+import math
+import threading
+from collections import OrderedDict, namedtuple
+from typing import Any, Dict, Optional, Sequence
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Atlas rejects numCandidates above this
+ATLAS_MAX_CANDIDATES = 10000
+
+# One $vectorSearch call: how many results to fetch and how many candidates to explore.
+# widened says what a retry grew: 'limit' (threshold starved) or 'candidates' (filter starved)
+CandidatePlan = namedtuple('CandidatePlan', ['fetch_limit', 'num_candidates', 'widened'], defaults=(None,))
+
+
+class _FilterStats:
+    """Running statistics for one (mood, difficulty, diet) filter"""
+
+    def __init__(self, thresholded: bool):
+        # Prior pass rate: thresholded queries used to fetch limit * 2
+        self.survival = 0.5 if thresholded else 1.0
+        self.boost = 1.0
+        self.exhausted_at = None
+
+        self.queries = 0
+        self.short_results = 0
+        self.retries = 0
+        self.last_fetch_limit = None
+        self.last_num_candidates = None
+        self.mean_num_candidates = None
+        self.over_fetch = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "queries": self.queries,
+            "survival": round(self.survival, 4),
+            "candidateBoost": round(self.boost, 2),
+            "lastFetchLimit": self.last_fetch_limit,
+            "lastNumCandidates": self.last_num_candidates,
+            "meanNumCandidates": round(self.mean_num_candidates, 1) if self.mean_num_candidates is not None else None,
+            "overFetchRatio": round(self.over_fetch, 3) if self.over_fetch is not None else None,
+            "shortResults": self.short_results,
+            "retries": self.retries,
+            "exhaustedAt": self.exhausted_at
+        }
+
+
+class CandidateTuner:
+    """Picks $vectorSearch limit and numCandidates per query from observed filter selectivity
+
+    For every (mood, difficulty, diet) filter it keeps an EWMA of the share of fetched results
+    that survive the similarity threshold, and fetches just enough for `limit` of them to
+    survive. numCandidates is `candidate_ratio` per fetched result, scaled by a per-filter
+    boost that grows when a selective filter came back short and exploring more candidates
+    helped, and decays back once queries fill up on the first try.
+    """
+
+    HEADROOM = 1.25  # Margin over the expected fetch so typical variance does not force a retry
+    EXPANSION = 4  # Growth of fetch limit / numCandidates on a retry
+    MAX_BOOST = 64.0
+    MIN_SURVIVAL = 0.01
+
+    def __init__(self, candidate_ratio: float = Config.VECTOR_CANDIDATE_RATIO,
+                 max_candidates: int = Config.VECTOR_MAX_CANDIDATES,
+                 alpha: float = Config.VECTOR_STATS_ALPHA, max_filters: int = 256):
+        self.candidate_ratio = max(1.0, candidate_ratio)
+        self.max_candidates = max(1, min(max_candidates, ATLAS_MAX_CANDIDATES))
+        self.alpha = min(max(alpha, 0.01), 1.0)
+        self.max_filters = max(1, max_filters)
+
+        self._filters = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def filter_key(mood: Optional[str], difficulty: Optional[str], diet: Sequence[str] = ()) -> str:
+        return f"mood={mood or '*'},difficulty={difficulty or '*'},diet={'+'.join(sorted(diet)) or '*'}"
+
+    def plan(self, key: str, limit: int, thresholded: bool) -> CandidatePlan:
+        """Fetch limit and numCandidates for the first attempt of a query"""
+        with self._lock:
+            stats = self._get_stats(key, thresholded)
+            survival = max(stats.survival, self.MIN_SURVIVAL)
+            boost = stats.boost
+
+        fetch_limit = math.ceil(limit * self.HEADROOM / survival) if thresholded else limit
+        return self._make_plan(fetch_limit, boost)
+
+    def expand(self, key: str, plan: CandidatePlan, fetched: int) -> Optional[CandidatePlan]:
+        """Wider plan for a short result, or None when widening cannot find more"""
+        with self._lock:
+            stats = self._filters.get(key)
+            if stats is not None and stats.exhausted_at is not None and fetched <= stats.exhausted_at:
+                # A wider search already came back with no more than this: the filter has no more matches
+                return None
+
+        # A full page means more results exist beyond the fetch limit; otherwise explore more candidates
+        if fetched >= plan.fetch_limit:
+            fetch_limit = min(plan.fetch_limit * self.EXPANSION, self.max_candidates)
+            widened = 'limit'
+        else:
+            fetch_limit = plan.fetch_limit
+            widened = 'candidates'
+        num_candidates = max(fetch_limit, min(plan.num_candidates * self.EXPANSION, self.max_candidates))
+
+        if (fetch_limit, num_candidates) == (plan.fetch_limit, plan.num_candidates):
+            return None
+        return CandidatePlan(fetch_limit, num_candidates, widened)
+
+    def record(self, key: str, plan: CandidatePlan, fetched: int, survivors: int, limit: int, retried_from: Optional[int] = None):
+        """Fold one attempt into the filter's statistics
+
+        retried_from is the survivor count of the previous attempt when this one was a retry.
+        """
+        with self._lock:
+            stats = self._filters.get(key)
+            if stats is None:
+                # Evicted since plan() by other filters
+                return
+
+            if fetched:
+                stats.survival += self.alpha * (survivors / fetched - stats.survival)
+
+            if retried_from is None:
+                stats.queries += 1
+                stats.last_fetch_limit = plan.fetch_limit
+                stats.last_num_candidates = plan.num_candidates
+                stats.mean_num_candidates = self._ewma(stats.mean_num_candidates, plan.num_candidates)
+                if survivors < limit:
+                    stats.short_results += 1
+                else:
+                    stats.boost = max(1.0, stats.boost * (1 - self.alpha))
+            else:
+                stats.retries += 1
+                if survivors > retried_from:
+                    stats.exhausted_at = None
+                    if plan.widened == 'candidates':
+                        # Exploring more found more: start this selective filter wider next time
+                        stats.boost = min(self.MAX_BOOST, stats.boost * self.EXPANSION)
+                else:
+                    stats.exhausted_at = fetched
+
+            returned = min(survivors, limit)
+            stats.over_fetch = self._ewma(stats.over_fetch, fetched / max(returned, 1))
+
+        logger.debug(
+            f"Vector search {key}: limit {plan.fetch_limit}, numCandidates {plan.num_candidates}, "
+            f"{survivors}/{fetched} survived{' (retry)' if retried_from is not None else ''}"
+        )
+
+    def forget_exhausted(self):
+        """Drop remembered filter exhaustion after the collection changed"""
+        with self._lock:
+            for stats in self._filters.values():
+                stats.exhausted_at = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Per-filter chosen values, survival and over-fetch ratios for health payloads"""
+        with self._lock:
+            filters = {key: stats.to_dict() for key, stats in self._filters.items()}
+
+        return {
+            "candidateRatio": self.candidate_ratio,
+            "maxCandidates": self.max_candidates,
+            "queries": sum(stats["queries"] for stats in filters.values()),
+            "shortResults": sum(stats["shortResults"] for stats in filters.values()),
+            "retries": sum(stats["retries"] for stats in filters.values()),
+            "filters": filters
+        }
+
+    def _make_plan(self, fetch_limit: int, boost: float) -> CandidatePlan:
+        fetch_limit = max(1, min(int(fetch_limit), self.max_candidates))
+        num_candidates = math.ceil(fetch_limit * self.candidate_ratio * boost)
+        return CandidatePlan(fetch_limit, max(fetch_limit, min(num_candidates, self.max_candidates)))
+
+    def _get_stats(self, key: str, thresholded: bool) -> _FilterStats:
+        stats = self._filters.get(key)
+        if stats is None:
+            stats = self._filters[key] = _FilterStats(thresholded)
+            if len(self._filters) > self.max_filters:
+                # Moods come from requests; keep the table bounded
+                self._filters.popitem(last=False)
+        else:
+            self._filters.move_to_end(key)
+        return stats
+
+    def _ewma(self, current: Optional[float], value: float) -> float:
+        return value if current is None else current + self.alpha * (value - current)
+
+
+candidate_tuner = CandidateTuner()
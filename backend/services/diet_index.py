@@ -0,0 +1,111 @@
+from typing import AbstractSet, Any, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from services.ingredient_classifier import DIET_CLASSIFIER_VERSION, DIET_RESTRICTIONS, diet_flags
+
+DIET_FIELD = 'dietFlags'
+DIET_VERSION_FIELD = 'dietFlagsVersion'
+
+
+def recipe_ingredient_names(recipe: Dict[str, Any]) -> List[str]:
+    """ingredients.name of a recipe (plain string ingredients accepted too)"""
+    names = []
+    for ingredient in recipe.get('ingredients') or ():
+        name = ingredient.get('name') if isinstance(ingredient, dict) else ingredient
+        if isinstance(name, str) and name.strip():
+            names.append(name)
+    return names
+
+
+def document_diet_flags(document: Dict[str, Any]) -> List[str]:
+    """Restriction classes a recipe satisfies: the stored dietFlags if the current classifier
+    wrote them, else derived from its ingredients"""
+    flags = document.get(DIET_FIELD)
+    if isinstance(flags, list) and document.get(DIET_VERSION_FIELD) == DIET_CLASSIFIER_VERSION:
+        return flags
+    return diet_flags(recipe_ingredient_names(document))
+
+
+class PackedBitmap:
+    """Growable bitmap over row ids, eight rows per byte (np.packbits bit order)
+
+    Read-only backing arrays (a memory-mapped snapshot) are copied on first write.
+    """
+
+    __slots__ = ('bits',)
+
+    def __init__(self, bits: Optional[np.ndarray] = None):
+        self.bits = np.zeros(0, dtype=np.uint8) if bits is None else bits
+
+    @classmethod
+    def from_mask(cls, mask: np.ndarray) -> 'PackedBitmap':
+        return cls(np.packbits(mask))
+
+    def set_many(self, rows: np.ndarray, values: np.ndarray):
+        """Set rows[i] to values[i]"""
+        if len(rows) == 0:
+            return
+        needed = (int(rows.max()) >> 3) + 1
+        if needed > len(self.bits) or not self.bits.flags.writeable:
+            grown = np.zeros(max(needed, 2 * len(self.bits)), dtype=np.uint8)
+            grown[:len(self.bits)] = self.bits
+            self.bits = grown
+
+        byte_index = rows >> 3
+        bit = (0x80 >> (rows & 7)).astype(np.uint8)
+        # ufunc.at so several rows landing in one byte all apply
+        np.bitwise_and.at(self.bits, byte_index, ~bit)
+        np.bitwise_or.at(self.bits, byte_index[values], bit[values])
+
+    def packed(self, count: int) -> np.ndarray:
+        """Packed bytes covering rows [0, count), zero-padded"""
+        nbytes = (count + 7) >> 3
+        if len(self.bits) >= nbytes:
+            return self.bits[:nbytes]
+        padded = np.zeros(nbytes, dtype=np.uint8)
+        padded[:len(self.bits)] = self.bits
+        return padded
+
+    @property
+    def nbytes(self) -> int:
+        return self.bits.nbytes
+
+
+class DietBitmaps:
+    """One packed bitmap per restriction class: bit set when the recipe in that row complies
+
+    A query with several restrictions ANDs their packed bytes and unpacks once, so the
+    per-query cost is a few byte-wise operations over rows / 8 bytes.
+    """
+
+    def __init__(self, restrictions: Iterable[str] = DIET_RESTRICTIONS, bitmaps: Optional[Dict[str, PackedBitmap]] = None):
+        self.bitmaps = bitmaps if bitmaps is not None else {restriction: PackedBitmap() for restriction in restrictions}
+
+    def set_rows(self, rows: Sequence[int], documents: Sequence[Dict[str, Any]]):
+        """Record the restrictions each document satisfies"""
+        self.set_flags(rows, [set(document_diet_flags(document)) for document in documents])
+
+    def set_flags(self, rows: Sequence[int], flags: Sequence[AbstractSet[str]]):
+        """Record the restriction classes each row satisfies"""
+        rows = np.asarray(rows, dtype=np.int64)
+        for restriction, bitmap in self.bitmaps.items():
+            bitmap.set_many(rows, np.fromiter((restriction in row_flags for row_flags in flags), dtype=bool, count=len(flags)))
+
+    def mask(self, restrictions: Sequence[str], count: int) -> Optional[np.ndarray]:
+        """Boolean row mask of recipes compatible with every restriction, or None if there are none"""
+        packed = None
+        for restriction in restrictions:
+            bitmap = self.bitmaps.get(restriction)
+            if bitmap is None:
+                # Unknown class: nothing is known to comply
+                return np.zeros(count, dtype=bool)
+            packed = bitmap.packed(count) if packed is None else packed & bitmap.packed(count)
+
+        if packed is None:
+            return None
+        return np.unpackbits(packed, count=count).astype(bool)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(bitmap.nbytes for bitmap in self.bitmaps.values())
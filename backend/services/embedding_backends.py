@@ -0,0 +1,244 @@
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, List
+
+import numpy as np
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+ONNX_METADATA_FILE = 'backend.json'
+
+
+class TorchEmbeddingBackend:
+    """Reference backend: the PyTorch SentenceTransformer model"""
+
+    name = 'torch'
+
+    def __init__(self, model_name: str):
+        # Imported here because torch/transformers take seconds to import
+        from sentence_transformers import SentenceTransformer
+
+        self.model_name = model_name
+        self.model = SentenceTransformer(model_name, device='cpu')
+
+    def encode(self, texts: List[str], batch_size: int = 64) -> np.ndarray:
+        """Embed texts into a (len(texts), dimension) float32 array"""
+        embeddings = self.model.encode(texts, batch_size=batch_size)
+        return np.asarray(embeddings, dtype=np.float32).reshape(len(texts), -1)
+
+    def describe(self) -> Dict[str, Any]:
+        return {"backend": self.name, "model": self.model_name}
+
+
+class OnnxEmbeddingBackend:
+    """ONNX Runtime CPU backend running an exported (optionally int8-quantized) copy of the model"""
+
+    name = 'onnx'
+
+    def __init__(self, model_name: str, model_dir: str, quantize: bool = True, intra_op_threads: int = 0):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        self.model_name = model_name
+        self.model_dir = model_dir
+        self.metadata = export_onnx_model(model_name, model_dir, quantize)
+        self.quantized = quantize
+        self.intra_op_threads = intra_op_threads
+
+        model_file = 'model.int8.onnx' if quantize else 'model.onnx'
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if intra_op_threads > 0:
+            options.intra_op_num_threads = intra_op_threads
+        # Requests are already parallel across Flask threads; keep each run on one pool
+        options.inter_op_num_threads = 1
+
+        self.session = ort.InferenceSession(
+            os.path.join(model_dir, model_file),
+            sess_options=options,
+            providers=['CPUExecutionProvider']
+        )
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        self.input_names = [graph_input.name for graph_input in self.session.get_inputs()]
+
+    def encode(self, texts: List[str], batch_size: int = 64) -> np.ndarray:
+        """Embed texts into a (len(texts), dimension) float32 array"""
+        batches = []
+
+        for start in range(0, len(texts), batch_size):
+            batch = texts[start:start + batch_size]
+            tokens = self.tokenizer(
+                batch,
+                padding=True,
+                truncation=True,
+                max_length=self.metadata['max_seq_length'],
+                return_tensors='np'
+            )
+            feeds = {name: tokens[name].astype(np.int64) for name in self.input_names}
+            token_embeddings = self.session.run(None, feeds)[0]
+
+            # Mean pooling over real tokens, as the SentenceTransformer Pooling module does
+            mask = tokens['attention_mask'][..., None].astype(np.float32)
+            pooled = (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+
+            if self.metadata['normalize']:
+                pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+
+            batches.append(pooled.astype(np.float32))
+
+        if not batches:
+            return np.zeros((0, Config.VECTOR_DIMENSION), dtype=np.float32)
+        return np.vstack(batches)
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "backend": self.name,
+            "model": self.model_name,
+            "quantized": self.quantized,
+            "intra_op_threads": self.intra_op_threads
+        }
+
+
+def export_onnx_model(model_name: str, output_dir: str, quantize: bool = True) -> Dict[str, Any]:
+    """Export model_name to ONNX in output_dir (reusing a previous export of the same model)"""
+    metadata_path = os.path.join(output_dir, ONNX_METADATA_FILE)
+
+    if os.path.exists(metadata_path):
+        with open(metadata_path) as f:
+            metadata = json.load(f)
+        quantized_ready = not quantize or os.path.exists(os.path.join(output_dir, 'model.int8.onnx'))
+        if metadata.get('model') == model_name and quantized_ready:
+            return metadata
+
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    logger.info(f"Exporting {model_name} to ONNX in {output_dir}")
+    os.makedirs(output_dir, exist_ok=True)
+
+    st_model = SentenceTransformer(model_name, device='cpu')
+    transformer = st_model[0].auto_model.eval()
+    tokenizer = st_model.tokenizer
+
+    class _TokenEmbeddings(torch.nn.Module):
+        """Expose only the token embeddings so the exported graph has a single output"""
+
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, input_ids, attention_mask, token_type_ids=None):
+            return self.model(
+                input_ids=input_ids,
+                attention_mask=attention_mask,
+                token_type_ids=token_type_ids
+            )[0]
+
+    sample = tokenizer(["chicken, rice, garlic"], return_tensors='pt')
+    input_names = [name for name in ('input_ids', 'attention_mask', 'token_type_ids') if name in sample]
+    dynamic_axes = {name: {0: 'batch', 1: 'sequence'} for name in input_names}
+    dynamic_axes['token_embeddings'] = {0: 'batch', 1: 'sequence'}
+
+    model_path = os.path.join(output_dir, 'model.onnx')
+    with torch.no_grad():
+        torch.onnx.export(
+            _TokenEmbeddings(transformer),
+            tuple(sample[name] for name in input_names),
+            model_path,
+            input_names=input_names,
+            output_names=['token_embeddings'],
+            dynamic_axes=dynamic_axes,
+            opset_version=14
+        )
+    tokenizer.save_pretrained(output_dir)
+
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        quantize_dynamic(model_path, os.path.join(output_dir, 'model.int8.onnx'), weight_type=QuantType.QInt8)
+
+    metadata = {
+        "model": model_name,
+        "normalize": any(type(module).__name__ == 'Normalize' for module in st_model),
+        "max_seq_length": st_model.max_seq_length,
+        "input_names": input_names,
+        "quantized": quantize
+    }
+    with open(metadata_path, 'w') as f:
+        json.dump(metadata, f, indent=2)
+
+    logger.info(f"ONNX export of {model_name} completed")
+    return metadata
+
+
+def create_embedding_backend(backend_name: str = None):
+    """Build the embedding backend selected in Config"""
+    backend_name = (backend_name or Config.EMBEDDING_BACKEND).lower()
+
+    if backend_name == 'torch':
+        return TorchEmbeddingBackend(Config.EMBEDDING_MODEL)
+
+    if backend_name == 'onnx':
+        return OnnxEmbeddingBackend(
+            Config.EMBEDDING_MODEL,
+            Config.ONNX_MODEL_DIR,
+            quantize=Config.ONNX_QUANTIZE,
+            intra_op_threads=Config.ONNX_INTRA_OP_THREADS
+        )
+
+    raise ValueError(f"Unknown embedding backend: {backend_name}")
+
+
+def embedding_model_tag(backend_name: str = None) -> str:
+    """Identity of the vectors a backend produces, used to tag persisted embeddings"""
+    backend_name = (backend_name or Config.EMBEDDING_BACKEND).lower()
+
+    if backend_name == 'onnx':
+        return f"{Config.EMBEDDING_MODEL}@onnx{'-int8' if Config.ONNX_QUANTIZE else ''}"
+    return Config.EMBEDDING_MODEL
+
+
+def compare_backends(reference, candidate, texts: List[str], batch_size: int = 32, repeats: int = 3) -> Dict[str, Any]:
+    """Parity (cosine similarity vs. reference) and latency/throughput comparison of two backends"""
+    reference_vectors = reference.encode(texts, batch_size=batch_size)
+    candidate_vectors = candidate.encode(texts, batch_size=batch_size)
+
+    reference_unit = reference_vectors / np.linalg.norm(reference_vectors, axis=1, keepdims=True)
+    candidate_unit = candidate_vectors / np.linalg.norm(candidate_vectors, axis=1, keepdims=True)
+    cosine = (reference_unit * candidate_unit).sum(axis=1)
+
+    return {
+        "samples": len(texts),
+        "parity": {
+            "cosine_min": round(float(cosine.min()), 5),
+            "cosine_mean": round(float(cosine.mean()), 5),
+            "cosine_p01": round(float(np.percentile(cosine, 1)), 5)
+        },
+        reference.name: _measure_backend(reference, texts, batch_size, repeats),
+        candidate.name: _measure_backend(candidate, texts, batch_size, repeats)
+    }
+
+
+def _measure_backend(backend, texts: List[str], batch_size: int, repeats: int) -> Dict[str, float]:
+    """Single-text latency and batched throughput for one backend"""
+    latencies = []
+    for text in texts[:200]:
+        started = time.perf_counter()
+        backend.encode([text])
+        latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    for _ in range(repeats):
+        backend.encode(texts, batch_size=batch_size)
+    elapsed = time.perf_counter() - started
+
+    return {
+        "latency_p50_ms": round(float(np.percentile(latencies, 50)), 3),
+        "latency_p95_ms": round(float(np.percentile(latencies, 95)), 3),
+        "throughput_texts_per_s": round(len(texts) * repeats / elapsed, 1)
+    }
@@ -0,0 +1,163 @@
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds of the batch size histogram buckets
+BATCH_SIZE_BUCKETS = [1, 2, 4, 8, 16, 32, 64]
+
+
+class EmbeddingBatcher:
+    """Coalesces concurrent single-text embedding calls into batched encoder runs
+
+    Callers submit a text and get a Future back. One worker thread takes the first
+    queued request, keeps collecting for up to `window_ms` or `max_batch_size`
+    requests, runs a single batched encode and resolves every caller's future.
+    """
+
+    def __init__(self, encode_fn: Callable[[List[str]], np.ndarray], window_ms: float = 2.0, max_batch_size: int = 32):
+        self.encode_fn = encode_fn
+        self.window = max(0.0, window_ms) / 1000
+        self.max_batch_size = max(1, max_batch_size)
+
+        self._queue = queue.Queue()
+        self._worker = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._stopped = False
+
+        self.batches = 0
+        self.requests = 0
+        self.coalesced = 0
+        self.failures = 0
+        self.max_queue_depth = 0
+        self.total_wait_ms = 0.0
+        self.max_wait_ms = 0.0
+        self.total_encode_ms = 0.0
+        self.batch_size_histogram = {f"<={bucket}": 0 for bucket in BATCH_SIZE_BUCKETS}
+        self.batch_size_histogram[f">{BATCH_SIZE_BUCKETS[-1]}"] = 0
+
+    def submit(self, text: str) -> Future:
+        """Queue text for embedding; the future resolves to a 1-D float32 vector"""
+        if self._stopped:
+            raise RuntimeError("Embedding batcher is stopped")
+
+        self._ensure_worker()
+
+        future = Future()
+        self._queue.put((text, future, time.perf_counter()))
+
+        depth = self._queue.qsize()
+        if depth > self.max_queue_depth:
+            self.max_queue_depth = depth
+        return future
+
+    def encode(self, text: str, timeout: float = None) -> np.ndarray:
+        """Submit text and wait for its vector"""
+        return self.submit(text).result(timeout)
+
+    def stop(self):
+        """Stop the worker after it drains the queue"""
+        self._stopped = True
+        if self._worker is not None:
+            self._queue.put(None)
+            self._worker.join(timeout=5)
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth, batch size distribution and wait times for tuning the window"""
+        with self._stats_lock:
+            return {
+                "windowMs": self.window * 1000,
+                "maxBatchSize": self.max_batch_size,
+                "queueDepth": self._queue.qsize(),
+                "maxQueueDepth": self.max_queue_depth,
+                "requests": self.requests,
+                "batches": self.batches,
+                "coalescedDuplicates": self.coalesced,
+                "failedBatches": self.failures,
+                "avgBatchSize": round(self.requests / self.batches, 2) if self.batches else 0.0,
+                "batchSizeHistogram": dict(self.batch_size_histogram),
+                "avgWaitMs": round(self.total_wait_ms / self.requests, 3) if self.requests else 0.0,
+                "maxWaitMs": round(self.max_wait_ms, 3),
+                "avgEncodeMs": round(self.total_encode_ms / self.batches, 3) if self.batches else 0.0
+            }
+
+    def _ensure_worker(self):
+        if self._worker is not None:
+            return
+
+        with self._start_lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name='embedding-batcher', daemon=True)
+                self._worker.start()
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+
+            batch = [first]
+            deadline = time.perf_counter() + self.window
+
+            # Keep collecting until the window closes or the batch is full
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._queue.put(None)
+                    break
+                batch.append(item)
+
+            self._dispatch(batch)
+
+    def _dispatch(self, batch):
+        dispatched_at = time.perf_counter()
+
+        # Identical texts in one window are encoded once
+        unique_texts = list(dict.fromkeys(text for text, _, _ in batch))
+
+        try:
+            vectors = self.encode_fn(unique_texts)
+            rows = dict(zip(unique_texts, vectors))
+            for text, future, _ in batch:
+                future.set_result(rows[text])
+        except Exception as e:
+            logger.error(f"Batched embedding failed for {len(batch)} requests: {e}")
+            self.failures += 1
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+
+        encode_ms = (time.perf_counter() - dispatched_at) * 1000
+        self._record(batch, dispatched_at, len(unique_texts), encode_ms)
+
+    def _record(self, batch, dispatched_at: float, unique_count: int, encode_ms: float):
+        with self._stats_lock:
+            self.batches += 1
+            self.requests += len(batch)
+            self.coalesced += len(batch) - unique_count
+            self.total_encode_ms += encode_ms
+
+            for _, _, enqueued_at in batch:
+                wait_ms = (dispatched_at - enqueued_at) * 1000
+                self.total_wait_ms += wait_ms
+                self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+
+            for bucket in BATCH_SIZE_BUCKETS:
+                if len(batch) <= bucket:
+                    self.batch_size_histogram[f"<={bucket}"] += 1
+                    break
+            else:
+                self.batch_size_histogram[f">{BATCH_SIZE_BUCKETS[-1]}"] += 1
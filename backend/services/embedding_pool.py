@@ -0,0 +1,328 @@
+import logging
+import multiprocessing
+import os
+import pickle
+import queue
+import threading
+import time
+from multiprocessing import shared_memory
+from typing import Any, Dict, List
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def _worker_main(worker_id: int, conn, shm_name: str, max_rows: int, dimension: int, backend_name: str, model_path: str):
+    """Worker process: hosts the embedding backend and prediction model, replies through shared memory"""
+    from services.embedding_backends import create_embedding_backend
+
+    shm = shared_memory.SharedMemory(name=shm_name)
+    buffer = np.ndarray((max_rows, dimension), dtype=np.float32, buffer=shm.buf)
+
+    try:
+        backend = create_embedding_backend(backend_name)
+
+        model = None
+        if model_path and os.path.exists(model_path):
+            with open(model_path, 'rb') as f:
+                model = pickle.load(f)
+
+        conn.send(('ready', {"pid": os.getpid(), "backend": backend.describe(), "prediction_model": model is not None}))
+    except Exception as e:
+        conn.send(('error', f"Worker {worker_id} failed to load models: {e}"))
+        shm.close()
+        return
+
+    while True:
+        try:
+            op, payload = conn.recv()
+        except EOFError:
+            break
+
+        if op == 'stop':
+            break
+
+        try:
+            if op == 'encode':
+                vectors = backend.encode(payload)
+                buffer[:len(vectors)] = vectors
+                conn.send(('ok', len(vectors)))
+            elif op == 'predict':
+                if model is None:
+                    raise RuntimeError("Prediction model not loaded in worker")
+                predictions = model.predict(np.array(buffer[:payload]))
+                conn.send(('ok', np.asarray(predictions)))
+            else:
+                raise ValueError(f"Unknown operation: {op}")
+        except Exception as e:
+            conn.send(('error', str(e)))
+
+    shm.close()
+
+
+class _WorkerHandle:
+    """Parent-side state for one worker process and its shared result buffer"""
+
+    def __init__(self, worker_id: int, max_rows: int, dimension: int):
+        self.worker_id = worker_id
+        self.shm = shared_memory.SharedMemory(create=True, size=max_rows * dimension * 4)
+        self.buffer = np.ndarray((max_rows, dimension), dtype=np.float32, buffer=self.shm.buf)
+        self.process = None
+        self.conn = None
+        self.info = {}
+        self.generation = 0
+        self.alive = False
+        self.requests = 0
+        self.restarts = 0
+        # Encode throughput: rows embedded and seconds spent on them
+        self.rows = 0
+        self.busy_seconds = 0.0
+
+
+class EmbeddingWorkerPool:
+    """Pool of worker processes hosting the embedding and prediction models outside the web process
+
+    Each worker owns a shared-memory buffer of `max_rows` x `dimension` float32 values.
+    Embeddings (and prediction inputs) travel through that buffer; only small control
+    messages cross the pipe. Dead or hung workers are replaced in the background.
+    """
+
+    name = 'pool'
+
+    def __init__(self, size: int, dimension: int, backend_name: str, model_path: str,
+                 max_rows: int = 256, request_timeout: float = 30.0, start_timeout: float = 300.0):
+        self.size = max(1, size)
+        self.dimension = dimension
+        self.backend_name = backend_name
+        self.model_path = model_path
+        self.max_rows = max(1, max_rows)
+        self.request_timeout = request_timeout
+        self.start_timeout = start_timeout
+
+        # Spawned workers never inherit Flask's threads or locks
+        self._context = multiprocessing.get_context('spawn')
+        self._handles = []
+        self._idle = queue.Queue()
+        self._dead = queue.Queue()
+        self._stopped = threading.Event()
+        self._state_lock = threading.Lock()
+        self._monitor = None
+        self.predictor = None
+        self.failures = 0
+
+    def start(self) -> 'EmbeddingWorkerPool':
+        """Start every worker and wait until each has loaded its models"""
+        try:
+            for worker_id in range(self.size):
+                handle = _WorkerHandle(worker_id, self.max_rows, self.dimension)
+                self._handles.append(handle)
+                self._spawn(handle)
+        except Exception:
+            self.stop()
+            raise
+
+        if any(handle.info.get('prediction_model') for handle in self._handles):
+            self.predictor = _PoolPredictor(self)
+
+        self._monitor = threading.Thread(target=self._watch_workers, name='embedding-pool-monitor', daemon=True)
+        self._monitor.start()
+
+        logger.info(f"Embedding worker pool started with {self.size} workers")
+        return self
+
+    def encode(self, texts: List[str], batch_size: int = 64) -> np.ndarray:
+        """Embed texts in worker processes, max_rows texts per round trip"""
+        chunks = [
+            self._call('encode', texts[start:start + self.max_rows])
+            for start in range(0, len(texts), self.max_rows)
+        ]
+        if not chunks:
+            return np.zeros((0, self.dimension), dtype=np.float32)
+        return np.vstack(chunks)
+
+    def predict(self, embeddings: np.ndarray) -> np.ndarray:
+        """Run the pickled prediction model on embeddings inside a worker"""
+        embeddings = np.asarray(embeddings, dtype=np.float32).reshape(-1, self.dimension)
+        results = [
+            self._call('predict', embeddings[start:start + self.max_rows])
+            for start in range(0, len(embeddings), self.max_rows)
+        ]
+        return np.concatenate(results) if results else np.zeros(0)
+
+    def stop(self):
+        """Stop workers and release shared memory"""
+        self._stopped.set()
+
+        for handle in self._handles:
+            if handle.alive:
+                try:
+                    handle.conn.send(('stop', None))
+                except (OSError, BrokenPipeError):
+                    pass
+            self._terminate(handle)
+            handle.shm.close()
+            handle.shm.unlink()
+
+    def describe(self) -> Dict[str, Any]:
+        backend = next((handle.info.get('backend') for handle in self._handles if handle.info), None)
+        return {"backend": self.name, "workers": self.size, "worker_backend": backend}
+
+    def stats(self) -> Dict[str, Any]:
+        """Worker liveness, restart and request counters"""
+        return {
+            "size": self.size,
+            "alive": sum(1 for handle in self._handles if handle.alive),
+            "idle": self._idle.qsize(),
+            "failures": self.failures,
+            "maxRowsPerCall": self.max_rows,
+            "workers": [
+                {
+                    "id": handle.worker_id,
+                    "pid": handle.info.get('pid'),
+                    "alive": handle.alive,
+                    "requests": handle.requests,
+                    "restarts": handle.restarts,
+                    "rowsEncoded": handle.rows,
+                    "busySeconds": round(handle.busy_seconds, 3),
+                    "rowsPerSecond": round(handle.rows / handle.busy_seconds, 1) if handle.busy_seconds > 0 else 0.0
+                }
+                for handle in self._handles
+            ]
+        }
+
+    def _call(self, op: str, payload):
+        """Send one request to an idle worker and collect its reply"""
+        handle = self._acquire()
+        started = time.perf_counter()
+
+        try:
+            if op == 'predict':
+                handle.buffer[:len(payload)] = payload
+                message = len(payload)
+            else:
+                message = payload
+
+            handle.conn.send((op, message))
+            if not handle.conn.poll(self.request_timeout):
+                raise TimeoutError(f"no reply within {self.request_timeout}s")
+            status, result = handle.conn.recv()
+
+        except (EOFError, OSError, TimeoutError) as e:
+            self._mark_dead(handle, repr(e))
+            raise RuntimeError(f"Embedding worker {handle.worker_id} failed: {e!r}")
+
+        handle.requests += 1
+
+        if status != 'ok':
+            self._release(handle)
+            raise RuntimeError(result)
+
+        # Copy out of shared memory before the worker can be reused
+        if op == 'encode':
+            output = np.array(handle.buffer[:result])
+            handle.rows += result
+            handle.busy_seconds += time.perf_counter() - started
+        else:
+            output = result
+        self._release(handle)
+        return output
+
+    def _acquire(self) -> _WorkerHandle:
+        deadline = time.monotonic() + self.request_timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise RuntimeError("No embedding worker available")
+            try:
+                handle, generation = self._idle.get(timeout=remaining)
+            except queue.Empty:
+                raise RuntimeError("No embedding worker available")
+
+            # Entries from before a restart are stale
+            if handle.alive and generation == handle.generation:
+                return handle
+
+    def _release(self, handle: _WorkerHandle):
+        self._idle.put((handle, handle.generation))
+
+    def _spawn(self, handle: _WorkerHandle):
+        parent_conn, child_conn = self._context.Pipe()
+        process = self._context.Process(
+            target=_worker_main,
+            args=(handle.worker_id, child_conn, handle.shm.name, self.max_rows, self.dimension,
+                  self.backend_name, self.model_path),
+            name=f"embedding-worker-{handle.worker_id}",
+            daemon=True
+        )
+        process.start()
+        child_conn.close()
+
+        if not parent_conn.poll(self.start_timeout):
+            process.kill()
+            raise RuntimeError(f"Embedding worker {handle.worker_id} did not start within {self.start_timeout}s")
+
+        status, info = parent_conn.recv()
+        if status != 'ready':
+            process.join(timeout=5)
+            raise RuntimeError(info)
+
+        handle.process = process
+        handle.conn = parent_conn
+        handle.info = info
+        handle.generation += 1
+        handle.alive = True
+        self._release(handle)
+
+    def _mark_dead(self, handle: _WorkerHandle, reason):
+        # Both the monitor and a failing caller may notice the same crash
+        with self._state_lock:
+            if not handle.alive:
+                return
+            handle.alive = False
+            self.failures += 1
+
+        logger.error(f"Embedding worker {handle.worker_id} (pid {handle.info.get('pid')}) is dead: {reason}")
+        self._terminate(handle)
+        self._dead.put(handle)
+
+    def _terminate(self, handle: _WorkerHandle):
+        if handle.process is not None and handle.process.is_alive():
+            handle.process.kill()
+            handle.process.join(timeout=5)
+        if handle.conn is not None:
+            handle.conn.close()
+
+    def _watch_workers(self):
+        """Detect crashed idle workers and restart dead ones"""
+        while not self._stopped.is_set():
+            for handle in self._handles:
+                if handle.alive and not handle.process.is_alive():
+                    self._mark_dead(handle, f"exit code {handle.process.exitcode}")
+
+            try:
+                handle = self._dead.get(timeout=1.0)
+            except queue.Empty:
+                continue
+
+            if self._stopped.is_set():
+                return
+
+            try:
+                self._spawn(handle)
+                handle.restarts += 1
+                logger.info(f"Restarted embedding worker {handle.worker_id} (pid {handle.info.get('pid')})")
+            except Exception as e:
+                logger.error(f"Failed to restart embedding worker {handle.worker_id}: {e}")
+                self._dead.put(handle)
+                self._stopped.wait(5.0)
+
+
+class _PoolPredictor:
+    """Stands in for the pickled model so AIService calls predict() unchanged"""
+
+    def __init__(self, pool: EmbeddingWorkerPool):
+        self.pool = pool
+
+    def predict(self, input_data) -> np.ndarray:
+        return self.pool.predict(input_data)
@@ -0,0 +1,233 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - non-POSIX platforms fall back to a process-local lock
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+STORE_FORMAT_VERSION = 1
+KEY_DIGEST_SIZE = 16
+
+
+class EmbeddingStore:
+    """Append-only, memory-mapped embedding store shared by every worker on a host
+
+    Layout of the store directory:
+      meta.json    - model name, dimension and dtype the vectors were produced with
+      vectors.bin  - fixed-width rows of `dimension` floats, opened with np.memmap
+      keys.bin     - one 16-byte key digest per row; row number == record position
+      .lock        - flock target serialising appends across processes
+    """
+
+    def __init__(self, path: str, model_name: str, dimension: int, dtype: str = 'float32'):
+        self.path = path
+        self.model_name = model_name
+        self.dimension = int(dimension)
+        self.dtype = np.dtype(dtype)
+        if self.dtype not in (np.dtype('float32'), np.dtype('float16')):
+            raise ValueError(f"Unsupported embedding store dtype: {dtype}")
+
+        self.row_bytes = self.dimension * self.dtype.itemsize
+        self.meta_path = os.path.join(path, 'meta.json')
+        self.vectors_path = os.path.join(path, 'vectors.bin')
+        self.keys_path = os.path.join(path, 'keys.bin')
+        self.lock_path = os.path.join(path, '.lock')
+
+        self._rows = {}
+        self._keys_offset = 0
+        self._keys_inode = None
+        self._mapped = None
+        self._mapped_rows = 0
+        self._lock = threading.RLock()
+
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+
+    def open(self) -> 'EmbeddingStore':
+        """Create or validate the store, discarding it if it was built for another model"""
+        os.makedirs(self.path, exist_ok=True)
+
+        with self._exclusive():
+            expected = self._expected_meta()
+            current = self._read_meta()
+            if current != expected:
+                if current is not None:
+                    logger.info(
+                        f"Embedding store at {self.path} was built for {current.get('model')}, "
+                        f"invalidating for {self.model_name}"
+                    )
+                self._reset_files(expected)
+
+        self._refresh_keys()
+        logger.info(f"Embedding store opened at {self.path} with {len(self._rows)} vectors")
+        return self
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        """Return the stored vector for key, or None if it has not been embedded yet"""
+        digest = self._digest(key)
+
+        with self._lock:
+            row = self._rows.get(digest)
+            if row is None or row >= self._mapped_rows:
+                # Another worker may have appended it since we last looked, or reset the store
+                # since the current mapping was made (the mapping itself stays readable)
+                self._refresh_keys()
+                row = self._rows.get(digest)
+
+            if row is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            return np.array(self._map_rows(row + 1)[row], dtype=np.float32)
+
+    def put(self, key: str, vector) -> bool:
+        """Append a vector for key unless some worker already stored it"""
+        vector = np.asarray(vector, dtype=self.dtype).reshape(-1)
+        if vector.shape[0] != self.dimension:
+            raise ValueError(f"Expected {self.dimension}-dimensional vector, got {vector.shape[0]}")
+
+        digest = self._digest(key)
+
+        with self._lock, self._exclusive():
+            # Another worker may have reset the store for a different model since we opened it
+            if self._read_meta() != self._expected_meta():
+                logger.warning(f"Embedding store at {self.path} now belongs to another model; not storing")
+                return False
+
+            self._refresh_keys()
+            if digest in self._rows:
+                return False
+
+            row = self._keys_offset // KEY_DIGEST_SIZE
+
+            # Write the vector before its key so readers never see a key without data
+            with open(self.vectors_path, 'r+b') as f:
+                f.seek(row * self.row_bytes)
+                f.write(vector.tobytes())
+
+            with open(self.keys_path, 'ab') as f:
+                f.write(digest)
+
+            self._rows[digest] = row
+            self._keys_offset += KEY_DIGEST_SIZE
+            self.writes += 1
+            return True
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def stats(self) -> Dict[str, Any]:
+        """Store counters suitable for health payloads"""
+        lookups = self.hits + self.misses
+        return {
+            "path": self.path,
+            "model": self.model_name,
+            "dtype": self.dtype.name,
+            "vectors": len(self._rows),
+            "bytes": len(self._rows) * self.row_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "writes": self.writes,
+            "hitRate": round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+    def _expected_meta(self) -> Dict[str, Any]:
+        return {
+            "format": STORE_FORMAT_VERSION,
+            "model": self.model_name,
+            "dimension": self.dimension,
+            "dtype": self.dtype.name
+        }
+
+    def _read_meta(self) -> Optional[Dict[str, Any]]:
+        if not os.path.exists(self.meta_path):
+            return None
+        with open(self.meta_path) as f:
+            return json.load(f)
+
+    def _reset_files(self, meta: Dict[str, Any]):
+        """Start an empty store; caller must hold the exclusive lock"""
+        for path in (self.vectors_path, self.keys_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+        open(self.vectors_path, 'wb').close()
+        open(self.keys_path, 'wb').close()
+
+        # Write meta last and atomically so a half-reset store is never trusted
+        tmp_path = f"{self.meta_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, self.meta_path)
+
+        self._forget_rows()
+
+    def _forget_rows(self):
+        self._rows = {}
+        self._keys_offset = 0
+        self._keys_inode = None
+        self._mapped = None
+        self._mapped_rows = 0
+
+    def _refresh_keys(self):
+        """Read key records appended since the last refresh
+
+        A reset by another worker replaces keys.bin, so a new file (or one shorter than what
+        was read) drops every row read so far before reading it from the start.
+        """
+        stat = os.stat(self.keys_path)
+        if stat.st_ino != self._keys_inode or stat.st_size < self._keys_offset:
+            self._forget_rows()
+            self._keys_inode = stat.st_ino
+        size = stat.st_size - stat.st_size % KEY_DIGEST_SIZE
+        if size <= self._keys_offset:
+            return
+
+        with open(self.keys_path, 'rb') as f:
+            f.seek(self._keys_offset)
+            data = f.read(size - self._keys_offset)
+
+        first_row = self._keys_offset // KEY_DIGEST_SIZE
+        for i in range(len(data) // KEY_DIGEST_SIZE):
+            digest = data[i * KEY_DIGEST_SIZE:(i + 1) * KEY_DIGEST_SIZE]
+            self._rows.setdefault(digest, first_row + i)
+
+        self._keys_offset = size
+
+    def _map_rows(self, min_rows: int) -> np.memmap:
+        """Return a read-only mapping covering at least min_rows rows"""
+        if self._mapped is None or self._mapped_rows < min_rows:
+            rows = self._keys_offset // KEY_DIGEST_SIZE
+            self._mapped = np.memmap(self.vectors_path, dtype=self.dtype, mode='r', shape=(rows, self.dimension))
+            self._mapped_rows = rows
+        return self._mapped
+
+    @contextmanager
+    def _exclusive(self):
+        """Serialise writers across processes on this host"""
+        if fcntl is None:
+            yield
+            return
+
+        with open(self.lock_path, 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _digest(key: str) -> bytes:
+        return hashlib.blake2b(key.encode('utf-8'), digest_size=KEY_DIGEST_SIZE).digest()
@@ -0,0 +1,374 @@
+import json
+import logging
+import mmap
+import os
+import shutil
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from config import Config
+from services.diet_index import DietBitmaps, PackedBitmap
+from services.ingredient_classifier import DIET_CLASSIFIER_VERSION
+from services.local_vector_index import ExactVectorIndex, LocalVectorIndex
+
+logger = logging.getLogger(__name__)
+
+CURRENT_FILE = 'CURRENT'
+META_FILE = 'meta.json'
+CHUNK_ROWS = 65536
+
+
+def read_current(root: str) -> Optional[str]:
+    """Version named by the CURRENT pointer, or None if no snapshot was published"""
+    try:
+        with open(os.path.join(root, CURRENT_FILE)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def _encode_column(values: List[Optional[str]]):
+    """Small-integer codes for a categorical column (-1 for missing) plus its vocabulary"""
+    vocabulary = sorted({value for value in values if isinstance(value, str)})
+    lookup = {value: code for code, value in enumerate(vocabulary)}
+    codes = np.array([lookup.get(value, -1) if isinstance(value, str) else -1 for value in values], dtype=np.int16)
+    return codes, vocabulary
+
+
+def write_snapshot(index: LocalVectorIndex, root: str = Config.INDEX_SNAPSHOT_DIR,
+                   created_at: Optional[datetime] = None, keep: int = Config.INDEX_SNAPSHOT_KEEP) -> str:
+    """Persist the live rows of an index as a new snapshot version and publish it atomically
+
+    Readers only ever see complete versions: files are written into a temporary
+    directory that is renamed into place before CURRENT is replaced. created_at is the
+    point the index is current to, from which readers replay later changes; versions
+    are named by publish time, so pruning always keeps the newest ones.
+    """
+    published_at = datetime.utcnow()
+    created_at = created_at or published_at
+    version = f"{published_at:%Y%m%dT%H%M%S%f}-{os.getpid()}"
+    os.makedirs(root, exist_ok=True)
+    tmp_dir = os.path.join(root, f".tmp-{version}")
+    os.makedirs(tmp_dir)
+
+    try:
+        with index._lock:
+            live_rows = np.flatnonzero(~index._deleted)
+            vectors = index.row_vectors()
+            documents = [index.documents[row] for row in live_rows]
+
+            matrix = np.lib.format.open_memmap(
+                os.path.join(tmp_dir, 'vectors.npy'), mode='w+', dtype=np.float32,
+                shape=(len(live_rows), index.dimension)
+            )
+            for start in range(0, len(live_rows), CHUNK_ROWS):
+                matrix[start:start + CHUNK_ROWS] = vectors[live_rows[start:start + CHUNK_ROWS]]
+            matrix.flush()
+            del matrix
+
+            # Diet bitmaps renumbered to the live rows, one packed row per restriction
+            restrictions = list(index.diet.bitmaps)
+            diet_bits = np.zeros((len(restrictions), (len(live_rows) + 7) >> 3), dtype=np.uint8)
+            for position, restriction in enumerate(restrictions):
+                bitmap = index.diet.bitmaps[restriction]
+                compliant = np.unpackbits(bitmap.packed(len(index.documents)), count=len(index.documents)).astype(bool)
+                diet_bits[position] = np.packbits(compliant[live_rows])
+            np.save(os.path.join(tmp_dir, 'diet_bitmaps.npy'), diet_bits)
+
+        # Documents as JSON lines with a row -> byte offset table, decoded only for hits
+        offsets = np.zeros(len(documents) + 1, dtype=np.int64)
+        with open(os.path.join(tmp_dir, 'docs.jsonl'), 'wb') as f:
+            for row, document in enumerate(documents):
+                document = dict(document)
+                if '_id' in document:
+                    document['_id'] = str(document['_id'])
+                line = json.dumps(document, default=str, ensure_ascii=False).encode('utf-8') + b'\n'
+                f.write(line)
+                offsets[row + 1] = offsets[row] + len(line)
+        np.save(os.path.join(tmp_dir, 'doc_offsets.npy'), offsets)
+
+        # Filter columns, so filter masks are computed without decoding documents
+        mood_codes, moods = _encode_column([document.get('mood') for document in documents])
+        difficulty_codes, difficulties = _encode_column([document.get('difficulty') for document in documents])
+        np.save(os.path.join(tmp_dir, 'mood_codes.npy'), mood_codes)
+        np.save(os.path.join(tmp_dir, 'difficulty_codes.npy'), difficulty_codes)
+
+        tag_lists = [[tag for tag in (document.get('tags') or ()) if isinstance(tag, str)] for document in documents]
+        tags = sorted({tag for tag_list in tag_lists for tag in tag_list})
+        tag_lookup = {tag: code for code, tag in enumerate(tags)}
+        tag_offsets = np.zeros(len(documents) + 1, dtype=np.int64)
+        tag_offsets[1:] = np.cumsum([len(tag_list) for tag_list in tag_lists])
+        tag_codes = np.array([tag_lookup[tag] for tag_list in tag_lists for tag in tag_list], dtype=np.int32)
+        np.save(os.path.join(tmp_dir, 'tag_offsets.npy'), tag_offsets)
+        np.save(os.path.join(tmp_dir, 'tag_codes.npy'), tag_codes)
+
+        # Keys are only needed to apply changes, so they load lazily
+        with open(os.path.join(tmp_dir, 'keys.json'), 'w') as f:
+            json.dump({
+                "names": [document.get('name') for document in documents],
+                "ids": [str(document['_id']) if '_id' in document else None for document in documents]
+            }, f)
+
+        with open(os.path.join(tmp_dir, META_FILE), 'w') as f:
+            json.dump({
+                "version": version,
+                "count": len(documents),
+                "dimension": index.dimension,
+                "createdAt": created_at.isoformat(),
+                "moods": moods,
+                "difficulties": difficulties,
+                "tags": tags,
+                "dietRestrictions": restrictions,
+                "dietClassifierVersion": DIET_CLASSIFIER_VERSION
+            }, f)
+
+        os.rename(tmp_dir, os.path.join(root, version))
+    except Exception:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+    pointer_tmp = os.path.join(root, f"{CURRENT_FILE}.{version}.tmp")
+    with open(pointer_tmp, 'w') as f:
+        f.write(version)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(pointer_tmp, os.path.join(root, CURRENT_FILE))
+
+    _prune_versions(root, keep)
+    logger.info(f"Published index snapshot {version} with {len(documents)} recipes")
+    return version
+
+
+def _prune_versions(root: str, keep: int):
+    # Processes still mapping a pruned version keep their pages until they swap: every file of a
+    # version is opened when it is mapped, so nothing is read by path afterwards
+    versions = sorted(entry for entry in os.listdir(root) if os.path.isfile(os.path.join(root, entry, META_FILE)))
+    for version in versions[:-max(1, keep)]:
+        shutil.rmtree(os.path.join(root, version), ignore_errors=True)
+
+
+class _SnapshotDocuments:
+    """Row-indexed documents: snapshot rows decoded on access, later changes held in memory"""
+
+    def __init__(self, path: str, count: int):
+        self.count = count
+        self.offsets = np.load(os.path.join(path, 'doc_offsets.npy'), mmap_mode='r')
+        with open(os.path.join(path, 'docs.jsonl'), 'rb') as f:
+            self._data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if count else b''
+        self.replaced = {}
+        self.appended = []
+
+    def __len__(self) -> int:
+        return self.count + len(self.appended)
+
+    def __getitem__(self, row: int) -> Dict[str, Any]:
+        if row >= self.count:
+            return self.appended[row - self.count]
+        if row in self.replaced:
+            return self.replaced[row]
+        return json.loads(self._data[int(self.offsets[row]):int(self.offsets[row + 1])])
+
+    def __setitem__(self, row: int, document: Dict[str, Any]):
+        if row >= self.count:
+            self.appended[row - self.count] = document
+        else:
+            self.replaced[row] = document
+
+    def __iter__(self):
+        for row in range(len(self)):
+            yield self[row]
+
+    def append(self, document: Dict[str, Any]):
+        self.appended.append(document)
+
+
+class SnapshotVectorIndex(ExactVectorIndex):
+    """Exact index served from a read-only memory-mapped snapshot
+
+    The vector matrix, filter columns and documents are mapped from disk, so every
+    process opening the same version shares one physical copy through the page cache
+    and opening costs no MongoDB reads. Changes applied after opening live in small
+    per-process deltas: appended rows, overridden base vectors and tombstones.
+    """
+
+    def __init__(self, path: str):
+        with open(os.path.join(path, META_FILE)) as f:
+            meta = json.load(f)
+
+        super().__init__(meta['dimension'])
+        self.path = path
+        self.snapshot_version = meta['version']
+        self.snapshot_created_at = datetime.fromisoformat(meta['createdAt'])
+        self._meta = meta
+
+        self._base_count = meta['count']
+        self._base = np.load(os.path.join(path, 'vectors.npy'), mmap_mode='r')
+        self._mood_codes = np.load(os.path.join(path, 'mood_codes.npy'), mmap_mode='r')
+        self._difficulty_codes = np.load(os.path.join(path, 'difficulty_codes.npy'), mmap_mode='r')
+        self._tag_offsets = np.load(os.path.join(path, 'tag_offsets.npy'), mmap_mode='r')
+        self._tag_codes = np.load(os.path.join(path, 'tag_codes.npy'), mmap_mode='r')
+
+        self.documents = _SnapshotDocuments(path, self._base_count)
+        self.diet = self._load_diet_bitmaps(path)
+        self._deleted = np.zeros(self._base_count, dtype=bool)
+        self._overrides = {}
+        # Mapped now, parsed on the first change: pruning may unlink the file before then
+        with open(os.path.join(path, 'keys.json'), 'rb') as f:
+            self._keys_data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._keys_loaded = False
+
+    def vector_bytes(self) -> int:
+        return self._matrix.nbytes + len(self._overrides) * self.dimension * 4
+
+    def row_vectors(self) -> np.ndarray:
+        vectors = np.vstack([self._base, self._matrix[:len(self.documents) - self._base_count]])
+        for row, vector in self._overrides.items():
+            vectors[row] = vector
+        return vectors
+
+    def filter_mask(self, field: str, value: str) -> np.ndarray:
+        mask = self._filter_masks.get((field, value))
+        if mask is not None:
+            return mask
+
+        mask = np.zeros(len(self.documents), dtype=bool)
+
+        # Snapshot rows straight from the filter columns
+        vocabulary = self._meta['moods'] if field == 'mood' else self._meta['difficulties']
+        codes = self._mood_codes if field == 'mood' else self._difficulty_codes
+        if value in vocabulary:
+            mask[:self._base_count] |= codes == vocabulary.index(value)
+        if field == 'mood' and value in self._meta['tags']:
+            positions = np.flatnonzero(self._tag_codes == self._meta['tags'].index(value))
+            mask[np.searchsorted(self._tag_offsets, positions, side='right') - 1] = True
+
+        # Rows changed since the snapshot was taken
+        for row in list(self.documents.replaced) + list(range(self._base_count, len(self.documents))):
+            mask[row] = self._matches_filter(self.documents[row], field, value)
+
+        self._filter_masks[(field, value)] = mask
+        return mask
+
+    def _load_diet_bitmaps(self, path: str) -> DietBitmaps:
+        restrictions = self._meta.get('dietRestrictions')
+        if restrictions is None or self._meta.get('dietClassifierVersion') != DIET_CLASSIFIER_VERSION:
+            # Snapshot written before diet bitmaps existed, or by another classifier: derive them from the documents once
+            diet = DietBitmaps()
+            diet.set_rows(range(self._base_count), list(self.documents))
+            return diet
+
+        # Mapped read-only and shared; a bitmap is copied into this process only once a change touches it
+        bits = np.load(os.path.join(path, 'diet_bitmaps.npy'), mmap_mode='r')
+        return DietBitmaps(bitmaps={restriction: PackedBitmap(bits[position]) for position, restriction in enumerate(restrictions)})
+
+    def remove(self, ids=(), names=()) -> int:
+        self._ensure_keys()
+        return super().remove(ids, names)
+
+    def contains_id(self, recipe_id) -> bool:
+        self._ensure_keys()
+        return super().contains_id(recipe_id)
+
+    def live_ids(self) -> List[str]:
+        self._ensure_keys()
+        return super().live_ids()
+
+    def live_names_without_id(self) -> List[str]:
+        self._ensure_keys()
+        return super().live_names_without_id()
+
+    def stats(self) -> Dict[str, Any]:
+        stats = super().stats()
+        stats.update({
+            "snapshotVersion": self.snapshot_version,
+            "snapshotRecipes": self._base_count,
+            "sharedBytes": self._base.nbytes,
+            "deltaRecipes": len(self.documents) - self._base_count,
+            "overriddenRecipes": len(self._overrides)
+        })
+        return stats
+
+    def _find_row(self, document):
+        self._ensure_keys()
+        return super()._find_row(document)
+
+    def _ensure_keys(self):
+        if self._keys_loaded:
+            return
+        with self._lock:
+            if self._keys_loaded:
+                return
+            keys = json.loads(self._keys_data[:])
+            self._keys_data.close()
+            self.rows = {name: row for row, name in enumerate(keys['names']) if name is not None}
+            self.ids = {recipe_id: row for row, recipe_id in enumerate(keys['ids']) if recipe_id is not None}
+            self._keys_loaded = True
+
+    def _append_vectors(self, vectors: np.ndarray):
+        end = len(self.documents) - self._base_count
+        start = end - len(vectors)
+
+        if end > len(self._matrix):
+            grown = np.zeros((max(end, 2 * len(self._matrix)), self.dimension), dtype=np.float32)
+            grown[:start] = self._matrix[:start]
+            self._matrix = grown
+
+        self._matrix[start:end] = vectors
+
+    def _set_vector(self, row: int, vector: np.ndarray):
+        if row < self._base_count:
+            self._overrides[row] = np.array(vector, dtype=np.float32)
+        else:
+            self._matrix[row - self._base_count] = vector
+
+    def _score_all(self, query):
+        scores = self._base @ query
+        delta_rows = len(self.documents) - self._base_count
+        if delta_rows:
+            scores = np.concatenate([scores, self._matrix[:delta_rows] @ query])
+        if self._overrides:
+            rows = np.fromiter(self._overrides, dtype=np.int64, count=len(self._overrides))
+            scores[rows] = np.vstack(list(self._overrides.values())) @ query
+        return scores
+
+    def _score_rows(self, rows, query):
+        scores = np.empty(len(rows), dtype=np.float32)
+        in_base = rows < self._base_count
+        scores[in_base] = self._base[rows[in_base]] @ query
+        scores[~in_base] = self._matrix[rows[~in_base] - self._base_count] @ query
+        if self._overrides:
+            for position in np.flatnonzero(np.isin(rows, np.fromiter(self._overrides, dtype=np.int64))):
+                scores[position] = self._overrides[int(rows[position])] @ query
+        return scores
+
+
+def open_snapshot(root: str = Config.INDEX_SNAPSHOT_DIR, dimension: int = Config.VECTOR_DIMENSION) -> Optional[SnapshotVectorIndex]:
+    """Map the published snapshot, or None if there is none or it does not fit this deployment"""
+    version = read_current(root)
+    if version is None:
+        return None
+
+    index = SnapshotVectorIndex(os.path.join(root, version))
+    if index.dimension != dimension:
+        logger.warning(f"Index snapshot {version} has dimension {index.dimension}, expected {dimension}; ignoring it")
+        return None
+
+    logger.info(f"Mapped index snapshot {version} with {index._base_count} recipes")
+    return index
+
+
+if __name__ == "__main__":
+    # Offline job: load the recipes collection once and publish a snapshot for the web workers
+    from pymongo import MongoClient
+
+    logging.basicConfig(level=logging.INFO)
+
+    client = MongoClient(Config.MONGODB_URI)
+    collection = client[Config.DATABASE_NAME][Config.RECIPES_COLLECTION]
+
+    started = datetime.utcnow()
+    index = ExactVectorIndex.from_collection(collection)
+    version = write_snapshot(index, created_at=started)
+    print(f"Published snapshot {version} with {len(index)} recipes to {Config.INDEX_SNAPSHOT_DIR}")
@@ -0,0 +1,352 @@
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List
+
+from pymongo.errors import OperationFailure, PyMongoError
+
+from config import Config
+from services.local_vector_index import is_searchable
+
+logger = logging.getLogger(__name__)
+
+# Change stream operations that invalidate the whole collection
+REBUILD_OPERATIONS = {'drop', 'rename', 'dropDatabase', 'invalidate'}
+
+
+class LocalIndexSync:
+    """Keeps the in-process vector index in step with the recipes collection
+
+    Loads one snapshot, then tails the collection: a change stream when the deployment
+    supports it, otherwise keyset polling on (updatedAt, _id), which index_recipe_vectors
+    maintains. Polling sees soft deletes (delete_recipes stamps `deleted` and updatedAt and
+    drops the vector) on the next poll. It cannot see documents removed outright, so every
+    reconcile_interval it scans _ids (vector-free, but the whole collection); until then a
+    hard-deleted recipe stays searchable. Applying a change twice is harmless, so overlaps
+    are fine.
+
+    updatedAt is stamped by the writer before its bulk write commits, so a slow or
+    concurrent writer can commit rows older than the newest one already polled. Each
+    poll therefore re-scans the last `lookback` seconds of (updatedAt, _id) keys and
+    fetches only the rows whose version it has not applied yet.
+    """
+
+    def __init__(self, search_service, collection, mode: str = Config.INDEX_SYNC_MODE,
+                 poll_interval: float = Config.INDEX_SYNC_POLL_INTERVAL,
+                 reconcile_interval: float = Config.INDEX_SYNC_RECONCILE_INTERVAL,
+                 batch_size: int = Config.INDEX_SYNC_BATCH_SIZE,
+                 lookback: float = Config.INDEX_SYNC_LOOKBACK):
+        self.search_service = search_service
+        self.collection = collection
+        self.mode = mode
+        self.poll_interval = poll_interval
+        self.reconcile_interval = reconcile_interval
+        self.batch_size = max(1, batch_size)
+        self.lookback = timedelta(seconds=max(0.0, lookback))
+
+        self._thread = None
+        self._stopped = threading.Event()
+
+        self.active_mode = None
+        self.resume_token = None
+        self.poll_position = None
+        # _id -> updatedAt applied, for rows inside the lookback window
+        self._seen_versions = {}
+        self._compacting = False
+        self.last_change_at = None
+        self.last_applied_at = None
+        self.lag_seconds = None
+        self.applied = 0
+        self.deleted = 0
+        self.rebuilds = 0
+        self.reconciles = 0
+        self.errors = 0
+        self.last_error = None
+
+    def start(self) -> 'LocalIndexSync':
+        """Run the snapshot load and tailing loop in a daemon thread"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='local-index-sync', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def stats(self) -> Dict[str, Any]:
+        """Sync position, lag and counters for health payloads"""
+        position = None
+        if self.active_mode == 'change_stream' and self.resume_token is not None:
+            position = {"resumeToken": str(self.resume_token.get('_data'))}
+        elif self.poll_position is not None:
+            updated_at, last_id = self.poll_position
+            position = {"updatedAt": updated_at.isoformat() if updated_at else None, "_id": str(last_id) if last_id else None}
+
+        return {
+            "mode": self.active_mode,
+            "running": self._thread is not None and self._thread.is_alive(),
+            "position": position,
+            "lagSeconds": round(self.lag_seconds, 3) if self.lag_seconds is not None else None,
+            "lastAppliedAt": self.last_applied_at.isoformat() if self.last_applied_at else None,
+            "applied": self.applied,
+            "lookbackSeconds": self.lookback.total_seconds(),
+            "deleted": self.deleted,
+            "rebuilds": self.rebuilds,
+            "reconciles": self.reconciles,
+            "errors": self.errors,
+            "lastError": self.last_error
+        }
+
+    def _run(self):
+        while not self._stopped.is_set():
+            try:
+                if self.mode in ('auto', 'change_stream') and self._tail_change_stream():
+                    continue
+                self._tail_polling()
+            except Exception as e:
+                self._record_error(e)
+                self._stopped.wait(self.poll_interval)
+
+    def _rebuild(self):
+        """Full reload from the published snapshot or, failing that, the whole collection"""
+        started = datetime.utcnow()
+        if self.search_service.local_index is None:
+            # First load shares the lazy-load lock with searches arriving meanwhile
+            index = self.search_service.get_local_index()
+        else:
+            index = self.search_service.reload_local_index()
+        self.rebuilds += 1
+
+        snapshot_created_at = getattr(index, 'snapshot_created_at', None)
+        if snapshot_created_at is not None:
+            # Replay whatever changed since the snapshot was taken
+            logger.info(f"Local vector index mapped from snapshot {index.snapshot_version}, catching up")
+            self.poll_position = (snapshot_created_at, None)
+            self._seen_versions = {}
+            self._poll_changes()
+            self._reconcile_deletes()
+        else:
+            # Resume from just before the load so writes racing with it are re-applied
+            self.poll_position = (started, None)
+            self._seen_versions = {}
+            logger.info(f"Local vector index rebuilt from MongoDB ({self.rebuilds} rebuilds)")
+
+    def _tail_change_stream(self) -> bool:
+        """Follow a change stream; returns False if the deployment has no change streams"""
+        try:
+            # Open the stream before the snapshot load so nothing written during the load is missed
+            stream = self.collection.watch(
+                full_document='updateLookup',
+                resume_after=self.resume_token,
+                max_await_time_ms=int(self.poll_interval * 1000)
+            )
+        except OperationFailure as e:
+            if self.mode == 'change_stream':
+                raise
+            logger.info(f"Change streams unavailable ({e}), syncing the local index by polling")
+            self.mode = 'poll'
+            return False
+
+        self.active_mode = 'change_stream'
+        with stream:
+            if self.resume_token is None or self.search_service.local_index is None:
+                self._rebuild()
+
+            while not self._stopped.is_set():
+                change = stream.try_next()
+                if change is None:
+                    self.resume_token = stream.resume_token
+                    self.lag_seconds = 0.0
+                    if self.search_service.snapshot_is_stale():
+                        self._rebuild()
+                    continue
+
+                batch = [change]
+                while len(batch) < self.batch_size:
+                    change = stream.try_next()
+                    if change is None:
+                        break
+                    batch.append(change)
+
+                if any(change['operationType'] in REBUILD_OPERATIONS for change in batch):
+                    # Reopen a fresh stream, which reloads the snapshot
+                    self.resume_token = None
+                    return True
+
+                self._apply_changes(batch)
+                self.resume_token = stream.resume_token
+        return True
+
+    def _apply_changes(self, changes: List[Dict[str, Any]]):
+        upserts = []
+        removed_ids = []
+        for change in changes:
+            operation = change['operationType']
+            if operation == 'delete':
+                removed_ids.append(change['documentKey']['_id'])
+            elif operation in ('insert', 'update', 'replace'):
+                document = change.get('fullDocument')
+                if document is None:
+                    # Deleted again before the lookup; a delete event follows
+                    continue
+                if is_searchable(document):
+                    upserts.append(document)
+                else:
+                    # Soft-deleted or vector dropped: it is no longer searchable
+                    removed_ids.append(document['_id'])
+
+        self._apply(upserts, removed_ids)
+
+        cluster_time = changes[-1].get('clusterTime')
+        if cluster_time is not None:
+            self.last_change_at = cluster_time.as_datetime().replace(tzinfo=None)
+            self.lag_seconds = max(0.0, (datetime.utcnow() - self.last_change_at).total_seconds())
+
+    def _tail_polling(self):
+        """Keyset-poll (updatedAt, _id) and reconcile deletions every reconcile_interval"""
+        self.active_mode = 'poll'
+
+        if self.search_service.local_index is None or self.poll_position is None:
+            self._rebuild()
+            last_reconcile = time.monotonic()
+        else:
+            last_reconcile = 0.0
+
+        while not self._stopped.is_set():
+            if self.search_service.snapshot_is_stale():
+                self._rebuild()
+                last_reconcile = time.monotonic()
+
+            self._poll_changes()
+
+            if time.monotonic() - last_reconcile >= self.reconcile_interval:
+                self._reconcile_deletes()
+                last_reconcile = time.monotonic()
+
+            self._stopped.wait(self.poll_interval)
+
+    def _poll_changes(self):
+        """Apply every recipe changed since the poll position, re-scanning the lookback window"""
+        updated_at, _ = self.poll_position
+        changes_before = self.applied + self.deleted
+        position = (updated_at - self.lookback, None)
+        while position is not None:
+            position = self._poll_once(position)
+
+        # Versions older than the next scan's window can no longer be seen again
+        window_start = self.poll_position[0] - self.lookback
+        self._seen_versions = {
+            recipe_id: version for recipe_id, version in self._seen_versions.items() if version >= window_start
+        }
+        self.lag_seconds = (
+            max(0.0, (datetime.utcnow() - self.last_change_at).total_seconds())
+            if self.applied + self.deleted > changes_before and self.last_change_at else 0.0
+        )
+
+    def _poll_once(self, position):
+        """Apply one page of changed recipes after `position`; returns the next page's position,
+        or None after a short page
+
+        Pages are read as (updatedAt, _id) keys from the covering index; full documents are
+        fetched only for versions not applied yet.
+        """
+        updated_at, last_id = position
+        if last_id is None:
+            query = {"updatedAt": {"$gte": updated_at}}
+        else:
+            query = {"$or": [
+                {"updatedAt": {"$gt": updated_at}},
+                {"updatedAt": updated_at, "_id": {"$gt": last_id}}
+            ]}
+
+        keys = list(
+            self.collection.find(query, {"_id": 1, "updatedAt": 1})
+            .sort([("updatedAt", 1), ("_id", 1)])
+            .limit(self.batch_size)
+        )
+        if not keys:
+            return None
+
+        changed_ids = [key['_id'] for key in keys if self._seen_versions.get(key['_id']) != key['updatedAt']]
+        if changed_ids:
+            # A row deleted since the key scan is simply missing here; reconciliation removes it
+            documents = list(self.collection.find({"_id": {"$in": changed_ids}}))
+            self._apply(
+                [document for document in documents if is_searchable(document)],
+                [document['_id'] for document in documents if not is_searchable(document)]
+            )
+            for document in documents:
+                # Rewritten since the key scan: the newer version is the one applied
+                self._seen_versions[document['_id']] = document.get('updatedAt')
+        for key in keys:
+            self._seen_versions.setdefault(key['_id'], key['updatedAt'])
+
+        newest = keys[-1]
+        if newest['updatedAt'] > self.poll_position[0]:
+            self.poll_position = (newest['updatedAt'], newest['_id'])
+            self.last_change_at = newest['updatedAt']
+        return (newest['updatedAt'], newest['_id']) if len(keys) == self.batch_size else None
+
+    def _reconcile_deletes(self):
+        """Tombstone indexed recipes whose _id no longer exists
+
+        Rows added in-process before any poll saw them have no _id yet and are matched on name.
+        """
+        local_index = self.search_service.local_index
+        if local_index is None:
+            return
+
+        existing = {str(document['_id']) for document in self.collection.find({}, {"_id": 1})}
+        missing = [recipe_id for recipe_id in local_index.live_ids() if recipe_id not in existing]
+        unkeyed = local_index.live_names_without_id()
+        if unkeyed:
+            found = {document['name'] for document in self.collection.find({"name": {"$in": unkeyed}}, {"name": 1})}
+            missing_names = [name for name in unkeyed if name not in found]
+        else:
+            missing_names = []
+        self.reconciles += 1
+
+        if missing or missing_names:
+            removed = self.search_service.apply_index_changes([], missing, missing_names)
+            self.deleted += removed
+            logger.info(f"Local index sync removed {removed} deleted recipes")
+
+        self._maybe_compact(local_index)
+
+    def _apply(self, upserts: List[Dict[str, Any]], removed_ids: List[Any]):
+        local_index = self.search_service.local_index
+        if local_index is None:
+            return
+
+        self.search_service.apply_index_changes(upserts, removed_ids)
+        self.applied += len(upserts)
+        self.deleted += len(removed_ids)
+        self.last_applied_at = datetime.utcnow()
+        self._maybe_compact(local_index)
+
+    def _maybe_compact(self, local_index):
+        # Tombstoned rows still cost memory and scan time; past half the index, reload it.
+        # The rebuild applies changes and reconciles deletes itself, which must not compact again
+        if self._compacting or not (local_index.tombstones and local_index.tombstones * 2 > len(local_index.documents)):
+            return
+
+        logger.info(f"Local index has {local_index.tombstones} tombstones, rebuilding")
+        self._compacting = True
+        try:
+            if getattr(local_index, 'snapshot_version', None) is not None:
+                # Re-mapping the same snapshot would bring the deleted rows back: publish the
+                # live rows as a new snapshot, stamped with the point this index is synced to
+                synced_to = self.poll_position[0] if self.poll_position is not None else None
+                self.search_service.save_index_snapshot(created_at=synced_to)
+            self._rebuild()
+        finally:
+            self._compacting = False
+
+    def _record_error(self, error: Exception):
+        self.errors += 1
+        self.last_error = str(error)
+        level = logging.WARNING if isinstance(error, PyMongoError) else logging.ERROR
+        logger.log(level, f"Local index sync error: {error}")
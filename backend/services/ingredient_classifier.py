@@ -0,0 +1,247 @@
+import re
+import unicodedata
+from functools import lru_cache
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+# Category lookup table: keyword -> categories it implies.
+# Keywords match as substrings of the lowercased ingredient ("bell peppers" -> pepper).
+INGREDIENT_CATEGORIES = {
+    # Proteins
+    'chicken': ('protein', 'meat'),
+    'beef': ('protein', 'meat'),
+    'pork': ('protein', 'meat'),
+    'turkey': ('protein', 'meat'),
+    'fish': ('protein', 'fish'),
+    'salmon': ('protein', 'fish'),
+    'tuna': ('protein', 'fish'),
+
+    # Vegetables
+    'tomato': ('veg',),
+    'onion': ('veg',),
+    'pepper': ('veg',),
+    'carrot': ('veg',),
+    'potato': ('veg',),
+
+    # Leafy greens
+    'lettuce': ('greens',),
+    'spinach': ('greens',),
+    'kale': ('greens',),
+    'arugula': ('greens',),
+    'greens': ('greens',),
+    'salad': ('greens',),
+
+    # Grains/Pasta
+    'pasta': ('grain', 'pasta'),
+    'noodles': ('grain', 'pasta'),
+    'spaghetti': ('grain', 'pasta'),
+    'rice': ('grain',),
+    'quinoa': ('grain',),
+
+    # Dairy
+    'cheese': ('dairy',),
+    'milk': ('dairy',),
+    'cream': ('dairy',),
+    'yogurt': ('dairy',),
+}
+
+
+def _build_keyword_table(table: Dict[str, Tuple[str, ...]]) -> Dict[str, FrozenSet[str]]:
+    """Fold in the categories of keywords contained in longer keywords
+
+    The matcher prefers the longest keyword at each position, so a match on a longer
+    keyword must also carry the categories of every keyword hidden inside it.
+    """
+    keyword_table = {}
+    for keyword in table:
+        categories = set()
+        for other, other_categories in table.items():
+            if other in keyword:
+                categories.update(other_categories)
+        keyword_table[keyword] = frozenset(categories)
+    return keyword_table
+
+
+KEYWORD_CATEGORIES = _build_keyword_table(INGREDIENT_CATEGORIES)
+
+# One alternation over every keyword, longest first so overlapping keywords resolve to the longer one
+KEYWORD_PATTERN = re.compile(
+    '|'.join(re.escape(keyword) for keyword in sorted(KEYWORD_CATEGORIES, key=len, reverse=True))
+)
+
+NO_CATEGORIES = frozenset()
+
+
+@lru_cache(maxsize=4096)
+def classify_ingredient(ingredient: str) -> FrozenSet[str]:
+    """Categories of a single ingredient name"""
+    matches = KEYWORD_PATTERN.findall(ingredient.lower())
+    if not matches:
+        return NO_CATEGORIES
+    return frozenset().union(*(KEYWORD_CATEGORIES[match] for match in matches))
+
+
+class IngredientProfile:
+    """Per-request classification of an ingredient list, computed once and shared by every heuristic"""
+
+    __slots__ = ('ingredients', 'per_ingredient', 'categories')
+
+    def __init__(self, ingredients: List[str]):
+        self.ingredients = ingredients
+        self.per_ingredient = [classify_ingredient(ingredient) for ingredient in ingredients]
+        self.categories = frozenset().union(*self.per_ingredient)
+
+    def has(self, category: str) -> bool:
+        return category in self.categories
+
+
+def classify_ingredients(ingredients: List[str]) -> IngredientProfile:
+    """Classify every ingredient of a request in one pass"""
+    return IngredientProfile(ingredients)
+
+
+# Diet lookup table: keyword -> animal-product / allergen categories.
+# Keywords match whole words ("eggplant" is not egg) and plurals through a trailing "s".
+# Unlike INGREDIENT_CATEGORIES, categories are not folded into longer keywords, so a
+# phrase overrides the keywords inside it ("peanut butter" is not dairy).
+DIET_CATEGORIES = {
+    # Meat and seafood
+    'chicken': ('meat',), 'beef': ('meat',), 'pork': ('meat',), 'turkey': ('meat',),
+    'bacon': ('meat',), 'ham': ('meat',), 'sausage': ('meat',), 'lamb': ('meat',),
+    'duck': ('meat',), 'veal': ('meat',), 'salami': ('meat',), 'pepperoni': ('meat',),
+    'prosciutto': ('meat',), 'gelatin': ('meat',), 'lard': ('meat',),
+    'mutton': ('meat',), 'goat': ('meat',), 'venison': ('meat',), 'rabbit': ('meat',), 'bison': ('meat',),
+    'goose': ('meat',), 'quail': ('meat',), 'pheasant': ('meat',), 'meat': ('meat',), 'meatball': ('meat',),
+    'meatloaf': ('meat',), 'chorizo': ('meat',), 'pancetta': ('meat',), 'guanciale': ('meat',),
+    'mortadella': ('meat',), 'pastrami': ('meat',), 'bresaola': ('meat',), 'kielbasa': ('meat',),
+    'bratwurst': ('meat',), 'frankfurter': ('meat',), 'hot dog': ('meat',), 'jerky': ('meat',),
+    'liver': ('meat',), 'oxtail': ('meat',), 'pate': ('meat',), 'suet': ('meat',), 'tallow': ('meat',),
+    'bone broth': ('meat',), 'bone marrow': ('meat',), 'gelatine': ('meat',),
+    'chicken stock': ('meat',), 'beef stock': ('meat',), 'chicken broth': ('meat',), 'beef broth': ('meat',),
+    'boar': ('meat',), 'elk': ('meat',), 'moose': ('meat',), 'kangaroo': ('meat',), 'ostrich': ('meat',),
+    'pigeon': ('meat',), 'partridge': ('meat',), 'grouse': ('meat',), 'guinea fowl': ('meat',),
+    'fish': ('fish',), 'salmon': ('fish',), 'tuna': ('fish',), 'cod': ('fish',), 'anchovy': ('fish',),
+    'anchovies': ('fish',), 'sardine': ('fish',), 'tilapia': ('fish',), 'fish sauce': ('fish',),
+    'trout': ('fish',), 'mackerel': ('fish',), 'halibut': ('fish',), 'haddock': ('fish',), 'herring': ('fish',),
+    'snapper': ('fish',), 'sea bass': ('fish',), 'swordfish': ('fish',), 'catfish': ('fish',), 'eel': ('fish',),
+    'caviar': ('fish',), 'roe': ('fish',), 'bonito': ('fish',), 'dashi': ('fish',),
+    'pollock': ('fish',), 'hake': ('fish',), 'flounder': ('fish',), 'plaice': ('fish',), 'turbot': ('fish',),
+    'perch': ('fish',), 'pike': ('fish',), 'carp': ('fish',), 'sturgeon': ('fish',), 'bream': ('fish',),
+    'mahi mahi': ('fish',), 'barramundi': ('fish',), 'branzino': ('fish',), 'sprat': ('fish',), 'whitebait': ('fish',),
+    'worcestershire': ('fish',), 'worcestershire sauce': ('fish',),
+    'shrimp': ('shellfish',), 'prawn': ('shellfish',), 'crab': ('shellfish',), 'lobster': ('shellfish',),
+    'clam': ('shellfish',), 'mussel': ('shellfish',), 'oyster': ('shellfish',), 'scallop': ('shellfish',),
+    'oyster sauce': ('shellfish',), 'crawfish': ('shellfish',), 'crayfish': ('shellfish',), 'shellfish': ('shellfish',),
+    # Cephalopods are molluscs, so they fall under shellfish as in allergen labelling
+    'squid': ('shellfish',), 'calamari': ('shellfish',), 'octopus': ('shellfish',), 'cuttlefish': ('shellfish',),
+
+    # Cuts and forms that only come from animals: meat unless the ingredient names a fish
+    # or shellfish ("salmon fillet"), so an animal missing from the table does not pass as vegetarian
+    'steak': ('animal',), 'fillet': ('animal',), 'filet': ('animal',), 'mince': ('animal',),
+    'breast': ('animal',), 'thigh': ('animal',), 'drumstick': ('animal',),
+    'wing': ('animal',), 'brisket': ('animal',), 'sirloin': ('animal',), 'ribeye': ('animal',),
+    'tenderloin': ('animal',), 'loin': ('animal',), 'chop': ('animal',), 'shank': ('animal',),
+    'cutlet': ('animal',), 'ribs': ('animal',), 'offal': ('animal',), 'giblet': ('animal',),
+
+    # Dairy and eggs
+    'cheese': ('dairy',), 'milk': ('dairy',), 'cream': ('dairy',), 'yogurt': ('dairy',),
+    'butter': ('dairy',), 'ghee': ('dairy',), 'parmesan': ('dairy',), 'mozzarella': ('dairy',),
+    'feta': ('dairy',), 'ricotta': ('dairy',), 'whey': ('dairy',), 'sour cream': ('dairy',),
+    'cheddar': ('dairy',), 'brie': ('dairy',), 'gouda': ('dairy',), 'camembert': ('dairy',),
+    'gruyere': ('dairy',), 'emmental': ('dairy',), 'halloumi': ('dairy',), 'paneer': ('dairy',),
+    'mascarpone': ('dairy',), 'pecorino': ('dairy',), 'provolone': ('dairy',), 'manchego': ('dairy',),
+    'burrata': ('dairy',), 'gorgonzola': ('dairy',), 'stilton': ('dairy',), 'roquefort': ('dairy',),
+    'monterey jack': ('dairy',), 'queso': ('dairy',), 'parmigiano': ('dairy',), 'casein': ('dairy',),
+    'buttermilk': ('dairy',), 'kefir': ('dairy',), 'creme fraiche': ('dairy',), 'yoghurt': ('dairy',),
+    'skyr': ('dairy',), 'labneh': ('dairy',), 'quark': ('dairy',), 'custard': ('dairy', 'egg'),
+    'goat cheese': ('dairy',), "goat's cheese": ('dairy',), 'goat milk': ('dairy',), "goat's milk": ('dairy',),
+    'goats cheese': ('dairy',), 'goats milk': ('dairy',),
+    'egg': ('egg',), 'mayonnaise': ('egg',), 'mayo': ('egg',), 'meringue': ('egg',), 'aioli': ('egg',),
+    'honey': ('honey',),
+
+    # Nuts
+    'almond': ('nuts',), 'walnut': ('nuts',), 'peanut': ('nuts',), 'cashew': ('nuts',),
+    'pecan': ('nuts',), 'hazelnut': ('nuts',), 'pistachio': ('nuts',), 'macadamia': ('nuts',),
+    'pine nut': ('nuts',), 'peanut butter': ('nuts',), 'almond milk': ('nuts',),
+    'nut': ('nuts',), 'nuts': ('nuts',),
+
+    # Gluten
+    'wheat': ('gluten',), 'flour': ('gluten',), 'bread': ('gluten',), 'pasta': ('gluten',),
+    'noodles': ('gluten',), 'spaghetti': ('gluten',), 'barley': ('gluten',), 'rye': ('gluten',),
+    'couscous': ('gluten',), 'breadcrumbs': ('gluten',), 'tortilla': ('gluten',), 'soy sauce': ('gluten',),
+    'seitan': ('gluten',), 'bulgur': ('gluten',), 'semolina': ('gluten',),
+
+    'bun': ('gluten',), 'cracker': ('gluten',), 'hamburger': ('meat',), 'hamburger bun': ('gluten',),
+
+    # Phrases that override a keyword they contain
+    'coconut milk': (), 'coconut cream': (), 'oat milk': (), 'soy milk': (), 'rice milk': (),
+    'cream of tartar': (), 'rice noodles': (), 'rice flour': (), 'almond flour': ('nuts',),
+    'corn tortilla': (), 'gluten-free pasta': (), 'gluten-free bread': (), 'gluten-free flour': (),
+    'pasta sauce': (), 'spaghetti sauce': (), 'coconut meat': (),
+    'cauliflower steak': (), 'mushroom steak': (), 'cocoa butter': (), 'shea butter': (), 'apple butter': (), 'nut butter': ('nuts',),
+}
+
+# Stored dietFlags computed by an older table are recomputed; bump whenever DIET_CATEGORIES changes
+DIET_CLASSIFIER_VERSION = 3
+
+# Any "...fish" word the table does not list ("monkfish", "lionfish") is a fish
+FISH_SUFFIX_PATTERN = re.compile(r'\B(fish)(?:es)?\b')
+
+DIET_KEYWORD_CATEGORIES = {keyword: frozenset(categories) for keyword, categories in DIET_CATEGORIES.items()}
+
+# Whole words only, longest keyword first at each position
+DIET_KEYWORD_PATTERN = re.compile(
+    r'\b(' + '|'.join(re.escape(keyword) for keyword in sorted(DIET_KEYWORD_CATEGORIES, key=len, reverse=True)) + r')(?:e?s)?\b'
+)
+
+# Restriction class -> diet categories a compatible recipe must not contain
+DIET_RESTRICTIONS = {
+    'vegetarian': frozenset({'meat', 'fish', 'shellfish'}),
+    'vegan': frozenset({'meat', 'fish', 'shellfish', 'dairy', 'egg', 'honey'}),
+    'pescatarian': frozenset({'meat'}),
+    'dairy-free': frozenset({'dairy'}),
+    'egg-free': frozenset({'egg'}),
+    'nut-free': frozenset({'nuts'}),
+    'gluten-free': frozenset({'gluten'}),
+    'shellfish-free': frozenset({'shellfish'}),
+}
+
+
+ANIMAL_CATEGORIES = frozenset({'meat', 'fish', 'shellfish'})
+
+
+def fold_accents(text: str) -> str:
+    """Lowercase text without diacritics ("Crème Fraîche" -> "creme fraiche")"""
+    return ''.join(char for char in unicodedata.normalize('NFKD', text.lower()) if not unicodedata.combining(char))
+
+
+@lru_cache(maxsize=4096)
+def classify_diet(ingredient: str) -> FrozenSet[str]:
+    """Diet categories (meat, dairy, nuts, gluten...) of a single ingredient name
+
+    An animal-only cut ("venison steak", "kangaroo fillet") counts as meat unless the
+    ingredient already names a fish or shellfish.
+    """
+    text = fold_accents(ingredient)
+    matches = DIET_KEYWORD_PATTERN.findall(text)
+    categories = frozenset().union(*(DIET_KEYWORD_CATEGORIES[match] for match in matches))
+    if FISH_SUFFIX_PATTERN.search(DIET_KEYWORD_PATTERN.sub(' ', text)):
+        categories = categories | {'fish'}
+    if not categories:
+        return NO_CATEGORIES
+    if 'animal' in categories:
+        categories = categories - {'animal'}
+        if not categories & ANIMAL_CATEGORIES:
+            categories = categories | {'meat'}
+    return categories
+
+
+def normalize_restriction(restriction: str) -> Optional[str]:
+    """Canonical restriction class for user input ("Gluten free" -> "gluten-free"), or None"""
+    name = re.sub(r'[\s_]+', '-', str(restriction).strip().lower())
+    return name if name in DIET_RESTRICTIONS else None
+
+
+def diet_flags(ingredient_names: List[str]) -> List[str]:
+    """Restriction classes a recipe with these ingredients satisfies"""
+    categories = frozenset().union(*(classify_diet(name) for name in ingredient_names if isinstance(name, str)))
+    return [restriction for restriction, excluded in DIET_RESTRICTIONS.items() if not categories & excluded]
@@ -0,0 +1,149 @@
+import logging
+import math
+import os
+from typing import Callable, List, Optional, Sequence
+
+import numpy as np
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class IngredientVectorTable:
+    """Dense table of per-ingredient embeddings used to compose query vectors without the transformer"""
+
+    def __init__(self, names: Sequence[str], vectors: np.ndarray, weights: np.ndarray, model_tag: str):
+        self.names = list(names)
+        self.vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        self.weights = np.asarray(weights, dtype=np.float32)
+        self.model_tag = model_tag
+        self.index = {name: row for row, name in enumerate(self.names)}
+        # Unknown ingredients are treated as rare, i.e. as informative as the rarest known one
+        self.unknown_weight = float(self.weights.max()) if len(self.weights) else 1.0
+
+        self.composed = 0
+        self.partial = 0
+        self.unknown_tokens = 0
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.index
+
+    def compose(self, ingredients: Sequence[str], encode_unknown: Optional[Callable[[List[str]], np.ndarray]] = None) -> Optional[np.ndarray]:
+        """Pool table rows for canonical ingredient names into one L2-normalized vector
+
+        Names missing from the table are embedded with encode_unknown; without it,
+        queries containing unknown names return None so the caller uses the full model.
+        """
+        rows = [self.index[name] for name in ingredients if name in self.index]
+        unknown = [name for name in ingredients if name not in self.index]
+
+        if unknown and encode_unknown is None:
+            return None
+        if not rows and not unknown:
+            return None
+
+        vectors = [self.vectors[rows]]
+        weights = [self.weights[rows]]
+
+        if unknown:
+            vectors.append(np.asarray(encode_unknown(unknown), dtype=np.float32).reshape(len(unknown), -1))
+            weights.append(np.full(len(unknown), self.unknown_weight, dtype=np.float32))
+            self.partial += 1
+            self.unknown_tokens += len(unknown)
+        else:
+            self.composed += 1
+
+        stacked = np.vstack(vectors)
+        stacked_weights = np.concatenate(weights)
+        pooled = stacked_weights @ stacked
+
+        norm = np.linalg.norm(pooled)
+        if norm == 0:
+            return None
+        return pooled / norm
+
+    def stats(self):
+        return {
+            "ingredients": len(self.names),
+            "model": self.model_tag,
+            "fullyComposed": self.composed,
+            "partiallyComposed": self.partial,
+            "unknownTokensEncoded": self.unknown_tokens
+        }
+
+    def save(self, path: str):
+        """Persist the table as a compressed .npz file"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        tmp_path = f"{path}.tmp.npz"
+        np.savez_compressed(
+            tmp_path,
+            names=np.array(self.names, dtype=str),
+            vectors=self.vectors,
+            weights=self.weights,
+            model_tag=np.array(self.model_tag)
+        )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str, model_tag: str) -> Optional['IngredientVectorTable']:
+        """Load a table, ignoring it if it was built with a different embedding model"""
+        if not os.path.exists(path):
+            return None
+
+        with np.load(path) as data:
+            stored_tag = str(data['model_tag'])
+            if stored_tag != model_tag:
+                logger.warning(f"Ingredient vector table at {path} was built for {stored_tag}, ignoring it")
+                return None
+            return cls(data['names'].tolist(), data['vectors'], data['weights'], stored_tag)
+
+    @classmethod
+    def build(cls, recipes_collection, encode: Callable[[List[str]], np.ndarray], model_tag: str, batch_size: int = 256) -> 'IngredientVectorTable':
+        """Embed every distinct ingredients.name in the recipes collection"""
+        total_recipes = max(1, recipes_collection.count_documents({}))
+
+        # Document frequency of each canonical ingredient name
+        pipeline = [
+            {"$unwind": "$ingredients"},
+            {"$project": {"name": {"$toLower": {"$trim": {"input": "$ingredients.name"}}}}},
+            {"$match": {"name": {"$ne": ""}}},
+            {"$group": {"_id": "$name", "recipes": {"$sum": 1}}},
+            {"$sort": {"_id": 1}}
+        ]
+        frequencies = list(recipes_collection.aggregate(pipeline, allowDiskUse=True))
+
+        names = [item['_id'] for item in frequencies]
+        weights = np.array(
+            [math.log(1 + total_recipes / item['recipes']) for item in frequencies],
+            dtype=np.float32
+        )
+
+        batches = [encode(names[start:start + batch_size]) for start in range(0, len(names), batch_size)]
+        vectors = np.vstack(batches) if batches else np.zeros((0, Config.VECTOR_DIMENSION), dtype=np.float32)
+        vectors /= np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None)
+
+        logger.info(f"Built ingredient vector table with {len(names)} ingredients from {total_recipes} recipes")
+        return cls(names, vectors, weights, model_tag)
+
+
+if __name__ == "__main__":
+    # Offline job: build the ingredient table from the recipes collection
+    from pymongo import MongoClient
+    from services.embedding_backends import create_embedding_backend, embedding_model_tag
+
+    logging.basicConfig(level=logging.INFO)
+
+    client = MongoClient(Config.MONGODB_URI)
+    collection = client[Config.DATABASE_NAME][Config.RECIPES_COLLECTION]
+    backend = create_embedding_backend()
+
+    table = IngredientVectorTable.build(collection, backend.encode, embedding_model_tag())
+    table.save(Config.INGREDIENT_TABLE_PATH)
+    print(f"Saved {len(table)} ingredient vectors to {Config.INGREDIENT_TABLE_PATH}")
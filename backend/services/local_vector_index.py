@@ -0,0 +1,588 @@
+import logging
+import threading
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from config import Config
+from services.diet_index import DietBitmaps
+
+logger = logging.getLogger(__name__)
+
+VECTOR_FIELD = Config.VECTOR_FIELD
+# Set by VectorSearchService.delete_recipes; soft-deleted recipes are never indexed or served
+DELETED_FIELD = 'deleted'
+NOT_DELETED = {DELETED_FIELD: {"$ne": True}}
+
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    """L2-normalize a float32 matrix in place (zero rows stay zero)"""
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    np.divide(vectors, norms, out=vectors, where=norms > 0)
+    return vectors
+
+
+def is_searchable(document: Dict[str, Any]) -> bool:
+    """Whether a recipe document belongs in the index: it has a vector and is not soft-deleted"""
+    return bool(document.get(VECTOR_FIELD)) and not document.get(DELETED_FIELD)
+
+
+def cosine_to_score(cosine):
+    """Map cosine similarity to Atlas' vectorSearchScore scale so SIMILARITY_THRESHOLD means the same thing"""
+    return (1.0 + cosine) / 2.0
+
+
+class LocalVectorIndex:
+    """In-process recipe vector index keyed on MongoDB _id, falling back to recipe name
+
+    Rows hold a recipe document (without its vector) and an L2-normalized embedding.
+    Upserts match an existing row by _id first and by name for documents without a known
+    _id (in-process upserts not yet seen by the index sync).
+    Subclasses decide how vectors are stored and scored; filtering, upserts and
+    loading from MongoDB are shared.
+    """
+
+    name = 'local'
+
+    def __init__(self, dimension: int = Config.VECTOR_DIMENSION):
+        self.dimension = dimension
+        self.documents = []
+        self.rows = {}
+        self.ids = {}
+        self._deleted = np.zeros(0, dtype=bool)
+        self.tombstones = 0
+        self._filter_masks = {}
+        self.diet = DietBitmaps()
+        self._lock = threading.RLock()
+        self.searches = 0
+
+    def __len__(self) -> int:
+        return len(self.documents) - self.tombstones
+
+    def add(self, documents: Sequence[Dict[str, Any]], vectors: np.ndarray) -> int:
+        """Insert or replace recipes (matched on _id, then name); returns the number of rows written"""
+        vectors = normalize_rows(np.array(vectors, dtype=np.float32).reshape(len(documents), self.dimension))
+
+        with self._lock:
+            first_new_row = len(self.documents)
+            new_rows = []
+            new_vectors = []
+            written = {}
+            for document, vector in zip(documents, vectors):
+                document = {key: value for key, value in document.items() if key != VECTOR_FIELD}
+                row = self._find_row(document)
+
+                if row is None:
+                    row = len(self.documents)
+                    self.documents.append(document)
+                    new_rows.append(row)
+                    new_vectors.append(vector)
+                elif row >= first_new_row:
+                    # Repeated within this batch: the last copy wins
+                    self.documents[row] = document
+                    new_vectors[row - first_new_row] = vector
+                else:
+                    # Existing (or tombstoned) recipe: overwrite the row in place
+                    previous = self.documents[row]
+                    if self.rows.get(previous.get('name')) == row:
+                        del self.rows[previous['name']]
+                    self.documents[row] = document
+                    self._set_vector(row, vector)
+                    if self._deleted[row]:
+                        self._deleted[row] = False
+                        self.tombstones -= 1
+                    for (field, value), mask in self._filter_masks.items():
+                        mask[row] = self._matches_filter(document, field, value)
+
+                self._map_row(document, row)
+                written[row] = document
+
+            self.diet.set_rows(list(written), list(written.values()))
+            if new_rows:
+                self._append_vectors(np.vstack(new_vectors))
+                self._deleted = np.concatenate([self._deleted, np.zeros(len(new_rows), dtype=bool)])
+                for (field, value), mask in list(self._filter_masks.items()):
+                    self._filter_masks[(field, value)] = np.concatenate([
+                        mask,
+                        np.fromiter((self._matches_filter(self.documents[row], field, value) for row in new_rows), dtype=bool, count=len(new_rows))
+                    ])
+
+            return len(documents)
+
+    def remove(self, ids: Iterable[Any] = (), names: Iterable[str] = ()) -> int:
+        """Tombstone recipes by MongoDB _id or name; their rows are reused if they come back"""
+        with self._lock:
+            rows = {self.ids[str(recipe_id)] for recipe_id in ids if str(recipe_id) in self.ids}
+            rows.update(self.rows[name] for name in names if name in self.rows)
+
+            removed = 0
+            for row in rows:
+                if not self._deleted[row]:
+                    self._deleted[row] = True
+                    self.tombstones += 1
+                    removed += 1
+            return removed
+
+    def contains_id(self, recipe_id: Any) -> bool:
+        row = self.ids.get(str(recipe_id))
+        return row is not None and not self._deleted[row]
+
+    def live_ids(self) -> List[str]:
+        """String _ids of every live row that came from MongoDB"""
+        with self._lock:
+            return [recipe_id for recipe_id, row in self.ids.items() if not self._deleted[row]]
+
+    def live_names_without_id(self) -> List[str]:
+        """Names of live rows added without a MongoDB _id (in-process upserts not yet synced)"""
+        with self._lock:
+            keyed_rows = set(self.ids.values())
+            return [name for name, row in self.rows.items() if row not in keyed_rows and not self._deleted[row]]
+
+    def live_entries(self) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        """(row, document) for every live row, in row order, decoding one document at a time"""
+        with self._lock:
+            rows = np.flatnonzero(~self._deleted)
+        for row in rows:
+            yield int(row), self.documents[row]
+
+    def documents_at(self, rows: Sequence[int]) -> List[Optional[Dict[str, Any]]]:
+        """Documents of the given rows, None for rows deleted since"""
+        with self._lock:
+            return [None if self._deleted[row] else self.documents[row] for row in rows]
+
+    def search(self, query: Sequence[float], limit: int, mood: Optional[str] = None,
+               threshold: float = Config.SIMILARITY_THRESHOLD, difficulty: Optional[str] = None,
+               diet: Sequence[str] = ()) -> List[Tuple[Dict[str, Any], float]]:
+        """Top-`limit` recipes as (document, score) pairs, best first
+
+        Mirrors the Atlas pipeline: mood (mood or tags), difficulty and every diet
+        restriction are hard filters, and the similarity threshold only applies when
+        no mood is requested.
+        """
+        query = np.asarray(query, dtype=np.float32).reshape(-1)
+        norm = np.linalg.norm(query)
+        if norm == 0 or limit <= 0:
+            return []
+        query = query / norm
+
+        with self._lock:
+            if not len(self):
+                return []
+
+            mask = None
+            for field, value in (('mood', mood), ('difficulty', difficulty)):
+                if value:
+                    field_mask = self.filter_mask(field, value)
+                    mask = field_mask if mask is None else mask & field_mask
+            if diet:
+                diet_mask = self.diet.mask(diet, len(self.documents))
+                mask = diet_mask if mask is None else mask & diet_mask
+
+            min_cosine = -np.inf if mood else 2.0 * threshold - 1.0
+            deleted = self._deleted if self.tombstones else None
+            rows, cosines = self._top_k(query, limit, mask, min_cosine, deleted)
+            self.searches += 1
+            return [(self.documents[row], float(cosine_to_score(cosine))) for row, cosine in zip(rows, cosines)]
+
+    def filter_mask(self, field: str, value: str) -> np.ndarray:
+        """Boolean row mask of recipes matching field == value, computed once and kept current on add"""
+        mask = self._filter_masks.get((field, value))
+        if mask is None:
+            mask = np.fromiter((self._matches_filter(document, field, value) for document in self.documents), dtype=bool, count=len(self.documents))
+            self._filter_masks[(field, value)] = mask
+        return mask
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": self.name,
+            "recipes": len(self),
+            "tombstones": self.tombstones,
+            "dimension": self.dimension,
+            "searches": self.searches,
+            "filterMasks": len(self._filter_masks),
+            "vectorBytes": self.vector_bytes(),
+            "maskBytes": sum(mask.nbytes for mask in self._filter_masks.values()),
+            "dietBitmapBytes": self.diet.nbytes
+        }
+
+    def vector_bytes(self) -> int:
+        raise NotImplementedError
+
+    def row_vectors(self) -> np.ndarray:
+        """Row-ordered matrix of every stored vector, tombstoned rows included"""
+        raise NotImplementedError
+
+    def _append_vectors(self, vectors: np.ndarray):
+        raise NotImplementedError
+
+    def _set_vector(self, row: int, vector: np.ndarray):
+        raise NotImplementedError
+
+    def _top_k(self, query: np.ndarray, limit: int, filter_mask: Optional[np.ndarray], min_cosine: float,
+               deleted: Optional[np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+        raise NotImplementedError
+
+    @staticmethod
+    def _best_rows(rows: np.ndarray, scores: np.ndarray, limit: int, min_cosine: float) -> Tuple[np.ndarray, np.ndarray]:
+        """Best `limit` of already-eligible rows scoring at least min_cosine, best first"""
+        keep = scores >= min_cosine
+        rows = rows[keep]
+        scores = scores[keep]
+        if len(rows) == 0:
+            return rows, scores
+
+        k = min(limit, len(rows))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return rows[top], scores[top]
+
+    def _find_row(self, document: Dict[str, Any]) -> Optional[int]:
+        if '_id' in document and str(document['_id']) in self.ids:
+            return self.ids[str(document['_id'])]
+        return self.rows.get(document.get('name'))
+
+    def _map_row(self, document: Dict[str, Any], row: int):
+        if document.get('name') is not None:
+            self.rows[document['name']] = row
+        if '_id' in document:
+            self.ids[str(document['_id'])] = row
+
+    @staticmethod
+    def _matches_filter(document: Dict[str, Any], field: str, value: str) -> bool:
+        if field == 'mood':
+            return document.get('mood') == value or value in (document.get('tags') or ())
+        return document.get(field) == value
+
+    @classmethod
+    def from_collection(cls, collection, dimension: int = Config.VECTOR_DIMENSION, batch_size: int = 1000, **kwargs) -> 'LocalVectorIndex':
+        """Load every recipe that has a vector (Config.VECTOR_FIELD) from MongoDB"""
+        index = cls(dimension, **kwargs)
+        documents = []
+        vectors = []
+
+        cursor = collection.find({VECTOR_FIELD: {"$exists": True}, **NOT_DELETED}, batch_size=batch_size)
+        for document in cursor:
+            vector = document.pop(VECTOR_FIELD)
+            if len(vector) != dimension:
+                continue
+            documents.append(document)
+            vectors.append(vector)
+
+            if len(documents) >= batch_size:
+                index.add(documents, np.asarray(vectors, dtype=np.float32))
+                documents, vectors = [], []
+
+        if documents:
+            index.add(documents, np.asarray(vectors, dtype=np.float32))
+
+        logger.info(f"Loaded {len(index)} recipe vectors into the {index.name} index")
+        return index
+
+
+class ExactVectorIndex(LocalVectorIndex):
+    """Brute-force cosine search over one contiguous normalized float32 matrix
+
+    A query costs one matrix-vector product and an argpartition over the scores.
+    The matrix grows by doubling so incremental inserts stay amortized O(1).
+    """
+
+    name = 'exact'
+
+    # Filters passing fewer than this share of rows are scored row by row instead of in one matrix product
+    SPARSE_FILTER_FRACTION = 0.25
+
+    def __init__(self, dimension: int = Config.VECTOR_DIMENSION, capacity: int = 1024):
+        super().__init__(dimension)
+        self._matrix = np.zeros((max(1, capacity), dimension), dtype=np.float32)
+
+    @property
+    def matrix(self) -> np.ndarray:
+        return self._matrix[:len(self.documents)]
+
+    def vector_bytes(self) -> int:
+        return self._matrix.nbytes
+
+    def row_vectors(self) -> np.ndarray:
+        return self.matrix
+
+    def _append_vectors(self, vectors: np.ndarray):
+        end = len(self.documents)
+        start = end - len(vectors)
+
+        if end > len(self._matrix):
+            grown = np.zeros((max(end, 2 * len(self._matrix)), self.dimension), dtype=np.float32)
+            grown[:start] = self._matrix[:start]
+            self._matrix = grown
+
+        self._matrix[start:end] = vectors
+
+    def _set_vector(self, row: int, vector: np.ndarray):
+        self._matrix[row] = vector
+
+    def _top_k(self, query, limit, filter_mask, min_cosine, deleted):
+        if filter_mask is not None:
+            eligible = filter_mask & ~deleted if deleted is not None else filter_mask
+            rows = np.flatnonzero(eligible)
+            if len(rows) < self.SPARSE_FILTER_FRACTION * len(eligible):
+                # Selective filter: only score the rows that pass it
+                return self._best_rows(rows, self._score_rows(rows, query), limit, min_cosine)
+        return self._select_top_k(self._score_all(query), limit, filter_mask, min_cosine, deleted)
+
+    def _score_all(self, query: np.ndarray) -> np.ndarray:
+        return self.matrix @ query
+
+    def _score_rows(self, rows: np.ndarray, query: np.ndarray) -> np.ndarray:
+        return self.matrix[rows] @ query
+
+    @staticmethod
+    def _select_top_k(scores, limit, filter_mask, min_cosine, deleted):
+        """Best `limit` eligible rows of a full row-aligned score vector"""
+        eligible = scores >= min_cosine
+        if filter_mask is not None:
+            eligible &= filter_mask
+        if deleted is not None:
+            eligible &= ~deleted
+
+        candidates = np.flatnonzero(eligible)
+        if len(candidates) == 0:
+            return candidates, scores[candidates]
+
+        candidate_scores = scores[candidates]
+        k = min(limit, len(candidates))
+        top = np.argpartition(-candidate_scores, k - 1)[:k]
+        top = top[np.argsort(-candidate_scores[top])]
+        return candidates[top], candidate_scores[top]
+
+
+class _InvertedList:
+    """Contiguous vectors of one IVF partition plus the index rows they belong to"""
+
+    __slots__ = ('vectors', 'rows', 'size')
+
+    def __init__(self, dimension: int, capacity: int = 16):
+        self.vectors = np.zeros((capacity, dimension), dtype=np.float32)
+        self.rows = np.zeros(capacity, dtype=np.int64)
+        self.size = 0
+
+    def extend(self, rows: np.ndarray, vectors: np.ndarray) -> int:
+        """Append rows and return the slot of the first one"""
+        start = self.size
+        end = start + len(rows)
+
+        if end > len(self.rows):
+            capacity = max(end, 2 * len(self.rows))
+            grown_vectors = np.zeros((capacity, self.vectors.shape[1]), dtype=np.float32)
+            grown_vectors[:start] = self.vectors[:start]
+            grown_rows = np.zeros(capacity, dtype=np.int64)
+            grown_rows[:start] = self.rows[:start]
+            self.vectors, self.rows = grown_vectors, grown_rows
+
+        self.vectors[start:end] = vectors
+        self.rows[start:end] = rows
+        self.size = end
+        return start
+
+    def remove(self, slot: int) -> Optional[int]:
+        """Swap-remove a slot; returns the row that moved into it, if any"""
+        self.size -= 1
+        if slot == self.size:
+            return None
+        self.vectors[slot] = self.vectors[self.size]
+        self.rows[slot] = self.rows[self.size]
+        return int(self.rows[slot])
+
+
+class IVFVectorIndex(LocalVectorIndex):
+    """Inverted-file index: spherical k-means partitions, only `nprobe` nearest partitions are scored
+
+    Until `min_train` recipes are indexed everything sits in a single partition, which is
+    exact search. New recipes are assigned to their nearest centroid as they arrive; the
+    partitions are retrained once the catalog has grown `RETRAIN_GROWTH` times.
+    """
+
+    name = 'ivf'
+
+    RETRAIN_GROWTH = 4
+    KMEANS_ITERATIONS = 10
+
+    def __init__(self, dimension: int = Config.VECTOR_DIMENSION, nlist: int = Config.IVF_NLIST,
+                 nprobe: int = Config.IVF_NPROBE, min_train: int = Config.IVF_MIN_TRAIN,
+                 train_sample: int = Config.IVF_TRAIN_SAMPLE, seed: int = 0):
+        super().__init__(dimension)
+        self.nlist = nlist
+        self.nprobe = max(1, nprobe)
+        self.min_train = max(1, min_train)
+        self.train_sample = max(1, train_sample)
+        self._rng = np.random.default_rng(seed)
+
+        self.centroids = None
+        self.trained_size = 0
+        self.trainings = 0
+        self._lists = [_InvertedList(dimension)]
+        self._row_list = []
+        self._row_slot = []
+
+    def vector_bytes(self) -> int:
+        centroid_bytes = self.centroids.nbytes if self.centroids is not None else 0
+        return centroid_bytes + sum(inverted.vectors.nbytes + inverted.rows.nbytes for inverted in self._lists)
+
+    def train(self):
+        """Cluster the current vectors into nlist partitions and redistribute every row"""
+        with self._lock:
+            vectors = self.row_vectors()
+            if len(vectors) == 0:
+                return
+
+            nlist = self.nlist or int(np.sqrt(len(vectors)))
+            nlist = max(1, min(nlist, len(vectors)))
+
+            sample_size = min(len(vectors), max(self.train_sample, nlist))
+            sample = vectors[self._rng.choice(len(vectors), sample_size, replace=False)]
+            centroids = self._kmeans(sample, nlist)
+
+            self.centroids = centroids
+            self._lists = [_InvertedList(self.dimension) for _ in range(nlist)]
+            list_ids = np.concatenate([
+                self._assign(vectors[start:start + 8192]) for start in range(0, len(vectors), 8192)
+            ])
+            self._place_many(np.arange(len(vectors)), list_ids, vectors)
+
+            self.trained_size = len(vectors)
+            self.trainings += 1
+            logger.info(f"Trained IVF index with {nlist} partitions on {sample_size} of {len(vectors)} vectors")
+
+    def stats(self) -> Dict[str, Any]:
+        stats = super().stats()
+        sizes = [inverted.size for inverted in self._lists]
+        stats.update({
+            "trained": self.centroids is not None,
+            "nlist": len(self._lists),
+            "nprobe": self.nprobe,
+            "trainedOn": self.trained_size,
+            "trainings": self.trainings,
+            "largestPartition": max(sizes),
+            "meanPartition": round(sum(sizes) / len(sizes), 1)
+        })
+        return stats
+
+    def _append_vectors(self, vectors: np.ndarray):
+        start = len(self.documents) - len(vectors)
+        self._row_list.extend([-1] * len(vectors))
+        self._row_slot.extend([-1] * len(vectors))
+        self._place_many(np.arange(start, start + len(vectors)), self._assign(vectors), vectors)
+
+        if self.centroids is None:
+            if len(self.documents) >= self.min_train:
+                self.train()
+        elif len(self.documents) >= self.RETRAIN_GROWTH * self.trained_size:
+            self.train()
+
+    def _set_vector(self, row: int, vector: np.ndarray):
+        self._unplace(row)
+        self._place(row, int(self._assign(vector[None, :])[0]), vector)
+
+    def _top_k(self, query, limit, filter_mask, min_cosine, deleted):
+        if self.centroids is None:
+            probes = [0]
+        else:
+            nprobe = min(self.nprobe, len(self.centroids))
+            centroid_scores = self.centroids @ query
+            probes = np.argpartition(-centroid_scores, nprobe - 1)[:nprobe]
+
+        row_chunks = []
+        score_chunks = []
+        for list_id in probes:
+            inverted = self._lists[list_id]
+            if inverted.size:
+                row_chunks.append(inverted.rows[:inverted.size])
+                score_chunks.append(inverted.vectors[:inverted.size] @ query)
+
+        if not row_chunks:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+
+        rows = np.concatenate(row_chunks)
+        scores = np.concatenate(score_chunks)
+
+        eligible = np.ones(len(rows), dtype=bool)
+        if filter_mask is not None:
+            eligible &= filter_mask[rows]
+        if deleted is not None:
+            eligible &= ~deleted[rows]
+
+        return self._best_rows(rows[eligible], scores[eligible], limit, min_cosine)
+
+    def _assign(self, vectors: np.ndarray) -> np.ndarray:
+        if self.centroids is None:
+            return np.zeros(len(vectors), dtype=np.int64)
+        return np.argmax(vectors @ self.centroids.T, axis=1)
+
+    def _place(self, row: int, list_id: int, vector: np.ndarray):
+        self._row_list[row] = list_id
+        self._row_slot[row] = self._lists[list_id].extend(np.array([row]), vector[None, :])
+
+    def _place_many(self, rows: np.ndarray, list_ids: np.ndarray, vectors: np.ndarray):
+        """Append rows grouped by partition, one extend per partition"""
+        order = np.argsort(list_ids, kind='stable')
+        sorted_ids = list_ids[order]
+        boundaries = np.flatnonzero(np.diff(sorted_ids)) + 1
+
+        for group in np.split(order, boundaries):
+            list_id = int(list_ids[group[0]])
+            first_slot = self._lists[list_id].extend(rows[group], vectors[group])
+            for offset, row in enumerate(rows[group].tolist()):
+                self._row_list[row] = list_id
+                self._row_slot[row] = first_slot + offset
+
+    def _unplace(self, row: int):
+        list_id, slot = self._row_list[row], self._row_slot[row]
+        moved = self._lists[list_id].remove(slot)
+        if moved is not None:
+            self._row_slot[moved] = slot
+
+    def row_vectors(self) -> np.ndarray:
+        """Row-ordered copy of every stored vector"""
+        vectors = np.zeros((len(self.documents), self.dimension), dtype=np.float32)
+        for inverted in self._lists:
+            vectors[inverted.rows[:inverted.size]] = inverted.vectors[:inverted.size]
+        return vectors
+
+    def _kmeans(self, sample: np.ndarray, k: int) -> np.ndarray:
+        """Spherical k-means: centroids are unit vectors, assignment by inner product"""
+        centroids = sample[self._rng.choice(len(sample), k, replace=False)].copy()
+
+        for _ in range(self.KMEANS_ITERATIONS):
+            assignment = np.concatenate([
+                np.argmax(sample[start:start + 8192] @ centroids.T, axis=1)
+                for start in range(0, len(sample), 8192)
+            ])
+
+            # Sum members per cluster with one sort + reduceat instead of a Python loop
+            order = np.argsort(assignment, kind='stable')
+            counts = np.bincount(assignment, minlength=k)
+            populated = np.flatnonzero(counts)
+            boundaries = np.concatenate([[0], np.cumsum(counts[populated])[:-1]])
+            centroids[populated] = np.add.reduceat(sample[order], boundaries, axis=0)
+
+            # Empty clusters restart from random sample points
+            empty = np.flatnonzero(counts == 0)
+            if len(empty):
+                centroids[empty] = sample[self._rng.choice(len(sample), len(empty), replace=False)]
+
+            normalize_rows(centroids)
+
+        return centroids
+
+
+LOCAL_INDEX_BACKENDS = {
+    ExactVectorIndex.name: ExactVectorIndex,
+    IVFVectorIndex.name: IVFVectorIndex
+}
+
+
+def get_local_index_class(name: str):
+    """Index class for a VECTOR_SEARCH_BACKEND value, or None for Atlas"""
+    if name == 'atlas':
+        return None
+    if name not in LOCAL_INDEX_BACKENDS:
+        raise ValueError(f"Unknown vector search backend: {name}")
+    return LOCAL_INDEX_BACKENDS[name]
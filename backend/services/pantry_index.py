@@ -0,0 +1,315 @@
+import logging
+import re
+import threading
+import time
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+from scipy import sparse
+
+from config import Config
+from services.diet_index import DIET_FIELD, DIET_VERSION_FIELD, DietBitmaps, document_diet_flags, recipe_ingredient_names
+from services.local_vector_index import NOT_DELETED
+
+logger = logging.getLogger(__name__)
+
+_NON_WORD = re.compile(r"[^a-z\s]+")
+
+
+def _singular(token: str) -> str:
+    if len(token) > 4 and token.endswith('ies'):
+        return token[:-3] + 'y'
+    if len(token) > 4 and token.endswith('oes'):
+        return token[:-2]
+    if len(token) > 3 and token.endswith('s') and not token.endswith('ss'):
+        return token[:-1]
+    return token
+
+
+def canonical_ingredient(name: str) -> str:
+    """Lowercased, punctuation-free, singular form of an ingredient name ("Tomatoes!" -> "tomato")"""
+    return ' '.join(_singular(token) for token in _NON_WORD.sub(' ', name.lower()).split())
+
+
+PANTRY_STAPLES = frozenset(canonical_ingredient(staple) for staple in Config.PANTRY_STAPLES if staple.strip())
+
+
+class PantryIndex:
+    """Sparse recipes x canonical-ingredients incidence matrix for pantry coverage ranking
+
+    Staples (salt, water, ...) are left out, so they count neither as matched nor missing.
+    A pantry item covers every ingredient whose name contains all of its words ("chicken"
+    covers "chicken breast"). The covered columns form a sparse pantry vector; its product
+    with the ingredient-major matrix (the covered posting lists, summed) counts covered
+    ingredients for every recipe sharing at least one, and recipes sharing none are never
+    touched.
+
+    Rows hold the caller's key for each recipe (a MongoDB _id), not the document; searches
+    return keys with their match summaries.
+    """
+
+    def __init__(self, keys: List[Any], ingredient_lists: List[List[str]], diet_flags: List[FrozenSet[str]]):
+        # Rows ordered by ingredient count, so every posting list is too and size bounds are prefixes
+        order = sorted(range(len(keys)), key=lambda row: len(ingredient_lists[row]))
+        self.keys = [keys[row] for row in order]
+
+        vocabulary = {}
+        indptr = np.zeros(len(order) + 1, dtype=np.int64)
+        indices = []
+        for row, original in enumerate(order):
+            columns = {vocabulary.setdefault(name, len(vocabulary)) for name in ingredient_lists[original]}
+            indices.extend(sorted(columns))
+            indptr[row + 1] = len(indices)
+
+        self.vocabulary = list(vocabulary)
+        indices = np.array(indices, dtype=np.int32)
+        data = np.ones(len(indices), dtype=np.float32)
+        shape = (len(self.keys), len(self.vocabulary))
+
+        # Recipe-major rows list a recipe's ingredients; ingredient-major rows are the postings queries walk
+        self.matrix = sparse.csr_matrix((data, indices, indptr), shape=shape)
+        self._postings = self.matrix.T.tocsr()
+        self._postings.sort_indices()
+        self.sizes = np.diff(indptr).astype(np.int32)
+        # _rows_up_to[s]: number of recipes with at most s ingredients
+        max_size = int(self.sizes[-1]) if len(self.sizes) else 0
+        self._rows_up_to = np.searchsorted(self.sizes, np.arange(max_size + 1), side='right')
+
+        self._token_columns = {}
+        for column, name in enumerate(self.vocabulary):
+            for token in set(name.split()):
+                self._token_columns.setdefault(token, set()).add(column)
+
+        self.diet = DietBitmaps()
+        self.diet.set_flags(range(len(self.keys)), [diet_flags[row] for row in order])
+        self.built_at = time.monotonic()
+        self.searches = 0
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    @classmethod
+    def from_entries(cls, entries: Iterable[Tuple[Any, Dict[str, Any]]]) -> 'PantryIndex':
+        """Index (key, document) pairs with at least one non-staple ingredient; documents are not kept"""
+        keys = []
+        ingredient_lists = []
+        diet_flags = []
+        # Recipes share a handful of flag combinations; keep one frozenset per combination
+        flag_sets = {}
+        for key, document in entries:
+            names = {canonical_ingredient(name) for name in recipe_ingredient_names(document)}
+            names = sorted(name for name in names if name and name not in PANTRY_STAPLES)
+            if names:
+                keys.append(key)
+                ingredient_lists.append(names)
+                flags = frozenset(document_diet_flags(document))
+                diet_flags.append(flag_sets.setdefault(flags, flags))
+        return cls(keys, ingredient_lists, diet_flags)
+
+    @classmethod
+    def from_documents(cls, documents: Iterable[Dict[str, Any]]) -> 'PantryIndex':
+        """Index documents keyed by their position in `documents`"""
+        return cls.from_entries(enumerate(documents))
+
+    @classmethod
+    def from_collection(cls, collection, batch_size: int = 1000) -> 'PantryIndex':
+        """Build from every recipe with ingredients in MongoDB, keyed by _id (only ingredients and diet flags are read)"""
+        cursor = collection.find(
+            {"ingredients.0": {"$exists": True}, **NOT_DELETED},
+            {"ingredients": 1, DIET_FIELD: 1, DIET_VERSION_FIELD: 1},
+            batch_size=batch_size
+        )
+        index = cls.from_entries((document['_id'], document) for document in cursor)
+        logger.info(f"Built pantry index over {len(index)} recipes and {len(index.vocabulary)} ingredients")
+        return index
+
+    def covered_columns(self, pantry: Sequence[str]) -> Set[int]:
+        """Vocabulary columns covered by the pantry items"""
+        covered = set()
+        for item in pantry:
+            tokens = canonical_ingredient(item).split()
+            if not tokens:
+                continue
+            postings = [self._token_columns.get(token, set()) for token in tokens]
+            covered.update(set.intersection(*sorted(postings, key=len)))
+        return covered
+
+    def search(self, pantry: Sequence[str], limit: int = 5, max_missing: Optional[int] = None,
+               diet: Sequence[str] = ()) -> List[Tuple[Any, Dict[str, Any]]]:
+        """Recipes ranked by fewest missing ingredients, then most pantry items used
+
+        Each hit is the recipe key and a `pantryMatch` summary listing what is missing.
+        A recipe with s ingredients misses at least s - (covered columns), so only recipes up
+        to a size bound can miss at most m. The bound starts tight and widens until `limit`
+        recipes qualify; each round reads only that prefix of the covered posting lists.
+        """
+        covered = self.covered_columns(pantry)
+        if not covered or limit <= 0 or not len(self.keys):
+            return []
+
+        indptr, indices = self._postings.indptr, self._postings.indices
+        postings = [indices[indptr[column]:indptr[column + 1]] for column in covered]
+        diet_mask = self.diet.mask(diet, len(self.keys)) if diet else None
+        max_size = len(self._rows_up_to) - 1
+        ceiling = max_size if max_missing is None else min(max_missing, max_size)
+
+        bound = 0
+        while True:
+            end = int(self._rows_up_to[min(len(covered) + bound, max_size)])
+            final = end == len(self.keys) or bound >= ceiling
+            if final:
+                bound = ceiling
+
+            # Sparse pantry vector times the ingredient-major matrix: covered ingredient counts per recipe
+            prefix = np.concatenate([posting[:np.searchsorted(posting, end)] for posting in postings])
+            counts = np.bincount(prefix, minlength=end)
+            rows = np.flatnonzero(counts)
+            matched_counts = counts[rows].astype(np.int32)
+            missing_counts = self.sizes[rows] - matched_counts
+
+            eligible = missing_counts <= bound
+            if diet_mask is not None:
+                eligible &= diet_mask[rows]
+            if final or np.count_nonzero(eligible) >= limit:
+                break
+            bound = bound * 2 + 1
+
+        rows, matched_counts, missing_counts = rows[eligible], matched_counts[eligible], missing_counts[eligible]
+        self.searches += 1
+        if len(rows) == 0:
+            return []
+
+        # Keep the fewest-missing buckets that hold `limit` recipes, then order them exactly
+        cutoff = int(np.searchsorted(np.cumsum(np.bincount(missing_counts)), limit))
+        keep = missing_counts <= cutoff
+        rows, matched_counts, missing_counts = rows[keep], matched_counts[keep], missing_counts[keep]
+        top = np.lexsort((rows, -matched_counts, missing_counts))[:limit]
+
+        results = []
+        for position in top:
+            row = int(rows[position])
+            recipe_columns = self.matrix.indices[self.matrix.indptr[row]:self.matrix.indptr[row + 1]]
+            results.append((self.keys[row], {
+                "matched": int(matched_counts[position]),
+                "total": int(self.sizes[row]),
+                "coverage": round(float(matched_counts[position]) / float(self.sizes[row]), 3),
+                "missing": [self.vocabulary[column] for column in recipe_columns if column not in covered]
+            }))
+        return results
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "recipes": len(self.keys),
+            "ingredients": len(self.vocabulary),
+            "entries": int(self.matrix.nnz),
+            "matrixBytes": sum(int(matrix.data.nbytes + matrix.indices.nbytes + matrix.indptr.nbytes) for matrix in (self.matrix, self._postings)),
+            "ageSeconds": round(time.monotonic() - self.built_at, 1),
+            "searches": self.searches
+        }
+
+
+class PantrySearchService:
+    """Serves pantry searches from a PantryIndex over the recipes collection
+
+    The index is built in the background from start() (or the first search, if start was
+    never called) and rebuilt in the background once it is older than PANTRY_INDEX_MAX_AGE
+    or recipes were indexed in this process. Searches never wait for a build: until the
+    first one completes they return nothing, afterwards they use the previous index until
+    the new one is swapped in. Hits are read back from the collection with one $in query.
+    """
+
+    def __init__(self, max_age: float = Config.PANTRY_INDEX_MAX_AGE):
+        self.max_age = max_age
+        self.index = None
+        self._stale = False
+        self._build_lock = threading.Lock()
+        self._rebuilding = False
+        self.rebuilds = 0
+        self.last_error = None
+
+    def start(self, collection):
+        """Build the first index in the background"""
+        self._rebuild_in_background(collection)
+
+    def mark_stale(self):
+        self._stale = True
+
+    def get_index(self, collection) -> Optional[PantryIndex]:
+        """Current index, or None while the first build runs; schedules rebuilds as needed"""
+        if collection is None:
+            return self.index
+
+        if self.index is None or self._stale or (self.max_age > 0 and time.monotonic() - self.index.built_at > self.max_age):
+            self._rebuild_in_background(collection)
+
+        return self.index
+
+    def search(self, collection, pantry: Sequence[str], limit: int = 5, max_missing: Optional[int] = None,
+               diet: Sequence[str] = ()) -> List[Dict[str, Any]]:
+        try:
+            index = self.get_index(collection)
+            if index is None:
+                if collection is None:
+                    logger.error("Database connection not available")
+                else:
+                    logger.info("Pantry index is still building, no database recipes yet")
+                return []
+
+            hits = index.search(pantry, limit, max_missing=max_missing, diet=diet)
+            if not hits:
+                return []
+
+            recipe_ids = [recipe_id for recipe_id, _ in hits]
+            found = {
+                document['_id']: document
+                for document in collection.find({"_id": {"$in": recipe_ids}, **NOT_DELETED}, {Config.VECTOR_FIELD: 0, "updatedAt": 0})
+            }
+
+            results = []
+            for recipe_id, match in hits:
+                document = found.get(recipe_id)
+                if document is None:
+                    # Deleted since the index was built
+                    continue
+                # Same shape as vector search results
+                document['id'] = str(document.pop('_id'))
+                document['pantryMatch'] = match
+                results.append(document)
+            logger.info(f"Pantry search found {len(results)} recipes")
+            return results
+
+        except Exception as e:
+            logger.error(f"Pantry search error: {e}")
+            return []
+
+    def stats(self) -> Optional[Dict[str, Any]]:
+        if self.index is None:
+            if not self._rebuilding and self.last_error is None:
+                return None
+            return {"building": self._rebuilding, "lastError": self.last_error}
+        return {**self.index.stats(), "rebuilds": self.rebuilds, "stale": self._stale,
+                "building": self._rebuilding, "lastError": self.last_error}
+
+    def _rebuild_in_background(self, collection):
+        with self._build_lock:
+            if self._rebuilding:
+                return
+            self._rebuilding = True
+            self._stale = False
+
+        def rebuild():
+            try:
+                self.index = PantryIndex.from_collection(collection)
+                self.rebuilds += 1
+                self.last_error = None
+            except Exception as e:
+                self._stale = True
+                self.last_error = str(e)
+                logger.error(f"Pantry index rebuild failed: {e}")
+            finally:
+                self._rebuilding = False
+
+        threading.Thread(target=rebuild, name='pantry-index-rebuild', daemon=True).start()
+
+
+pantry_search_service = PantrySearchService()
@@ -0,0 +1,132 @@
+import logging
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from config import Config
+from services.ai_service import embedding_text
+from services.embedding_pool import EmbeddingWorkerPool
+
+logger = logging.getLogger(__name__)
+
+
+class ParallelIndexer:
+    """Embeds recipe shards in worker processes while the calling process does every bulk write
+
+    Each worker loads the embedding backend once and returns a shard's vectors as float32
+    through its shared-memory buffer, so only ingredient texts cross the pipes. Up to
+    `max_in_flight` shards are out at once (two per worker by default, so a worker never
+    waits for the writer); the caller consumes results in input order and remains the
+    single writer, so MongoDB sees one steady stream of unordered bulk upserts.
+    """
+
+    def __init__(self, search_service, workers: int = Config.INGEST_WORKERS, shard_size: int = Config.INDEX_BATCH_SIZE,
+                 backend_name: str = Config.EMBEDDING_BACKEND, max_in_flight: Optional[int] = None,
+                 request_timeout: float = Config.EMBEDDING_WORKER_TIMEOUT):
+        self.search_service = search_service
+        self.workers = max(1, workers)
+        self.shard_size = max(1, shard_size)
+        self.backend_name = backend_name
+        self.max_in_flight = max_in_flight or 2 * self.workers
+        self.request_timeout = request_timeout
+        self.pool = None
+        self._dispatch = None
+        self.load_seconds = None
+
+        self.shards = 0
+        self.indexed = 0
+        self.wait_seconds = 0.0
+        self.write_seconds = 0.0
+        self.started_at = None
+
+    def start(self) -> 'ParallelIndexer':
+        """Start the workers (no prediction model) and wait until each has loaded the encoder"""
+        started = time.perf_counter()
+        self.pool = EmbeddingWorkerPool(
+            self.workers, Config.VECTOR_DIMENSION, self.backend_name, '',
+            max_rows=self.shard_size, request_timeout=self.request_timeout
+        ).start()
+        # One dispatcher thread per worker keeps every worker busy
+        self._dispatch = ThreadPoolExecutor(self.workers, thread_name_prefix='ingest-dispatch')
+        self.load_seconds = round(time.perf_counter() - started, 2)
+        logger.info(f"Started {self.workers} ingestion workers in {self.load_seconds}s")
+        return self
+
+    def stop(self):
+        if self._dispatch is not None:
+            self._dispatch.shutdown(wait=True)
+        if self.pool is not None:
+            self.pool.stop()
+
+    def __enter__(self) -> 'ParallelIndexer':
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def index_shards(self, shards: Iterable[List[Dict[str, Any]]], collection) -> Iterator[Tuple[List[Dict[str, Any]], Dict[str, Any]]]:
+        """(shard, chunk stats) for every shard, in input order, once its bulk write is done
+
+        Shards are drawn from the iterable only as workers free up, so a streaming input
+        stays streaming. Empty shards pass straight through.
+        """
+        if self.started_at is None:
+            self.started_at = time.perf_counter()
+
+        in_flight = deque()
+        for shard in shards:
+            pending, ingredient_lists, failures = self.search_service._prepare_chunk(shard)
+            future = self._dispatch.submit(self._embed, pending, ingredient_lists, failures)
+            in_flight.append((shard, pending, failures, future))
+            if len(in_flight) >= self.max_in_flight:
+                yield self._write(in_flight.popleft(), collection)
+
+        while in_flight:
+            yield self._write(in_flight.popleft(), collection)
+
+    def report(self) -> Dict[str, Any]:
+        """Overall and per-worker throughput, and where the writer spent its time"""
+        elapsed = time.perf_counter() - self.started_at if self.started_at is not None else 0.0
+        workers = self.pool.stats()['workers'] if self.pool is not None else []
+        return {
+            "workers": self.workers,
+            "workerLoadSeconds": self.load_seconds,
+            "shardSize": self.shard_size,
+            "shards": self.shards,
+            "indexed": self.indexed,
+            "seconds": round(elapsed, 3),
+            "recipesPerSecond": round(self.indexed / elapsed, 1) if elapsed > 0 else 0.0,
+            # Writer blocked on embeddings (workers are the bottleneck) vs. writing (MongoDB is)
+            "writerWaitSeconds": round(self.wait_seconds, 3),
+            "writerWriteSeconds": round(self.write_seconds, 3),
+            "perWorker": [
+                {key: worker[key] for key in ('id', 'pid', 'rowsEncoded', 'busySeconds', 'rowsPerSecond', 'restarts')}
+                for worker in workers
+            ]
+        }
+
+    def _embed(self, pending: List[Dict[str, Any]], ingredient_lists: List[List[str]], failures: List[Dict[str, str]]) -> Tuple[List[Optional[np.ndarray]], float]:
+        # Runs on a dispatcher thread; the shard's failures list is only read after this returns
+        started = time.perf_counter()
+        vectors = self.search_service._embed_chunk(pending, ingredient_lists, failures, embed=self._encode)
+        return vectors, (time.perf_counter() - started) * 1000
+
+    def _encode(self, ingredient_lists: List[List[str]]) -> np.ndarray:
+        return self.pool.encode([embedding_text(ingredients) for ingredients in ingredient_lists])
+
+    def _write(self, item, collection) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        shard, pending, failures, future = item
+
+        waited = time.perf_counter()
+        vectors, embed_ms = future.result()
+        writing = time.perf_counter()
+        self.wait_seconds += writing - waited
+
+        chunk_stats = self.search_service._write_chunk(shard, pending, vectors, failures, collection, embed_ms)
+        self.write_seconds += time.perf_counter() - writing
+        self.shards += 1
+        self.indexed += chunk_stats['indexed']
+        return shard, chunk_stats
@@ -0,0 +1,274 @@
+import logging
+import threading
+import time
+from array import array
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from config import Config
+from services.diet_index import DietBitmaps, recipe_ingredient_names
+from services.pantry_index import canonical_ingredient
+
+logger = logging.getLogger(__name__)
+
+# Words that say nothing about a recipe
+STOP_WORDS = frozenset({'a', 'an', 'and', 'the', 'with', 'of', 'in', 'on', 'for', 'to', 'or', 'from', 'into', 'your', 'this'})
+
+# Term frequency weight per field: a word in the name or ingredient list says more than one in the description
+FIELD_WEIGHTS = {'name': 2.0, 'ingredients': 2.0, 'tags': 1.0, 'description': 1.0}
+
+
+def tokenize(text: str) -> List[str]:
+    """Canonical words of a text ("Fresh Tomatoes" -> ["fresh", "tomato"]), stop words removed"""
+    return [token for token in canonical_ingredient(text).split() if token not in STOP_WORDS]
+
+
+def document_fields(document: Dict[str, Any]) -> Dict[str, List[str]]:
+    """Searchable text of a recipe by field; the mood counts as a tag"""
+    tags = [tag for tag in (document.get('tags') or ()) if isinstance(tag, str)]
+    if isinstance(document.get('mood'), str):
+        tags.append(document['mood'])
+    return {
+        'name': [document.get('name') or ''],
+        'ingredients': recipe_ingredient_names(document),
+        'tags': tags,
+        'description': [document.get('description') or '']
+    }
+
+
+class BM25Index:
+    """Immutable inverted index with BM25 scoring over recipe text
+
+    Postings are stored term-major in flat arrays (CSR layout): _indptr[t]:_indptr[t + 1]
+    slices the rows containing term t out of _rows, with the field-weighted term frequency
+    alongside in _frequencies. A query reads only its terms' slices and sums the per-row
+    contributions with one bincount. Difficulty is an integer code per row and diet
+    restrictions reuse the packed bitmaps of the vector index, so filters never touch
+    the documents.
+
+    Documents are streamed through once and not kept: each row holds only the caller's
+    key for its recipe (a local index row, a MongoDB _id), and searches return keys.
+    """
+
+    # Scores accumulate into a dense per-row array once a query reads at least rows / ratio postings
+    DENSE_ACCUMULATE_RATIO = 16
+
+    # Documents whose diet flags are recorded together while streaming
+    DIET_CHUNK = 4096
+
+    def __init__(self, entries: Iterable[Tuple[Any, Dict[str, Any]]], k1: float = 1.2, b: float = 0.75):
+        """Index (key, document) pairs; documents without a name are skipped"""
+        self.k1 = k1
+        self.b = b
+
+        self.keys = []
+        self.vocabulary = {}
+        self._difficulties = {}
+        self.diet = DietBitmaps()
+        term_ids = array('i')
+        rows = array('i')
+        frequencies = array('f')
+        lengths = array('f')
+        difficulty_codes = array('h')
+        diet_rows = []
+        diet_documents = []
+        for key, document in entries:
+            if not document.get('name'):
+                continue
+            row = len(self.keys)
+            self.keys.append(key)
+
+            weights = {}
+            for field, texts in document_fields(document).items():
+                for text in texts:
+                    for token in tokenize(text):
+                        weights[token] = weights.get(token, 0.0) + FIELD_WEIGHTS[field]
+            lengths.append(sum(weights.values()))
+            for token, weight in weights.items():
+                term_ids.append(self.vocabulary.setdefault(token, len(self.vocabulary)))
+                rows.append(row)
+                frequencies.append(weight)
+
+            difficulty_codes.append(self._difficulties.setdefault(document.get('difficulty'), len(self._difficulties)))
+            diet_rows.append(row)
+            diet_documents.append(document)
+            if len(diet_rows) >= self.DIET_CHUNK:
+                self.diet.set_rows(diet_rows, diet_documents)
+                diet_rows, diet_documents = [], []
+        if diet_rows:
+            self.diet.set_rows(diet_rows, diet_documents)
+
+        term_ids = np.frombuffer(term_ids, dtype=np.int32)
+        # Stable sort keeps each term's rows ascending
+        order = np.argsort(term_ids, kind='stable')
+        self._rows = np.frombuffer(rows, dtype=np.int32)[order]
+        self._frequencies = np.frombuffer(frequencies, dtype=np.float32)[order]
+        document_frequency = np.bincount(term_ids, minlength=len(self.vocabulary))
+        self._indptr = np.concatenate([[0], np.cumsum(document_frequency)]).astype(np.int64)
+
+        count = len(self.keys)
+        lengths = np.frombuffer(lengths, dtype=np.float32)
+        self.idf = np.log1p((count - document_frequency + 0.5) / (document_frequency + 0.5)).astype(np.float32)
+        average_length = float(lengths.mean()) if count else 0.0
+        # k1 * (1 - b + b * |d| / avgdl), the per-row half of the BM25 denominator
+        self._length_norm = (k1 * (1.0 - b + b * lengths / average_length) if average_length else np.full(count, k1)).astype(np.float32)
+        self._difficulty_codes = np.frombuffer(difficulty_codes, dtype=np.int16)
+
+        self.built_at = time.monotonic()
+        self.searches = 0
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    @classmethod
+    def from_documents(cls, documents: Iterable[Dict[str, Any]], **kwargs) -> 'BM25Index':
+        """Index documents keyed by their position in `documents`"""
+        return cls(enumerate(documents), **kwargs)
+
+    def search(self, terms: Sequence[str], limit: int, difficulty: Optional[str] = None,
+               diet: Sequence[str] = ()) -> List[Tuple[Any, float]]:
+        """Top-`limit` recipes for the query terms as (key, score) pairs, best first
+
+        Difficulty and every diet restriction are hard filters, as in vector search.
+        """
+        columns = sorted({self.vocabulary[token] for term in terms for token in tokenize(term) if token in self.vocabulary})
+        if not columns or limit <= 0:
+            return []
+
+        slices = [slice(self._indptr[column], self._indptr[column + 1]) for column in columns]
+        rows = np.concatenate([self._rows[posting] for posting in slices])
+        frequencies = np.concatenate([self._frequencies[posting] for posting in slices])
+        idf = np.repeat(self.idf[columns], [posting.stop - posting.start for posting in slices])
+        contributions = idf * frequencies * (self.k1 + 1.0) / (frequencies + self._length_norm[rows])
+
+        # Sum contributions per row over the union of the postings: densely when the postings
+        # cover a sizeable share of the rows, else over their sorted unique rows
+        if len(rows) * self.DENSE_ACCUMULATE_RATIO >= len(self.keys):
+            dense = np.bincount(rows, weights=contributions, minlength=len(self.keys))
+            candidates = np.flatnonzero(dense)
+            scores = dense[candidates]
+        else:
+            candidates, inverse = np.unique(rows, return_inverse=True)
+            scores = np.bincount(inverse, weights=contributions)
+
+        keep = None
+        if difficulty:
+            code = self._difficulties.get(difficulty)
+            if code is None:
+                return []
+            keep = self._difficulty_codes[candidates] == code
+        if diet:
+            diet_keep = self.diet.mask(diet, len(self.keys))[candidates]
+            keep = diet_keep if keep is None else keep & diet_keep
+        if keep is not None:
+            candidates, scores = candidates[keep], scores[keep]
+        self.searches += 1
+        if len(candidates) == 0:
+            return []
+
+        k = min(limit, len(candidates))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.lexsort((candidates[top], -scores[top]))]
+        return [(self.keys[candidates[position]], round(float(scores[position]), 4)) for position in top]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "recipes": len(self.keys),
+            "terms": len(self.vocabulary),
+            "postings": int(len(self._rows)),
+            "postingBytes": int(self._rows.nbytes + self._frequencies.nbytes + self._indptr.nbytes),
+            "ageSeconds": round(time.monotonic() - self.built_at, 1),
+            "searches": self.searches
+        }
+
+
+class TextIndexService:
+    """Keeps a BM25Index of the recipes for keyword search without a database round trip
+
+    Builds run in a background thread from the loader they are given. Changes arriving
+    while a build runs, or within TEXT_INDEX_REBUILD_INTERVAL of the last one, fold into
+    a single follow-up build; searches use the last complete index meanwhile. The index
+    holds recipe keys only; the fetcher given with the loader turns the top hits' keys
+    back into documents.
+    """
+
+    def __init__(self, rebuild_interval: float = Config.TEXT_INDEX_REBUILD_INTERVAL):
+        self.rebuild_interval = rebuild_interval
+        # (index, fetcher) swapped as one, so a search never pairs an index with another source's fetcher
+        self._current = None
+        self._pending = None
+        self._thread = None
+        self._lock = threading.Lock()
+        self._last_build_at = None
+        self.builds = 0
+        self.last_error = None
+
+    @property
+    def index(self) -> Optional[BM25Index]:
+        current = self._current
+        return current[0] if current is not None else None
+
+    def schedule_build(self, load_entries: Callable[[], Iterable[Tuple[Any, Dict[str, Any]]]],
+                       fetch_documents: Callable[[List[Any]], List[Optional[Dict[str, Any]]]]):
+        """Rebuild from the (key, document) pairs of load_entries() in the background (the latest loader wins)
+
+        fetch_documents(keys) returns the document for each key, or None for one that is gone.
+        """
+        with self._lock:
+            self._pending = (load_entries, fetch_documents)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._build_pending, name='text-index-build', daemon=True)
+                self._thread.start()
+
+    def search(self, ingredients: Sequence[str], mood: Optional[str], limit: int, difficulty: Optional[str] = None,
+               diet: Sequence[str] = ()) -> Optional[List[Tuple[Dict[str, Any], float]]]:
+        """Ranked (document, score) pairs, or None until the first build completes"""
+        current = self._current
+        if current is None:
+            return None
+        index, fetch_documents = current
+        terms = list(ingredients) + ([mood] if mood else [])
+        hits = index.search(terms, limit, difficulty=difficulty, diet=diet)
+        if not hits:
+            return []
+        documents = fetch_documents([key for key, _ in hits])
+        return [(document, score) for document, (_, score) in zip(documents, hits) if document is not None]
+
+    def stats(self) -> Optional[Dict[str, Any]]:
+        index = self.index
+        if index is None and self.last_error is None:
+            return None
+        index_stats = index.stats() if index is not None else {}
+        return {**index_stats, "builds": self.builds, "building": self._thread is not None, "lastError": self.last_error}
+
+    def _build_pending(self):
+        while True:
+            with self._lock:
+                if self._pending is None:
+                    self._thread = None
+                    return
+
+            if self._last_build_at is not None:
+                wait = self.rebuild_interval - (time.monotonic() - self._last_build_at)
+                if wait > 0:
+                    time.sleep(wait)
+
+            # Taken after the wait so changes made during it are included
+            with self._lock:
+                (load_entries, fetch_documents), self._pending = self._pending, None
+
+            try:
+                started = time.perf_counter()
+                index = BM25Index(load_entries())
+                self._current = (index, fetch_documents)
+                self.builds += 1
+                self.last_error = None
+                logger.info(
+                    f"Built text index over {len(index)} recipes and {len(index.vocabulary)} terms "
+                    f"in {time.perf_counter() - started:.1f}s"
+                )
+            except Exception as e:
+                self.last_error = str(e)
+                logger.error(f"Text index build failed: {e}")
+            self._last_build_at = time.monotonic()
@@ -1,17 +1,49 @@
 import numpy as np
-from typing import List, Dict, Any, Optional
-from pymongo import MongoClient
-from pymongo.errors import OperationFailure
+from typing import List, Dict, Any, Callable, Optional, Sequence, Tuple
+from pymongo import MongoClient, UpdateOne
+from pymongo.errors import OperationFailure, BulkWriteError
 from services.ai_service import ai_service
+from services.candidate_tuner import candidate_tuner
+from services.diet_index import DIET_FIELD, DIET_VERSION_FIELD, recipe_ingredient_names
+from services.ingredient_classifier import DIET_CLASSIFIER_VERSION, diet_flags
+from services.index_snapshot import open_snapshot, read_current, write_snapshot
+from services.local_vector_index import DELETED_FIELD, NOT_DELETED, ExactVectorIndex, get_local_index_class
+from services.parallel_indexer import ParallelIndexer
+from services.text_index import TextIndexService
 from config import Config
+from utils.cache import LRUCache, embedding_key
+from datetime import datetime
 import logging
+import math
+import threading
+import time
 
 logger = logging.getLogger(__name__)
 
+# Fields never returned by searches: the embedding and local index sync bookkeeping
+SERVER_SIDE_EXCLUDED_FIELDS = {Config.VECTOR_FIELD: 0, "updatedAt": 0}
+
+# Fields the keyword index tokenizes or filters on, all it reads when built from MongoDB
+TEXT_INDEX_FIELDS = {field: 1 for field in ('name', 'description', 'tags', 'mood', 'difficulty', 'ingredients', DIET_FIELD, DIET_VERSION_FIELD)}
+
 class VectorSearchService:
     def __init__(self, db_connection=None):
         self.db = db_connection
         self.recipes_collection = None
+        self.last_index_report = None
+        self.index_version = 0
+        self._index_listeners = []
+        self.local_index = None
+        self._local_index_lock = threading.Lock()
+        self.candidate_tuner = candidate_tuner
+        self.add_index_listener(self.candidate_tuner.forget_exhausted)
+        self.text_index = TextIndexService()
+        # Keys carry the index version, so entries from before a write are never read again;
+        # clearing on change just frees them early
+        self.result_cache = LRUCache(Config.VECTOR_CACHE_SIZE, Config.VECTOR_CACHE_TTL)
+        self.cache_bypasses = 0
+        self.add_index_listener(self.result_cache.clear)
+        self.add_index_listener(self._schedule_text_index_build)
         if self.db:
             self.recipes_collection = self.db[Config.RECIPES_COLLECTION]
     
@@ -19,81 +51,290 @@ class VectorSearchService:
         """Set database connection"""
         self.db = db_connection
         self.recipes_collection = self.db[Config.RECIPES_COLLECTION]
+        self.local_index = None
+        
+        # Local backends build the text index from their own documents once loaded
+        if get_local_index_class(Config.VECTOR_SEARCH_BACKEND) is None:
+            self._schedule_text_index_build()
+    
+    def get_local_index(self):
+        """In-process vector index for the configured backend, loaded on first use"""
+        index_class = get_local_index_class(Config.VECTOR_SEARCH_BACKEND)
+        if index_class is None:
+            return None
+        
+        if self.local_index is None:
+            with self._local_index_lock:
+                if self.local_index is None:
+                    self.local_index = self._load_local_index(index_class)
+                    if self.local_index is not None:
+                        self._schedule_text_index_build()
+        
+        return self.local_index
+    
+    def reload_local_index(self):
+        """Reload the in-process index (snapshot or MongoDB) and swap it in once complete"""
+        index_class = get_local_index_class(Config.VECTOR_SEARCH_BACKEND)
+        if index_class is None:
+            return None
+        
+        index = self._load_local_index(index_class)
+        if index is None:
+            return None
+        
+        with self._local_index_lock:
+            self.local_index = index
+        self._notify_index_changed()
+        return index
+    
+    def snapshot_is_stale(self) -> bool:
+        """True when a newer snapshot than the mapped one has been published"""
+        if not self._uses_snapshots():
+            return False
+        current = read_current(Config.INDEX_SNAPSHOT_DIR)
+        return current is not None and current != getattr(self.local_index, 'snapshot_version', None)
+    
+    def save_index_snapshot(self, created_at: Optional[datetime] = None) -> Optional[str]:
+        """Publish the current local index as a snapshot for other workers to map"""
+        local_index = self.get_local_index()
+        if local_index is None:
+            return None
+        return write_snapshot(local_index, Config.INDEX_SNAPSHOT_DIR, created_at=created_at)
+    
+    def _load_local_index(self, index_class):
+        # A published snapshot is mapped instead of re-reading the collection
+        if self._uses_snapshots():
+            try:
+                index = open_snapshot(Config.INDEX_SNAPSHOT_DIR)
+                if index is not None:
+                    return index
+            except Exception as e:
+                logger.error(f"Failed to open index snapshot, loading from MongoDB: {e}")
+        
+        if self.recipes_collection is None:
+            return None
+        return index_class.from_collection(self.recipes_collection)
     
-    def search_similar_recipes(self, ingredients: List[str], mood: Optional[str] = None, limit: int = 5) -> List[Dict[str, Any]]:
-        """Search for similar recipes using MongoDB Atlas Vector Search"""
+    def _uses_snapshots(self) -> bool:
+        return bool(Config.INDEX_SNAPSHOT_DIR) and Config.VECTOR_SEARCH_BACKEND == ExactVectorIndex.name
+    
+    def apply_index_changes(self, documents: List[Dict[str, Any]], removed_ids: List[Any] = (), removed_names: List[str] = ()) -> int:
+        """Apply upserted recipe documents (with vectors) and deletions (by _id or name) to the in-process index"""
+        local_index = self.local_index
+        if local_index is None:
+            return 0
+        
+        documents = [document for document in documents if len(document.get(Config.VECTOR_FIELD) or ()) == local_index.dimension]
+        applied = 0
+        if documents:
+            applied += local_index.add(documents, np.array([document[Config.VECTOR_FIELD] for document in documents], dtype=np.float32))
+        if removed_ids or removed_names:
+            applied += local_index.remove(ids=removed_ids, names=removed_names)
+        
+        if applied:
+            self._notify_index_changed()
+        return applied
+    
+    def add_index_listener(self, listener: Callable[[], None]):
+        """Register a callback run whenever indexed recipe vectors change"""
+        self._index_listeners.append(listener)
+    
+    def _notify_index_changed(self):
+        """Bump the index version and let caches built on the old index invalidate themselves"""
+        self.index_version += 1
+        for listener in self._index_listeners:
+            try:
+                listener()
+            except Exception as e:
+                logger.error(f"Index change listener failed: {e}")
+    
+    def _schedule_text_index_build(self):
+        """Rebuild the keyword fallback index from the local index's rows, else from MongoDB
+        
+        The text index keeps only row numbers (local) or _ids (MongoDB); hits are read back
+        from the same source, so no worker holds a second copy of the catalog.
+        """
+        local_index = self.local_index
+        if local_index is not None:
+            self.text_index.schedule_build(local_index.live_entries, local_index.documents_at)
+        elif self.recipes_collection is not None:
+            collection = self.recipes_collection
+            
+            def load_entries():
+                for document in collection.find(NOT_DELETED, TEXT_INDEX_FIELDS, batch_size=1000):
+                    yield document['_id'], document
+            
+            def fetch_documents(recipe_ids):
+                found = {document['_id']: document for document in collection.find({"_id": {"$in": recipe_ids}, **NOT_DELETED}, SERVER_SIDE_EXCLUDED_FIELDS)}
+                return [found.get(recipe_id) for recipe_id in recipe_ids]
+            
+            self.text_index.schedule_build(load_entries, fetch_documents)
+    
+    def search_similar_recipes(self, ingredients: List[str], mood: Optional[str] = None, limit: int = 5,
+                               difficulty: Optional[str] = None,
+                               query_embedding: Optional[List[float]] = None,
+                               diet: Sequence[str] = (),
+                               bypass_cache: bool = False) -> List[Dict[str, Any]]:
+        """Search for similar recipes using MongoDB Atlas Vector Search
+        
+        Pass query_embedding when the caller already has it ([] means none is available).
+        diet lists restriction classes (vegan, nut-free...) every result must satisfy.
+        Vector results are cached per quantized embedding and filters until the index
+        changes; bypass_cache (or VECTOR_CACHE_BYPASS) skips the lookup for debugging.
+        """
         try:
-            if not self.recipes_collection:
+            local_index = self.get_local_index()
+            
+            if self.recipes_collection is None and local_index is None:
                 logger.error("Database connection not available")
                 return []
             
             # Generate embedding for search query
-            query_embedding = ai_service.generate_ingredient_embedding(ingredients)
+            if query_embedding is None:
+                query_embedding = ai_service.generate_ingredient_embedding(ingredients)
             
             if not query_embedding:
                 logger.warning("Could not generate embedding, falling back to text search")
-                return self._fallback_text_search(ingredients, mood, limit)
+                return self._fallback_text_search(ingredients, mood, limit, difficulty, diet)
             
-            # Build vector search pipeline
-            pipeline = self._build_vector_search_pipeline(query_embedding, mood, limit)
-            
-            # Execute search
-            results = list(self.recipes_collection.aggregate(pipeline))
+            # Version read before searching, so results racing with a write are filed under the old one
+            cache_key = (embedding_key(query_embedding), mood, limit, difficulty, tuple(sorted(set(diet))), self.index_version)
+            if bypass_cache or Config.VECTOR_CACHE_BYPASS:
+                self.cache_bypasses += 1
+            else:
+                cached = self.result_cache.get(cache_key)
+                if cached is not None:
+                    logger.info(f"Vector search served {len(cached)} recipes from cache")
+                    return [dict(result) for result in cached]
             
-            # Process results
-            processed_results = self._process_search_results(results)
+            # Score in process when a local backend is configured
+            if local_index is not None:
+                processed_results = self._local_search(local_index, query_embedding, mood, limit, difficulty, diet)
+            else:
+                # Execute search
+                results = self._atlas_search(query_embedding, mood, limit, difficulty, diet)
+                
+                # Process results
+                processed_results = self._process_search_results(results)
+                
+                logger.info(f"Vector search found {len(processed_results)} similar recipes")
             
-            logger.info(f"Vector search found {len(processed_results)} similar recipes")
+            # Callers decorate the recipes they get, so the cache keeps its own copies
+            self.result_cache.put(cache_key, [dict(result) for result in processed_results])
             return processed_results
             
         except Exception as e:
             logger.error(f"Vector search error: {e}")
-            return self._fallback_text_search(ingredients, mood, limit)
+            return self._fallback_text_search(ingredients, mood, limit, difficulty, diet)
     
-    def _build_vector_search_pipeline(self, query_embedding: List[float], mood: Optional[str], limit: int) -> List[Dict]:
-        """Build MongoDB aggregation pipeline for vector search"""
-        pipeline = [
-            {
-                "$vectorSearch": {
-                    "index": Config.VECTOR_INDEX_NAME,
-                    "path": "ingredientVector",
-                    "queryVector": query_embedding,
-                    "numCandidates": min(100, limit * 10),
-                    "limit": limit * 2  # Get more candidates for filtering
-                }
-            },
+    def cache_stats(self) -> Dict[str, Any]:
+        """Result cache counters for health payloads"""
+        return {
+            **self.result_cache.stats(),
+            "indexVersion": self.index_version,
+            "bypassed": self.cache_bypasses,
+            "bypassAll": Config.VECTOR_CACHE_BYPASS
+        }
+    
+    def _local_search(self, local_index, query_embedding: List[float], mood: Optional[str], limit: int,
+                      difficulty: Optional[str] = None, diet: Sequence[str] = ()) -> List[Dict[str, Any]]:
+        """Search the in-process index and format hits like Atlas results"""
+        results = []
+        for document, score in local_index.search(query_embedding, limit, mood=mood, difficulty=difficulty, diet=diet):
+            result = dict(document)
+            result['searchScore'] = score
+            results.append(result)
+        
+        processed_results = self._process_search_results(results)
+        
+        logger.info(f"Local {local_index.name} vector search found {len(processed_results)} similar recipes")
+        return processed_results
+    
+    def _atlas_search(self, query_embedding: List[float], mood: Optional[str], limit: int,
+                      difficulty: Optional[str] = None, diet: Sequence[str] = ()) -> List[Dict]:
+        """Run $vectorSearch with candidate counts tuned to the filter, widening when short
+        
+        The similarity threshold (no mood requested) is applied here rather than in the
+        pipeline so the tuner sees how many fetched results survive it.
+        """
+        filter_key = self.candidate_tuner.filter_key(mood, difficulty, diet)
+        threshold = None if mood else Config.SIMILARITY_THRESHOLD
+        plan = self.candidate_tuner.plan(filter_key, limit, thresholded=threshold is not None)
+        
+        previous = None
+        for attempt in range(Config.VECTOR_SEARCH_RETRIES + 1):
+            pipeline = self._build_vector_search_pipeline(
+                query_embedding, mood, plan.fetch_limit, difficulty, num_candidates=plan.num_candidates, diet=diet
+            )
+            results = list(self.recipes_collection.aggregate(pipeline))
+            survivors = [
+                result for result in results
+                if threshold is None or result.get('searchScore', 0) >= threshold
+            ]
+            self.candidate_tuner.record(filter_key, plan, len(results), len(survivors), limit, retried_from=previous)
+            
+            if len(survivors) >= limit:
+                break
+            
+            plan = self.candidate_tuner.expand(filter_key, plan, len(results))
+            if plan is None:
+                break
+            previous = len(survivors)
+        
+        return survivors[:limit]
+    
+    def _build_vector_search_pipeline(self, query_embedding: List[float], mood: Optional[str], limit: int,
+                                      difficulty: Optional[str] = None, num_candidates: Optional[int] = None,
+                                      diet: Sequence[str] = ()) -> List[Dict]:
+        """Build MongoDB aggregation pipeline for vector search
+        
+        Mood (mood or tags), difficulty and diet are pre-filters inside $vectorSearch, so every
+        candidate already qualifies and selective moods no longer starve the results.
+        limit is the number of results fetched; the caller applies the similarity threshold.
+        """
+        if num_candidates is None:
+            num_candidates = min(max(limit, math.ceil(limit * Config.VECTOR_CANDIDATE_RATIO)), Config.VECTOR_MAX_CANDIDATES)
+        
+        vector_search = {
+            "index": Config.VECTOR_INDEX_NAME,
+            "path": Config.VECTOR_FIELD,
+            "queryVector": query_embedding,
+            "numCandidates": max(num_candidates, limit),
+            "limit": limit
+        }
+        
+        filters = self._build_vector_search_filter(mood, difficulty, diet)
+        if filters:
+            vector_search["filter"] = filters
+        
+        return [
+            {"$vectorSearch": vector_search},
+            # Drop the vector and bookkeeping fields before anything leaves the server
+            {"$project": SERVER_SIDE_EXCLUDED_FIELDS},
             {
                 "$addFields": {
                     "searchScore": {"$meta": "vectorSearchScore"}
                 }
             }
         ]
-        
-        # Add mood filter if specified
+    
+    def _build_vector_search_filter(self, mood: Optional[str], difficulty: Optional[str],
+                                    diet: Sequence[str] = ()) -> Optional[Dict]:
+        """$vectorSearch pre-filter on the index's filter fields (mood, tags, difficulty, dietFlags, dietFlagsVersion)"""
+        clauses = []
         if mood:
-            pipeline.append({
-                "$match": {
-                    "$or": [
-                        {"mood": mood},
-                        {"tags": {"$in": [mood]}},
-                        {"searchScore": {"$gte": Config.SIMILARITY_THRESHOLD}}
-                    ]
-                }
-            })
-        else:
-            pipeline.append({
-                "$match": {
-                    "searchScore": {"$gte": Config.SIMILARITY_THRESHOLD}
-                }
-            })
-        
-        # Sort by score and limit results
-        pipeline.extend([
-            {"$sort": {"searchScore": -1}},
-            {"$limit": limit}
-        ])
+            clauses.append({"$or": [{"mood": {"$eq": mood}}, {"tags": {"$in": [mood]}}]})
+        if difficulty:
+            clauses.append({"difficulty": {"$eq": difficulty}})
+        if diet:
+            # Flags written by an older classifier are not trusted until the recipe is re-indexed
+            clauses.append({DIET_VERSION_FIELD: {"$eq": DIET_CLASSIFIER_VERSION}})
+        # $eq on an array field matches when any element does, so one clause per restriction
+        clauses.extend({DIET_FIELD: {"$eq": restriction}} for restriction in diet)
         
-        return pipeline
+        if not clauses:
+            return None
+        return clauses[0] if len(clauses) == 1 else {"$and": clauses}
     
     def _process_search_results(self, results: List[Dict]) -> List[Dict[str, Any]]:
         """Process and format search results"""
@@ -105,9 +346,12 @@ class VectorSearchService:
                 result['id'] = str(result['_id'])
                 del result['_id']
             
-            # Remove vector data from response (too large)
-            if 'ingredientVector' in result:
-                del result['ingredientVector']
+            # Remove vector data from response (too large); Atlas results are already projected
+            if Config.VECTOR_FIELD in result:
+                del result[Config.VECTOR_FIELD]
+            
+            # Internal sync bookkeeping
+            result.pop('updatedAt', None)
             
             # Ensure required fields exist
             result.setdefault('rating', 4.5)
@@ -118,10 +362,25 @@ class VectorSearchService:
         
         return processed
     
-    def _fallback_text_search(self, ingredients: List[str], mood: Optional[str], limit: int) -> List[Dict[str, Any]]:
-        """Fallback to text search when vector search fails"""
+    def _fallback_text_search(self, ingredients: List[str], mood: Optional[str], limit: int,
+                              difficulty: Optional[str] = None, diet: Sequence[str] = ()) -> List[Dict[str, Any]]:
+        """Keyword search when no query embedding is available or vector search fails
+        
+        Served by the in-process BM25 index; MongoDB $text is only used until its first build completes.
+        """
         try:
-            if not self.recipes_collection:
+            hits = self.text_index.search(ingredients, mood, limit, difficulty, diet)
+            if hits is not None:
+                results = []
+                for document, score in hits:
+                    result = dict(document)
+                    result['score'] = score
+                    results.append(result)
+                
+                logger.info(f"Text index search found {len(results)} recipes")
+                return self._process_search_results(results)
+            
+            if self.recipes_collection is None:
                 return []
             
             # Build text search query
@@ -130,8 +389,13 @@ class VectorSearchService:
                 search_terms += f" {mood}"
             
             # Text search with scoring
-            query = {"$text": {"$search": search_terms}}
-            projection = {"score": {"$meta": "textScore"}}
+            query = {"$text": {"$search": search_terms}, **NOT_DELETED}
+            if difficulty:
+                query["difficulty"] = difficulty
+            if diet:
+                query[DIET_FIELD] = {"$all": list(diet)}
+                query[DIET_VERSION_FIELD] = DIET_CLASSIFIER_VERSION
+            projection = {"score": {"$meta": "textScore"}, **SERVER_SIDE_EXCLUDED_FIELDS}
             
             results = list(
                 self.recipes_collection
@@ -146,49 +410,227 @@ class VectorSearchService:
             logger.error(f"Fallback text search error: {e}")
             return []
     
-    def index_recipe_vectors(self, recipes: List[Dict[str, Any]]) -> bool:
-        """Index recipes with vector embeddings"""
+    def index_recipe_vectors(self, recipes: List[Dict[str, Any]], batch_size: Optional[int] = None,
+                             workers: Optional[int] = None) -> bool:
+        """Index recipes with vector embeddings in batched chunks
+        
+        With workers (default INGEST_WORKERS) above 0 and more than one chunk, chunks are
+        embedded by that many worker processes while this process writes them.
+        """
         try:
-            if not self.recipes_collection:
+            if self.recipes_collection is None:
                 logger.error("Database connection not available for indexing")
                 return False
             
-            indexed_count = 0
-            
-            for recipe in recipes:
-                try:
-                    # Extract ingredients for embedding
-                    ingredients_text = self._extract_ingredients_text(recipe)
-                    
-                    if ingredients_text:
-                        # Generate vector embedding
-                        vector = ai_service.generate_ingredient_embedding(ingredients_text)
-                        
-                        if vector:
-                            recipe['ingredientVector'] = vector
-                            
-                            # Update or insert recipe
-                            filter_query = {"name": recipe["name"]}
-                            update_doc = {"$set": recipe}
-                            
-                            self.recipes_collection.update_one(
-                                filter_query, 
-                                update_doc, 
-                                upsert=True
-                            )
-                            indexed_count += 1
-                
-                except Exception as e:
-                    logger.error(f"Error indexing recipe {recipe.get('name', 'unknown')}: {e}")
-                    continue
+            batch_size = max(1, batch_size or Config.INDEX_BATCH_SIZE)
+            report = {
+                "indexed": 0,
+                "failed": 0,
+                "chunks": [],
+                "failures": []
+            }
+            
+            workers = Config.INGEST_WORKERS if workers is None else workers
+            started = time.perf_counter()
+            
+            chunks = (recipes[chunk_start:chunk_start + batch_size] for chunk_start in range(0, len(recipes), batch_size))
+            if workers > 0 and len(recipes) > batch_size:
+                with ParallelIndexer(self, workers, batch_size) as indexer:
+                    for chunk, chunk_stats in indexer.index_shards(chunks, self.recipes_collection):
+                        self._record_chunk(report, chunk, chunk_stats)
+                    report["parallel"] = indexer.report()
+            else:
+                for chunk in chunks:
+                    self._record_chunk(report, chunk, self._index_recipe_chunk(chunk, self.recipes_collection))
+            
+            elapsed = time.perf_counter() - started
+            report["seconds"] = round(elapsed, 3)
+            report["recipesPerSecond"] = round(report["indexed"] / elapsed, 1) if elapsed > 0 else 0.0
+            self.last_index_report = report
             
-            logger.info(f"Successfully indexed {indexed_count} recipes with vectors")
-            return indexed_count > 0
+            if report["indexed"]:
+                self._notify_index_changed()
+            
+            logger.info(
+                f"Successfully indexed {report['indexed']} recipes with vectors "
+                f"({report['failed']} failed, {report['recipesPerSecond']} recipes/s)"
+            )
+            return report["indexed"] > 0
             
         except Exception as e:
             logger.error(f"Vector indexing error: {e}")
             return False
     
+    def _record_chunk(self, report: Dict[str, Any], chunk: List[Dict[str, Any]], chunk_stats: Dict[str, Any]):
+        """Fold one written chunk into the indexing report"""
+        # Keep a loaded local index in step with what was just written
+        if self.local_index is not None:
+            self._add_to_local_index(chunk, chunk_stats["failures"])
+        
+        report["indexed"] += chunk_stats["indexed"]
+        report["failed"] += len(chunk_stats["failures"])
+        report["failures"].extend(chunk_stats.pop("failures"))
+        report["chunks"].append(chunk_stats)
+    
+    def index_recipe_batch(self, recipes: List[Dict[str, Any]], collection=None) -> Dict[str, Any]:
+        """Embed and upsert one batch into collection (default: the recipes collection) and return its stats
+        
+        Unlike index_recipe_vectors this leaves the local index and listeners alone; it is
+        meant for offline jobs such as import_recipes.py writing from another process.
+        """
+        return self._index_recipe_chunk(recipes, collection if collection is not None else self.recipes_collection)
+    
+    def delete_recipes(self, names: List[str]) -> int:
+        """Soft-delete recipes by name and return how many were deleted
+        
+        The vector is dropped and `deleted` and updatedAt are stamped, so every worker's index
+        sync removes them on its next poll instead of waiting for the delete reconciliation scan.
+        """
+        if self.recipes_collection is None or not names:
+            return 0
+        
+        result = self.recipes_collection.update_many(
+            {"name": {"$in": list(names)}, **NOT_DELETED},
+            {"$set": {DELETED_FIELD: True, "updatedAt": datetime.utcnow()}, "$unset": {Config.VECTOR_FIELD: ""}}
+        )
+        if self.local_index is not None and self.local_index.remove(names=names):
+            self._notify_index_changed()
+        logger.info(f"Soft-deleted {result.modified_count} recipes")
+        return result.modified_count
+    
+    def _index_recipe_chunk(self, chunk: List[Dict[str, Any]], collection) -> Dict[str, Any]:
+        """Embed one chunk of recipes in a single pass and upsert it with one bulk write"""
+        pending, ingredient_lists, failures = self._prepare_chunk(chunk)
+        
+        # Generate vector embeddings for the whole chunk at once
+        embed_started = time.perf_counter()
+        vectors = self._embed_chunk(pending, ingredient_lists, failures)
+        embed_ms = (time.perf_counter() - embed_started) * 1000
+        
+        return self._write_chunk(chunk, pending, vectors, failures, collection, embed_ms)
+    
+    def _prepare_chunk(self, chunk: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[List[str]], List[Dict[str, str]]]:
+        """Split a chunk into embeddable recipes and their ingredient lists, recording the rest as failures"""
+        failures = []
+        pending = []
+        ingredient_lists = []
+        
+        # Extract ingredients for embedding, recording recipes that cannot be indexed
+        for recipe in chunk:
+            name = recipe.get('name')
+            ingredients_text = self._extract_ingredients_text(recipe)
+            if not name:
+                failures.append({"name": "unknown", "error": "Recipe has no name"})
+            elif not ingredients_text:
+                failures.append({"name": name, "error": "Recipe has no ingredients to embed"})
+            else:
+                pending.append(recipe)
+                ingredient_lists.append(ingredients_text)
+        
+        return pending, ingredient_lists, failures
+    
+    def _write_chunk(self, chunk: List[Dict[str, Any]], pending: List[Dict[str, Any]], vectors: Sequence[Optional[np.ndarray]],
+                     failures: List[Dict[str, str]], collection, embed_ms: float) -> Dict[str, Any]:
+        """Upsert the embedded recipes of a chunk with one bulk write and return the chunk stats"""
+        # Build upserts for every recipe that received a vector; updatedAt drives local index sync polling
+        operations = []
+        operation_names = []
+        updated_at = datetime.utcnow()
+        for recipe, vector in zip(pending, vectors):
+            if vector is None:
+                continue
+            recipe[Config.VECTOR_FIELD] = vector.tolist()
+            recipe[DIET_FIELD] = diet_flags(recipe_ingredient_names(recipe))
+            recipe[DIET_VERSION_FIELD] = DIET_CLASSIFIER_VERSION
+            # Indexing a recipe again brings back one that was soft-deleted
+            recipe.pop(DELETED_FIELD, None)
+            operations.append(UpdateOne(
+                {"name": recipe["name"]},
+                {"$set": {**recipe, "updatedAt": updated_at}, "$unset": {DELETED_FIELD: ""}},
+                upsert=True
+            ))
+            operation_names.append(recipe["name"])
+        
+        # Write the chunk in one unordered round trip
+        write_started = time.perf_counter()
+        indexed = self._bulk_upsert(collection, operations, operation_names, failures)
+        write_ms = (time.perf_counter() - write_started) * 1000
+        
+        total_seconds = (embed_ms + write_ms) / 1000
+        chunk_stats = {
+            "size": len(chunk),
+            "indexed": indexed,
+            "embedMs": round(embed_ms, 1),
+            "writeMs": round(write_ms, 1),
+            "recipesPerSecond": round(indexed / total_seconds, 1) if total_seconds > 0 else 0.0,
+            "failures": failures
+        }
+        
+        logger.info(
+            f"Indexed chunk: {indexed}/{len(chunk)} recipes, embed {chunk_stats['embedMs']} ms, "
+            f"write {chunk_stats['writeMs']} ms, {chunk_stats['recipesPerSecond']} recipes/s"
+        )
+        return chunk_stats
+    
+    def _add_to_local_index(self, chunk: List[Dict[str, Any]], failures: List[Dict[str, str]]):
+        """Upsert freshly indexed recipes into the in-process index"""
+        failed_names = {failure["name"] for failure in failures}
+        indexed = [
+            recipe for recipe in chunk
+            if Config.VECTOR_FIELD in recipe and recipe.get('name') not in failed_names
+        ]
+        if indexed:
+            self.local_index.add(indexed, np.array([recipe[Config.VECTOR_FIELD] for recipe in indexed], dtype=np.float32))
+    
+    def _embed_chunk(self, recipes: List[Dict[str, Any]], ingredient_lists: List[List[str]], failures: List[Dict[str, str]],
+                     embed: Optional[Callable[[List[List[str]]], np.ndarray]] = None) -> List[Optional[np.ndarray]]:
+        """Embed a chunk in one encoder call, isolating failing recipes if the batch call fails
+        
+        embed defaults to the in-process model; parallel ingestion passes a worker pool's.
+        """
+        if not recipes:
+            return []
+        
+        embed = embed or ai_service.generate_ingredient_embeddings
+        try:
+            return list(embed(ingredient_lists))
+        except Exception as e:
+            logger.warning(f"Batch embedding failed, retrying recipes individually: {e}")
+        
+        vectors = []
+        for recipe, ingredients_text in zip(recipes, ingredient_lists):
+            try:
+                vectors.append(embed([ingredients_text])[0])
+            except Exception as e:
+                failures.append({"name": recipe["name"], "error": f"Embedding failed: {e}"})
+                vectors.append(None)
+        
+        return vectors
+    
+    def _bulk_upsert(self, collection, operations: List[UpdateOne], operation_names: List[str], failures: List[Dict[str, str]]) -> int:
+        """Execute upserts as one unordered bulk write and return the number of recipes written"""
+        if not operations:
+            return 0
+        
+        try:
+            collection.bulk_write(operations, ordered=False)
+            return len(operations)
+            
+        except BulkWriteError as e:
+            # Unordered writes keep going past errors, so only the reported operations failed
+            write_errors = e.details.get('writeErrors', [])
+            for error in write_errors:
+                failures.append({
+                    "name": operation_names[error['index']],
+                    "error": error.get('errmsg', 'Bulk write error')
+                })
+            return len(operations) - len(write_errors)
+            
+        except Exception as e:
+            for name in operation_names:
+                failures.append({"name": name, "error": f"Bulk write failed: {e}"})
+            return 0
+    
     def _extract_ingredients_text(self, recipe: Dict[str, Any]) -> List[str]:
         """Extract ingredient names from recipe for embedding"""
         ingredients_text = []
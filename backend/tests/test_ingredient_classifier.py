@@ -0,0 +1,75 @@
+import pytest
+
+from services.diet_index import DIET_FIELD, DIET_VERSION_FIELD, document_diet_flags
+from services.ingredient_classifier import DIET_CLASSIFIER_VERSION, DIET_RESTRICTIONS, classify_diet, diet_flags
+
+ALL_RESTRICTIONS = list(DIET_RESTRICTIONS)
+
+
+@pytest.mark.parametrize('ingredient', [
+    'wild boar', 'venison', 'bison steak', 'kangaroo fillet', 'ostrich mince', 'pigeon breast', 'veal cutlet'
+])
+def test_meats_fail_vegetarian_and_vegan(ingredient):
+    flags = diet_flags([ingredient])
+    assert 'vegetarian' not in flags
+    assert 'vegan' not in flags
+    assert 'pescatarian' not in flags
+
+
+@pytest.mark.parametrize('ingredient', ['monkfish', 'lionfish fillet', 'pollock', 'mahi mahi', 'salmon fillet'])
+def test_fish_fails_vegetarian_but_passes_pescatarian(ingredient):
+    assert classify_diet(ingredient) == {'fish'}
+    flags = diet_flags([ingredient])
+    assert 'vegetarian' not in flags
+    assert 'pescatarian' in flags
+
+
+@pytest.mark.parametrize('ingredient', ['squid', 'octopus', 'cuttlefish', 'shellfish'])
+def test_cephalopods_and_shellfish_fail_shellfish_free(ingredient):
+    assert classify_diet(ingredient) == {'shellfish'}
+    assert 'shellfish-free' not in diet_flags([ingredient])
+
+
+def test_goat_cheese_is_dairy_not_meat():
+    assert classify_diet('goat cheese') == {'dairy'}
+    flags = diet_flags(['goat cheese'])
+    assert 'vegetarian' in flags
+    assert 'vegan' not in flags
+    assert 'dairy-free' not in flags
+
+
+def test_cocoa_butter_is_not_dairy():
+    assert classify_diet('cocoa butter') == frozenset()
+    assert diet_flags(['cocoa butter']) == ALL_RESTRICTIONS
+
+
+@pytest.mark.parametrize('ingredient', ['crème fraîche', 'Crème Fraîche', 'creme fraiche'])
+def test_accented_dairy_is_folded(ingredient):
+    assert classify_diet(ingredient) == {'dairy'}
+    assert 'dairy-free' not in diet_flags([ingredient])
+
+
+@pytest.mark.parametrize('ingredient', ['cauliflower steak', 'eggplant', 'coconut milk', 'tofu'])
+def test_plant_ingredients_pass_every_restriction(ingredient):
+    assert diet_flags([ingredient]) == ALL_RESTRICTIONS
+
+
+def test_stale_stored_flags_are_recomputed():
+    document = {
+        'ingredients': [{'name': 'chorizo'}, {'name': 'rice'}],
+        DIET_FIELD: ALL_RESTRICTIONS,
+        DIET_VERSION_FIELD: DIET_CLASSIFIER_VERSION - 1
+    }
+    assert 'vegetarian' not in document_diet_flags(document)
+
+    del document[DIET_VERSION_FIELD]
+    assert 'vegetarian' not in document_diet_flags(document)
+
+
+def test_current_stored_flags_are_trusted():
+    document = {
+        'ingredients': [{'name': 'chorizo'}],
+        DIET_FIELD: ['vegetarian'],
+        DIET_VERSION_FIELD: DIET_CLASSIFIER_VERSION
+    }
+    assert document_diet_flags(document) == ['vegetarian']
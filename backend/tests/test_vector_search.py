@@ -0,0 +1,104 @@
+import math
+
+import pytest
+
+from config import Config
+from services.candidate_tuner import CandidateTuner
+from services.ingredient_classifier import DIET_CLASSIFIER_VERSION
+from services.vector_search import VectorSearchService
+
+QUERY_EMBEDDING = [0.1] * Config.VECTOR_DIMENSION
+
+
+class PipelineCapturingCollection:
+    """Stand-in recipes collection that records every aggregation pipeline it is given"""
+
+    def __init__(self, results=()):
+        self.results = list(results)
+        self.pipelines = []
+
+    def aggregate(self, pipeline):
+        self.pipelines.append(pipeline)
+        return iter([dict(result) for result in self.results])
+
+
+@pytest.fixture
+def collection():
+    return PipelineCapturingCollection([
+        {"_id": index, "name": f"Recipe {index}", "searchScore": 0.9} for index in range(5)
+    ])
+
+
+@pytest.fixture
+def service(collection, monkeypatch):
+    monkeypatch.setattr(Config, 'VECTOR_SEARCH_BACKEND', 'atlas')
+    search_service = VectorSearchService({Config.RECIPES_COLLECTION: collection})
+    search_service.candidate_tuner = CandidateTuner(candidate_ratio=10, max_candidates=2000)
+    return search_service
+
+
+def vector_search_stage(pipeline):
+    assert list(pipeline[0]) == ["$vectorSearch"]
+    return pipeline[0]["$vectorSearch"]
+
+
+def test_filters_are_pushed_into_vector_search(service, collection):
+    service.search_similar_recipes(
+        ['tomato'], mood='comfort', limit=5, difficulty='Easy',
+        query_embedding=QUERY_EMBEDDING, diet=['vegan', 'nut-free'], bypass_cache=True
+    )
+
+    stage = vector_search_stage(collection.pipelines[0])
+    assert stage["index"] == Config.VECTOR_INDEX_NAME
+    assert stage["path"] == Config.VECTOR_FIELD
+    assert stage["queryVector"] == QUERY_EMBEDDING
+    assert stage["filter"] == {"$and": [
+        {"$or": [{"mood": {"$eq": "comfort"}}, {"tags": {"$in": ["comfort"]}}]},
+        {"difficulty": {"$eq": "Easy"}},
+        {"dietFlagsVersion": {"$eq": DIET_CLASSIFIER_VERSION}},
+        {"dietFlags": {"$eq": "vegan"}},
+        {"dietFlags": {"$eq": "nut-free"}}
+    ]}
+    # A mood skips the similarity threshold, so exactly `limit` results are fetched
+    assert stage["limit"] == 5
+    assert stage["numCandidates"] == 50
+
+
+def test_single_filter_is_not_wrapped_in_and(service, collection):
+    service.search_similar_recipes(['tomato'], mood='comfort', limit=5, query_embedding=QUERY_EMBEDDING, bypass_cache=True)
+
+    stage = vector_search_stage(collection.pipelines[0])
+    assert stage["filter"] == {"$or": [{"mood": {"$eq": "comfort"}}, {"tags": {"$in": ["comfort"]}}]}
+
+
+def test_unfiltered_search_over_fetches_for_the_threshold(service, collection):
+    service.search_similar_recipes(['tomato'], limit=5, query_embedding=QUERY_EMBEDDING, bypass_cache=True)
+
+    stage = vector_search_stage(collection.pipelines[0])
+    assert "filter" not in stage
+    # Prior survival of 0.5 with 25% headroom
+    expected_limit = math.ceil(5 * CandidateTuner.HEADROOM / 0.5)
+    assert stage["limit"] == expected_limit
+    assert stage["numCandidates"] == expected_limit * 10
+    assert stage["numCandidates"] >= stage["limit"]
+
+
+def test_vector_and_bookkeeping_fields_are_projected_out(service, collection):
+    results = service.search_similar_recipes(['tomato'], mood='comfort', limit=5, query_embedding=QUERY_EMBEDDING, bypass_cache=True)
+
+    pipeline = collection.pipelines[0]
+    assert pipeline[1] == {"$project": {Config.VECTOR_FIELD: 0, "updatedAt": 0}}
+    assert pipeline[2] == {"$addFields": {"searchScore": {"$meta": "vectorSearchScore"}}}
+    assert [result["id"] for result in results] == [str(index) for index in range(5)]
+
+
+def test_short_results_retry_with_more_candidates(service, collection):
+    collection.results = collection.results[:2]
+
+    service.search_similar_recipes(['tomato'], mood='comfort', limit=5, query_embedding=QUERY_EMBEDDING, bypass_cache=True)
+
+    assert len(collection.pipelines) == Config.VECTOR_SEARCH_RETRIES + 1
+    first, retry = (vector_search_stage(pipeline) for pipeline in collection.pipelines[:2])
+    assert retry["filter"] == first["filter"]
+    assert retry["limit"] == first["limit"]
+    assert retry["numCandidates"] == first["numCandidates"] * CandidateTuner.EXPANSION
@@ -0,0 +1,213 @@
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Sequence
+import hashlib
+import json
+import threading
+import time
+
+import numpy as np
+
+
+def stable_hash(value: Any) -> int:
+    """Process-independent 64-bit hash of a JSON-serializable value"""
+    payload = json.dumps(value, sort_keys=True, default=str, ensure_ascii=False)
+    return int.from_bytes(hashlib.blake2b(payload.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+def embedding_key(embedding: Sequence[float], levels: int = 127) -> int:
+    """64-bit hash of an embedding's direction quantized to int8, so float noise maps to one key"""
+    vector = np.asarray(embedding, dtype=np.float32).reshape(-1)
+    norm = np.linalg.norm(vector)
+    if norm > 0:
+        vector = vector / norm
+    quantized = np.round(vector * levels).astype(np.int8)
+    return int.from_bytes(hashlib.blake2b(quantized.tobytes(), digest_size=8).digest(), 'big')
+
+
+def content_id(value: Dict[str, Any], prefix: str = 'recipe') -> str:
+    """Stable identifier derived from a document's content (its 'id' field excluded)"""
+    content = {key: item for key, item in value.items() if key != 'id'}
+    return f"{prefix}_{stable_hash(content):016x}"
+
+
+class LRUCache:
+    """Thread-safe bounded LRU cache with optional per-entry TTL"""
+
+    def __init__(self, maxsize: int = 1024, ttl: Optional[float] = None):
+        self.maxsize = max(0, int(maxsize))
+        self.ttl = ttl if ttl and ttl > 0 else None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the cached value for key, or default on a miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is None:
+                self.misses += 1
+                return default
+
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                # Stale entries count as misses and are dropped eagerly
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any):
+        """Store value under key, evicting the least recently used entries if full"""
+        if self.maxsize == 0:
+            return
+
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+            self._entries[key] = (value, expires_at)
+
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def discard(self, key: Hashable):
+        """Drop the entry for key, if any"""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        """Drop every cached entry (counters are kept)"""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        """Cache counters suitable for health payloads"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxSize": self.maxsize,
+                "ttlSeconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hitRate": round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+
+class SemanticCache:
+    """Thread-safe bounded cache that matches queries by embedding similarity
+
+    Embeddings of answered queries sit L2-normalized in one ring-buffer matrix. A lookup
+    scores every entry with a single matrix-vector product and returns the most similar
+    one in the same partition (mood, filters...) if its cosine reaches the threshold;
+    the oldest entry is overwritten once full. The best similarity of every lookup that
+    had a candidate is histogrammed so the threshold can be tuned from real traffic.
+    """
+
+    # Histogram bin edges; lookups scoring below the first edge share one bin
+    SIMILARITY_EDGES = np.round(np.arange(0.80, 1.0, 0.01), 2)
+
+    def __init__(self, dimension: int, maxsize: int = 512, threshold: float = 0.97, ttl: Optional[float] = None):
+        self.dimension = dimension
+        self.maxsize = max(0, int(maxsize))
+        self.threshold = threshold
+        self.ttl = ttl if ttl and ttl > 0 else None
+        self._matrix = np.zeros((self.maxsize, dimension), dtype=np.float32)
+        self._partitions = np.zeros(self.maxsize, dtype=np.uint64)
+        self._expires_at = np.full(self.maxsize, np.inf)
+        self._values = [None] * self.maxsize
+        self._size = 0
+        self._next = 0
+        self._lock = threading.Lock()
+        self._similarities = np.zeros(len(self.SIMILARITY_EDGES) + 1, dtype=np.int64)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, partition: Any, embedding: Sequence[float], default: Any = None) -> Any:
+        """Cached value of the most similar query in partition, or default below the threshold"""
+        query = self._normalize(embedding)
+        if query is None or self.maxsize == 0:
+            return default
+        partition_hash = np.uint64(stable_hash(partition))
+
+        with self._lock:
+            best = -1
+            similarity = -1.0
+            if self._size:
+                similarities = self._matrix[:self._size] @ query
+                eligible = (self._partitions[:self._size] == partition_hash) & (self._expires_at[:self._size] > time.monotonic())
+                if eligible.any():
+                    best = int(np.argmax(np.where(eligible, similarities, -np.inf)))
+                    similarity = float(similarities[best])
+                    self._similarities[np.searchsorted(self.SIMILARITY_EDGES, similarity, side='right')] += 1
+
+            if best < 0 or similarity < self.threshold:
+                self.misses += 1
+                return default
+
+            self.hits += 1
+            return self._values[best]
+
+    def put(self, partition: Any, embedding: Sequence[float], value: Any):
+        """Store value for the query embedding, overwriting the oldest entry if full"""
+        vector = self._normalize(embedding)
+        if vector is None or self.maxsize == 0:
+            return
+        partition_hash = stable_hash(partition)
+
+        with self._lock:
+            slot = self._next
+            self._matrix[slot] = vector
+            self._partitions[slot] = np.uint64(partition_hash)
+            self._expires_at[slot] = time.monotonic() + self.ttl if self.ttl else np.inf
+            self._values[slot] = value
+            self._next = (slot + 1) % self.maxsize
+            self._size = max(self._size, slot + 1)
+
+    def clear(self):
+        """Drop every cached entry (counters and the similarity histogram are kept)"""
+        with self._lock:
+            self._values = [None] * self.maxsize
+            self._size = 0
+            self._next = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def stats(self) -> Dict[str, Any]:
+        """Cache counters and the best-similarity histogram of past lookups"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            labels = [f"<{self.SIMILARITY_EDGES[0]:.2f}"] + [f"{edge:.2f}" for edge in self.SIMILARITY_EDGES]
+            return {
+                "size": self._size,
+                "maxSize": self.maxsize,
+                "threshold": self.threshold,
+                "ttlSeconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hitRate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "bestSimilarity": {label: int(count) for label, count in zip(labels, self._similarities)}
+            }
+
+    def _normalize(self, embedding: Sequence[float]) -> Optional[np.ndarray]:
+        if embedding is None or len(embedding) != self.dimension:
+            return None
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else None
@@ -2,6 +2,9 @@ from pymongo import MongoClient, ASCENDING, DESCENDING, TEXT
 from pymongo.errors import ConnectionFailure, OperationFailure
 import logging
 from config import Config
+from services.ai_service import ai_service
+from services.index_sync import LocalIndexSync
+from services.pantry_index import pantry_search_service
 from services.vector_search import vector_search_service
 
 logger = logging.getLogger(__name__)
@@ -10,6 +13,7 @@ class DatabaseConnection:
     _instance = None
     _client = None
     _db = None
+    index_sync = None
     
     def __new__(cls):
         if cls._instance is None:
@@ -42,6 +46,13 @@ class DatabaseConnection:
             # Set database connection for vector search service
             vector_search_service.set_database(self._db)
             
+            # Build the pantry index now rather than inside the first pantry request
+            pantry_search_service.start(self._db[Config.RECIPES_COLLECTION])
+            
+            # Keep an in-process vector index current without reloading it
+            if Config.VECTOR_SEARCH_BACKEND != 'atlas' and Config.INDEX_SYNC_ENABLED:
+                self.index_sync = LocalIndexSync(vector_search_service, self._db[Config.RECIPES_COLLECTION]).start()
+            
             return self._db
             
         except ConnectionFailure as e:
@@ -103,7 +114,8 @@ class DatabaseConnection:
                 ([("mood", ASCENDING)], "recipe_mood_idx"),
                 ([("tags", ASCENDING)], "recipe_tags_idx"),
                 ([("difficulty", ASCENDING)], "recipe_difficulty_idx"),
-                ([("cookTime", ASCENDING)], "recipe_cooktime_idx")
+                ([("cookTime", ASCENDING)], "recipe_cooktime_idx"),
+                ([("updatedAt", ASCENDING), ("_id", ASCENDING)], "recipe_updated_idx")
             ]
             
             for index_spec, index_name in index_specs:
@@ -167,17 +179,21 @@ class DatabaseConnection:
                 logger.info("Sample recipes already exist, skipping initialization")
                 return
             
-            # Create sample recipes with vector embeddings
-            success = vector_search_service.create_sample_recipes_with_vectors()
+            # Embeddings need the model, which loads in the background
+            ai_service.add_ready_callback(self._create_sample_recipes)
             
-            if success:
-                logger.info("Sample recipes with vector embeddings created successfully")
-            else:
-                logger.warning("Failed to create sample recipes with vectors")
-                
         except Exception as e:
             logger.error(f"Error initializing sample data: {e}")
     
+    def _create_sample_recipes(self):
+        """Create sample recipes with vector embeddings"""
+        success = vector_search_service.create_sample_recipes_with_vectors()
+        
+        if success:
+            logger.info("Sample recipes with vector embeddings created successfully")
+        else:
+            logger.warning("Failed to create sample recipes with vectors")
+    
     @property
     def db(self):
         """Get database instance"""
@@ -200,6 +216,10 @@ class DatabaseConnection:
     
     def close(self):
         """Close database connection"""
+        if self.index_sync is not None:
+            self.index_sync.stop()
+            self.index_sync = None
+        
         if self._client:
             self._client.close()
             self._client = None
@@ -0,0 +1,92 @@
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Dict, Optional
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Marks a stage that produced no result before its timeout or the request deadline
+STAGE_TIMED_OUT = object()
+
+
+class BoundedExecutor:
+    """Thread pool with a bounded backlog, shared by request handlers that fan out work
+
+    At most `max_workers` stages run and `max_pending` more wait. When both are taken
+    (for instance by slow stages that already timed out) submit() runs the stage in the
+    caller's thread instead, so a stalled dependency degrades requests to sequential
+    execution rather than growing an unbounded queue.
+    """
+
+    def __init__(self, max_workers: int = 8, max_pending: int = 32, name: str = 'stage'):
+        self.max_workers = max(1, max_workers)
+        self.max_pending = max(0, max_pending)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=name)
+        self._slots = threading.BoundedSemaphore(self.max_workers + self.max_pending)
+        self._stats_lock = threading.Lock()
+
+        self.submitted = 0
+        self.inline = 0
+        self.timeouts = {}
+        self.failures = {}
+
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        """Schedule fn(*args, **kwargs); runs inline when the pool is saturated"""
+        if not self._slots.acquire(blocking=False):
+            with self._stats_lock:
+                self.inline += 1
+            future = Future()
+            try:
+                future.set_result(fn(*args, **kwargs))
+            except Exception as e:
+                future.set_exception(e)
+            return future
+
+        with self._stats_lock:
+            self.submitted += 1
+        try:
+            future = self._executor.submit(fn, *args, **kwargs)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def result(self, stage: str, future: Future, timeout: Optional[float], deadline: Optional[float] = None) -> Any:
+        """Wait for a stage up to its own timeout and the request deadline
+
+        Returns STAGE_TIMED_OUT if it is still running, and re-raises its exception if it
+        failed. Queued stages are cancelled; running ones finish in the background.
+        """
+        if deadline is not None:
+            remaining = max(0.0, deadline - time.monotonic())
+            timeout = remaining if timeout is None else min(timeout, remaining)
+
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            with self._stats_lock:
+                self.timeouts[stage] = self.timeouts.get(stage, 0) + 1
+            logger.warning(f"Search stage '{stage}' timed out after {timeout:.2f}s")
+            return STAGE_TIMED_OUT
+        except Exception:
+            with self._stats_lock:
+                self.failures[stage] = self.failures.get(stage, 0) + 1
+            raise
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+
+    def stats(self) -> Dict[str, Any]:
+        """Pool size and per-stage timeout / failure counters for health payloads"""
+        with self._stats_lock:
+            return {
+                "maxWorkers": self.max_workers,
+                "maxPending": self.max_pending,
+                "submitted": self.submitted,
+                "ranInline": self.inline,
+                "timeouts": dict(self.timeouts),
+                "failures": dict(self.failures)
+            }
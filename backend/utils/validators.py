@@ -1,4 +1,5 @@
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Tuple
+from services.ingredient_classifier import DIET_RESTRICTIONS, normalize_restriction
 import re
 
 def validate_search_request(data: Dict[str, Any]) -> Dict[str, Any]:
@@ -64,6 +65,37 @@ def validate_search_request(data: Dict[str, Any]) -> Dict[str, Any]:
             'message': f'Invalid mood. Must be one of: {", ".join(valid_moods)}'
         }
     
+    # Validate dietaryRestrictions (optional)
+    if data.get('dietaryRestrictions') is not None:
+        restrictions, unknown = parse_dietary_restrictions(data['dietaryRestrictions'])
+        if unknown:
+            return {
+                'valid': False,
+                'message': f'Unknown dietary restriction "{unknown[0]}". Must be one of: {", ".join(DIET_RESTRICTIONS)}'
+            }
+    
+    # Validate mode and maxMissing (optional)
+    mode = str(data.get('mode', 'similar')).lower().strip()
+    if mode not in ('similar', 'pantry'):
+        return {
+            'valid': False,
+            'message': 'Invalid mode. Must be one of: similar, pantry'
+        }
+    
+    max_missing = data.get('maxMissing')
+    if max_missing is not None and (not isinstance(max_missing, int) or isinstance(max_missing, bool) or max_missing < 0):
+        return {
+            'valid': False,
+            'message': 'maxMissing must be a non-negative integer'
+        }
+    
+    # Validate bypassCache (optional debugging flag)
+    if not isinstance(data.get('bypassCache', False), bool):
+        return {
+            'valid': False,
+            'message': 'bypassCache must be true or false'
+        }
+    
     # Validate userName (optional)
     user_name = data.get('userName', '').strip()
     if user_name:
@@ -84,6 +116,68 @@ def validate_search_request(data: Dict[str, Any]) -> Dict[str, Any]:
         'message': 'Valid request'
     }
 
+def parse_dietary_restrictions(value: Any) -> Tuple[Tuple[str, ...], List[str]]:
+    """Canonical restriction classes from a list or comma-separated string, plus unrecognized entries"""
+    if isinstance(value, str):
+        value = value.split(',')
+    if not isinstance(value, (list, tuple)):
+        return (), [str(value)]
+    
+    restrictions = set()
+    unknown = []
+    for item in value:
+        if not isinstance(item, str) or not item.strip():
+            continue
+        restriction = normalize_restriction(item)
+        if restriction is None:
+            unknown.append(item.strip())
+        else:
+            restrictions.add(restriction)
+    
+    return tuple(sorted(restrictions)), unknown
+
+def validate_batch_search_request(data: Dict[str, Any], max_queries: int) -> Dict[str, Any]:
+    """Validate a batch of recipe search queries"""
+    
+    if not data or not isinstance(data.get('queries'), list):
+        return {
+            'valid': False,
+            'message': 'Request body must contain a "queries" list'
+        }
+    
+    queries = data['queries']
+    if len(queries) == 0:
+        return {
+            'valid': False,
+            'message': 'At least one query is required'
+        }
+    
+    if len(queries) > max_queries:
+        return {
+            'valid': False,
+            'message': f'Maximum {max_queries} queries allowed per batch'
+        }
+    
+    # Every query follows the single search rules
+    for i, query in enumerate(queries):
+        if not isinstance(query, dict):
+            return {
+                'valid': False,
+                'message': f'Query {i} must be an object'
+            }
+        
+        result = validate_search_request(query)
+        if not result['valid']:
+            return {
+                'valid': False,
+                'message': f'Query {i}: {result["message"]}'
+            }
+    
+    return {
+        'valid': True,
+        'message': 'Valid request'
+    }
+
 def validate_recipe_data(recipe: Dict[str, Any]) -> Dict[str, Any]:
     """Validate recipe data structure"""
     
@@ -153,6 +247,10 @@ def sanitize_input(text: str) -> str:
     
     return text
 
+def canonicalize_ingredients(ingredients: List[str]) -> Tuple[str, ...]:
+    """Canonical form of an ingredient list: lowercased, stripped, de-duplicated and sorted"""
+    return tuple(sorted({ing.lower().strip() for ing in ingredients if ing and ing.strip()}))
+
 def validate_pagination_params(page: int, limit: int) -> Dict[str, Any]:
     """Validate pagination parameters"""
     